@@ -17,26 +17,17 @@ Each output row is one state-year observation with:
 
 import os
 import math
+import sys
 import pandas as pd
 
 BASE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BASE))
+from mandate_versions import panel_versions  # noqa: E402
 
-# Mandate-date definitions copied verbatim from ../build_both.py to keep the
-# DiD treatment dummies exactly aligned with the descriptive dataset.
-VERSIONS = {
-    "v1_inclusive": {
-        "OR": "2017-11-01", "IL": "2018-05-01", "CA": "2018-11-01",
-        "CT": "2022-04-01", "MD": "2022-09-01", "CO": "2023-01-01",
-        "VA": "2023-07-01", "ME": "2024-01-01", "DE": "2024-01-01",
-        "NJ": "2024-03-01",
-    },
-    "v2_conservative": {
-        "OR": "2017-11-01", "IL": "2018-11-01", "CA": "2019-07-01",
-        "CT": "2022-04-01", "MD": "2022-09-01", "CO": "2023-01-01",
-        "VA": "2023-07-01", "ME": "2024-01-01", "DE": "2024-07-01",
-        "NJ": "2024-06-30",
-    },
-}
+# Mandate dates come from ../mandate_versions.py, the same registry
+# ../build_both.py builds the descriptive dataset from, so the DiD treatment
+# dummies stay aligned with it.
+VERSIONS = panel_versions()
 
 
 def first_treatment_year(state, mandate_dates):
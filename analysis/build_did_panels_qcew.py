@@ -27,26 +27,16 @@ from __future__ import annotations
 
 import math
 import os
+import sys
 
 import pandas as pd
 
 REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
 BASE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, REPO_ROOT)
+from mandate_versions import panel_versions  # noqa: E402
 
-VERSIONS = {
-    "v1_inclusive": {
-        "OR": "2017-11-01", "IL": "2018-05-01", "CA": "2018-11-01",
-        "CT": "2022-04-01", "MD": "2022-09-01", "CO": "2023-01-01",
-        "VA": "2023-07-01", "ME": "2024-01-01", "DE": "2024-01-01",
-        "NJ": "2024-03-01",
-    },
-    "v2_conservative": {
-        "OR": "2017-11-01", "IL": "2018-11-01", "CA": "2019-07-01",
-        "CT": "2022-04-01", "MD": "2022-09-01", "CO": "2023-01-01",
-        "VA": "2023-07-01", "ME": "2024-01-01", "DE": "2024-07-01",
-        "NJ": "2024-06-30",
-    },
-}
+VERSIONS = panel_versions()
 
 
 def first_treatment_year(state: str, mandate_dates: dict) -> float:
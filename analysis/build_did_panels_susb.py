@@ -27,29 +27,20 @@ Outputs:
 
 import math
 import os
+import sys
 
 import pandas as pd
 
 BASE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BASE))
+from mandate_versions import panel_versions  # noqa: E402
+
 SUSB_PATH = os.path.join(os.path.dirname(BASE), "data", "census_susb",
                           "state_year_firms_by_size.csv")
 CBP_PATH = os.path.join(BASE, "cbp_state_year.csv")
 COUNTS_PATH = os.path.join(BASE, "state_year_new_401k.csv")
 
-VERSIONS = {
-    "v1_inclusive": {
-        "OR": "2017-11-01", "IL": "2018-05-01", "CA": "2018-11-01",
-        "CT": "2022-04-01", "MD": "2022-09-01", "CO": "2023-01-01",
-        "VA": "2023-07-01", "ME": "2024-01-01", "DE": "2024-01-01",
-        "NJ": "2024-03-01",
-    },
-    "v2_conservative": {
-        "OR": "2017-11-01", "IL": "2018-11-01", "CA": "2019-07-01",
-        "CT": "2022-04-01", "MD": "2022-09-01", "CO": "2023-01-01",
-        "VA": "2023-07-01", "ME": "2024-01-01", "DE": "2024-07-01",
-        "NJ": "2024-06-30",
-    },
-}
+VERSIONS = panel_versions()
 
 
 def first_treatment_year(state, mandate_dates):
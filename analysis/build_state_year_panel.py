@@ -1,7 +1,9 @@
 """Build state-year panel of new 401(k) plan formations from Form 5500 + 5500-SF.
 
-Mirrors the filters in ../build_dataset.py but keeps all 50 states (+ DC) so we
-can use non-mandate states as a comparison group in the DiD design.
+Mirrors the filters in ../build_both.py but keeps all 50 states (+ DC) so we
+can use non-mandate states as a comparison group in the DiD design. Both
+scripts count from the same normalized scan of each raw file
+(form5500_ingest.scan_file), so whichever runs second reads no raw data.
 
 Outputs:
     analysis/state_year_new_401k.csv
@@ -19,108 +21,43 @@ import sys
 import pandas as pd
 
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-RAW_DIR = os.path.join(BASE_DIR, "form5500-raw-data")
+sys.path.insert(0, BASE_DIR)
+from form5500_ingest import (VALID_STATES, cached_header,  # noqa: E402
+                             concat_frames, dedupe_by_ein, resolve_columns,
+                             scan_file)
+from raw_catalog import raw_files  # noqa: E402
+
 OUT_DIR = os.path.join(BASE_DIR, "analysis")
 os.makedirs(OUT_DIR, exist_ok=True)
 
 YEARS = range(2017, 2025)
 
-F5500_COLS = {
-    "pension": "TYPE_PENSION_BNFT_CODE",
-    "entity": "TYPE_PLAN_ENTITY_CD",
-    "entity_value": ["2", "2.0"],
-    "date": "PLAN_EFF_DATE",
-    "state": "SPONS_DFE_MAIL_US_STATE",
-    "ein": "SPONS_DFE_EIN",
-    "participants": "TOT_PARTCP_BOY_CNT",
-}
-
-F5500SF_COLS = {
-    "pension": "SF_TYPE_PENSION_BNFT_CODE",
-    "entity": "SF_PLAN_ENTITY_CD",
-    "entity_value": ["1", "1.0"],
-    "date": "SF_PLAN_EFF_DATE",
-    "state": "SF_SPONS_US_STATE",
-    "ein": "SF_SPONS_EIN",
-    "participants": "SF_TOT_PARTCP_BOY_CNT",
-}
-
-VALID_STATES = {
-    "AL","AK","AZ","AR","CA","CO","CT","DE","DC","FL","GA","HI","ID","IL","IN",
-    "IA","KS","KY","LA","ME","MD","MA","MI","MN","MS","MO","MT","NE","NV","NH",
-    "NJ","NM","NY","NC","ND","OH","OK","OR","PA","RI","SC","SD","TN","TX","UT",
-    "VT","VA","WA","WV","WI","WY",
-}
-
-
-def find_file(folder, pattern):
-    if not os.path.exists(folder):
-        return None
-    for f in os.listdir(folder):
-        if pattern.lower() in f.lower() and f.lower().endswith(".csv"):
-            return os.path.join(folder, f)
-    return None
-
-
-def get_col(df, name):
-    if name in df.columns:
-        return name
-    upper = name.upper()
-    for c in df.columns:
-        if c.upper() == upper:
-            return c
-    return None
-
 
 def load_one(filepath, col_map, label):
     """Load + filter one Form 5500 / 5500-SF file. Returns df with columns:
     state, eff_date, ein, participants, is_401k, is_single_employer.
+
+    Reads the shared normalized scan (form5500_ingest.scan_file), so the
+    parsing is identical to the descriptive build in ../build_both.py.
+    Returns None for a file without an entity-code column: the scan treats
+    such plans as single-employer, but the panel has always left them out.
     """
     print(f"  Loading {label}... ", end="", flush=True)
-    cols_needed = [col_map["pension"], col_map["entity"], col_map["date"],
-                   col_map["state"], col_map["ein"], col_map["participants"]]
-    # First read just header to find actual column names (case may differ)
-    head = pd.read_csv(filepath, nrows=0, encoding="latin1")
-    actual = {k: get_col(head, v) for k, v in col_map.items()
-              if k not in ("entity_value",)}
-    if not all([actual["pension"], actual["entity"], actual["date"],
-                actual["state"], actual["ein"]]):
-        print(f"  [SKIP] missing required columns: {actual}")
-        return pd.DataFrame()
-
-    use_cols = [v for v in actual.values() if v]
-    df = pd.read_csv(filepath, usecols=use_cols, low_memory=False, encoding="latin1")
+    if not resolve_columns(cached_header(filepath), col_map)["entity"]:
+        print(f"  [SKIP] missing entity column {col_map['entity']}")
+        return None
+    df = scan_file(filepath, col_map, label)
+    df = df.dropna(subset=["EIN"])
     print(f"{len(df):,} rows")
 
-    pension = actual["pension"]
-    entity = actual["entity"]
-    date_c = actual["date"]
-    state_c = actual["state"]
-    ein_c = actual["ein"]
-    part_c = actual["participants"]
-
-    df[pension] = df[pension].astype(str)
-    df[entity] = df[entity].astype(str).str.strip()
-    df[state_c] = df[state_c].astype(str).str.strip().str.upper()
-    df[date_c] = pd.to_datetime(df[date_c], errors="coerce")
-
-    df = df[df[state_c].isin(VALID_STATES)]
-    df = df.dropna(subset=[date_c])
-    df = df.dropna(subset=[ein_c])
-
-    is_401k = df[pension].str.contains("2J", na=False)
-    is_se = df[entity].isin(col_map["entity_value"])
-
     out = pd.DataFrame({
-        "state": df[state_c].values,
-        "eff_date": df[date_c].values,
-        "ein": df[ein_c].astype(str).str.strip()
-                  .str.replace(".0", "", regex=False).str.zfill(9).values,
-        "participants": pd.to_numeric(df[part_c], errors="coerce").values
-                        if part_c else None,
-        "is_401k": is_401k.values,
-        "is_single_employer": is_se.values,
-        "source": label,
+        "state": df["STATE"].values,
+        "eff_date": df["PLAN_EFFECTIVE_DATE"].values,
+        "ein": df["EIN"].values,
+        "participants": df["EMPLOYEE_COUNT"].values,
+        "is_401k": df["IS_401K"].values,
+        "is_single_employer": df["IS_SINGLE_EMPLOYER"].values,
+        "source": df["SOURCE"].values,
     })
     return out
 
@@ -133,18 +70,16 @@ def main():
     frames = []
     for year in YEARS:
         print(f"\n--- {year} ---")
-        p = find_file(os.path.join(RAW_DIR, "form5500"), f"f_5500_{year}_all")
-        if p:
-            frames.append(load_one(p, F5500_COLS, f"F5500_{year}"))
-        p = find_file(os.path.join(RAW_DIR, "form5500sf"), f"f_5500_sf_{year}_all")
-        if p:
-            frames.append(load_one(p, F5500SF_COLS, f"F5500SF_{year}"))
+        for p, col_map, label in raw_files(year):
+            df = load_one(p, col_map, label)
+            if df is not None:
+                frames.append(df)
 
     if not frames:
         print("\n[ERROR] no data loaded")
         sys.exit(1)
 
-    full = pd.concat(frames, ignore_index=True)
+    full = concat_frames(frames)
     print(f"\nCombined records (all single-employer + multi, all pension types): {len(full):,}")
 
     # Restrict to single-employer only (the policy-relevant population for
@@ -156,11 +91,11 @@ def main():
     # Keep first effective-date observation per EIN to count "new" plans.
     # Some EINs file multiple times per year; we want the entity-level
     # establishment event, not an annual filing.
-    full = full.sort_values("eff_date")
-    first_obs = full.drop_duplicates(subset=["ein"], keep="first").copy()
+    first_obs = dedupe_by_ein(full, "eff_date", keep="earliest",
+                              ein_col="ein").copy()
     print(f"Unique EINs (first effective date): {len(first_obs):,}")
 
-    first_obs["eff_year"] = pd.to_datetime(first_obs["eff_date"]).dt.year
+    first_obs["eff_year"] = first_obs["eff_date"].dt.year
 
     # Restrict effective year to study window
     panel_window = first_obs[
@@ -179,7 +114,7 @@ def main():
     #    full single-employer universe since pension code is broad.
     esrp = panel_window  # already single-employer
 
-    by_state_year = lambda d: (d.groupby(["state", "eff_year"]).size()
+    by_state_year = lambda d: (d.groupby(["state", "eff_year"], observed=True).size()
                                  .reset_index(name="n"))
 
     a = by_state_year(k401).rename(columns={"n": "new_401k_plans"})
@@ -0,0 +1,429 @@
+"""Native Callaway-Sant'Anna estimator for balanced state x year panels.
+
+An array implementation of the unconditional (no-covariate) CS estimator
+that run_did.fit_cs uses with DID_CS_ENGINE=native. The panels are small
+(51 states x 8 years), so everything is done on a states x years outcome
+matrix at once instead of cell by cell:
+
+    ATT(g,t)   every group-time cell from one fancy-indexed difference
+               matrix (states x cells) and boolean treated / control masks;
+               varying base period (t-1 before treatment, g-1 after), never-
+               or not-yet-treated comparison group, no anticipation.
+    IF         the cells' influence functions (states x cells), scaled like
+               R `did` / `differences` (mean-zero, Var(ATT) = Var(IF) / n).
+    aggregate  simple, event and cohort aggregations as matrix products of
+               the cell ATTs / IFs with a cells x aggregates weight matrix,
+               plus the weight-estimation correction (wif) for simple and
+               event, as in R `did`'s compute.aggte.
+    bootstrap  one batched multiplier bootstrap for the cells and every
+               aggregation: a (draws x states) Rademacher or Mammen weight
+               matrix times the stacked IFs, chunked over draws; standard
+               errors from the bootstrap IQR and a uniform (sup-t) band per
+               table, the rule of `differences` and R `did` — except for
+               estimates whose IQR has collapsed (see below). Tens of
+               thousands of draws cost well under a second.
+
+States first treated in the first panel year have no pre-period and are
+dropped, as both packages do. Point estimates match R `did`
+(did_r_*_v2_conservative.csv) to 1e-10.
+
+Inference departs from both packages in one place. An estimate carried by
+one or two states has a bootstrap distribution with point masses, and its
+IQR swings between seeds (on the v2 panel from 0.1x to 2x the bootstrap
+standard deviation for event 3 and the 2023 / 2024 cohorts) and collapses
+towards zero as the draws grow. Where the IQR-based scale falls below
+IQR_COLLAPSE x the bootstrap standard deviation, bootstrap() uses the
+standard deviation instead, so those SEs can sit well above what
+`differences` would report for the same draws (1.5x on the 2023 cohort at
+20,000 draws). Every other estimate follows the reference rule and agrees
+with the published `differences` tables up to simulation noise; validate()
+checks both.
+
+Usage:
+    python analysis/cs_did.py [--boot N] [--multiplier mammen]
+        # validate against the R / `differences` references
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import sys
+import time
+from dataclasses import dataclass
+from statistics import NormalDist
+
+import numpy as np
+import pandas as pd
+
+BASE = os.path.dirname(os.path.abspath(__file__))
+
+CONTROL_GROUPS = ("not_yet_treated", "never_treated")
+
+# Below this bootstrap spread a column is degenerate: no standard error and
+# left out of the uniform band (R `did` uses the same cutoff).
+_SE_FLOOR = np.sqrt(np.finfo(float).eps) * 10
+
+# An IQR-based scale below this fraction of the bootstrap standard deviation
+# has collapsed (see bootstrap) and is replaced by the standard deviation.
+IQR_COLLAPSE = 0.85
+
+
+@dataclass
+class GroupTime:
+    """All ATT(g,t) cells of one fit; columns of inf line up with att."""
+    units: np.ndarray         # state labels, one per IF row
+    unit_cohort: np.ndarray   # first-treatment year per state, 0 = never
+    cohort: np.ndarray        # per cell
+    base_period: np.ndarray
+    time: np.ndarray
+    att: np.ndarray
+    inf: np.ndarray           # states x cells
+
+
+def panel_matrix(df: pd.DataFrame, outcome: str):
+    """(states, years, Y states x years, first-treatment year per state).
+
+    Raises ValueError unless the panel is balanced with no missing outcome.
+    """
+    wide = df.pivot(index="state", columns="year", values=outcome).sort_index()
+    if wide.isna().to_numpy().any():
+        raise ValueError(f"native CS needs a balanced panel with no missing "
+                         f"{outcome!r}")
+    cohort = df.groupby("state")["cohort"].first().reindex(wide.index)
+    return (wide.index.to_numpy(), wide.columns.to_numpy(),
+            wide.to_numpy(dtype=float), cohort.to_numpy(dtype=int))
+
+
+def att_gt(df: pd.DataFrame, outcome: str,
+           control_group: str = "not_yet_treated") -> GroupTime:
+    """Every ATT(g,t) cell and its influence function in one pass."""
+    if control_group not in CONTROL_GROUPS:
+        raise ValueError(f"unknown control group {control_group!r}; "
+                         f"expected one of {', '.join(CONTROL_GROUPS)}")
+    units, years, y, g_unit = panel_matrix(df, outcome)
+    # Cohorts after the panel are never treated within it; cohorts in the
+    # first year have no pre-period and are dropped.
+    g_unit = np.where(g_unit > years[-1], 0, g_unit)
+    keep = (g_unit == 0) | (g_unit > years[0])
+    units, y, g_unit = units[keep], y[keep], g_unit[keep]
+    n = len(units)
+
+    cohorts = np.unique(g_unit[g_unit > 0])
+    cell_g = np.repeat(cohorts, len(years) - 1)
+    cell_t = np.tile(np.arange(1, len(years)), len(cohorts))  # year index
+    g_idx = np.searchsorted(years, cell_g)
+    cell_b = np.where(cell_t < g_idx, cell_t - 1, g_idx - 1)
+
+    dy = y[:, cell_t] - y[:, cell_b]                             # n x k
+    treated = g_unit[:, None] == cell_g[None, :]
+    control = np.broadcast_to(g_unit[:, None] == 0, treated.shape)
+    if control_group == "not_yet_treated":
+        later = years[np.maximum(cell_t, cell_b)]
+        control = control | ((g_unit[:, None] > later[None, :]) & ~treated)
+    n_t = treated.sum(axis=0)
+    n_c = control.sum(axis=0)
+    ok = (n_t > 0) & (n_c > 0)
+    treated, control, dy = treated[:, ok], control[:, ok], dy[:, ok]
+    n_t, n_c = n_t[ok], n_c[ok]
+
+    mu_t = (dy * treated).sum(axis=0) / n_t
+    mu_c = (dy * control).sum(axis=0) / n_c
+    inf = n * (treated * (dy - mu_t) / n_t - control * (dy - mu_c) / n_c)
+    return GroupTime(units=units, unit_cohort=g_unit, cohort=cell_g[ok],
+                     base_period=years[cell_b[ok]], time=years[cell_t[ok]],
+                     att=mu_t - mu_c, inf=inf)
+
+
+def aggregate(gt: GroupTime, type_of_aggregation: str):
+    """(labels, ATT, IF states x aggregates) for 'simple', 'event' or
+    'cohort'.
+
+    Each aggregate is a weighted sum of cells. Simple and event weight
+    cells by cohort size and add the influence of estimating those weights;
+    cohort averages each cohort's post-treatment cells equally.
+    """
+    post = gt.time >= gt.cohort
+    if type_of_aggregation == "simple":
+        labels = np.array([0])
+        member = post[:, None]
+    elif type_of_aggregation == "event":
+        rel = gt.time - gt.cohort
+        labels = np.unique(rel)
+        member = rel[:, None] == labels[None, :]
+    elif type_of_aggregation == "cohort":
+        labels = np.unique(gt.cohort[post])
+        member = post[:, None] & (gt.cohort[:, None] == labels[None, :])
+        weights = member / member.sum(axis=0)
+        return labels, gt.att @ weights, gt.inf @ weights
+    else:
+        raise ValueError(f"unknown aggregation {type_of_aggregation!r}")
+
+    member = member.astype(float)                                # k x m
+    dummies = (gt.unit_cohort[:, None] == gt.cohort[None, :]).astype(float)
+    pg = dummies.mean(axis=0)                                    # per cell
+    total = pg @ member                                          # per agg
+    weights = member * pg[:, None] / total
+    # Weight-estimation correction (R `did` wif), for all aggregates at once.
+    dev = dummies - pg                                           # n x k
+    wif = ((dev @ (member * gt.att[:, None])) / total
+           - (dev @ member) * ((pg * gt.att) @ member) / total ** 2)
+    return labels, gt.att @ weights, gt.inf @ weights + wif
+
+
+MULTIPLIERS = ("rademacher", "mammen")
+
+# Mammen's two-point weights: mean 0, variance 1, third moment 1.
+_MAMMEN_LO, _MAMMEN_HI = (1 - np.sqrt(5)) / 2, (1 + np.sqrt(5)) / 2
+_MAMMEN_P_LO = (np.sqrt(5) + 1) / (2 * np.sqrt(5))
+
+
+def multiplier_draws(rng: np.random.Generator, size: tuple,
+                     multiplier: str = "rademacher") -> np.ndarray:
+    """Bootstrap multipliers. Drawn from uniforms (one double per weight),
+    so the stream does not depend on how the draws are chunked."""
+    u = rng.random(size)
+    if multiplier == "rademacher":
+        return np.where(u < 0.5, -1.0, 1.0)
+    if multiplier == "mammen":
+        return np.where(u < _MAMMEN_P_LO, _MAMMEN_LO, _MAMMEN_HI)
+    raise ValueError(f"unknown multiplier {multiplier!r}; "
+                     f"expected one of {', '.join(MULTIPLIERS)}")
+
+
+def bootstrap(infs: list[np.ndarray], boot_iterations: int, seed: int | None,
+              alpha: float = 0.05, multiplier: str = "rademacher",
+              chunk_size: int = 4096) -> list[tuple[np.ndarray, float]]:
+    """Multiplier bootstrap of several tables of estimates at once.
+
+    infs holds one IF matrix (states x estimates) per table. They are
+    stacked side by side and every draw is one row of a (draws x states)
+    multiplier matrix times that stack, computed chunk_size draws at a time
+    so memory stays bounded at large boot_iterations. All tables therefore
+    share the same draws. Returns (standard errors, uniform-band critical
+    value) per table; standard errors are the bootstrap IQR / 1.349, as in
+    `differences` and R `did`, except where that has collapsed below
+    IQR_COLLAPSE x the bootstrap standard deviation, which is used instead;
+    the band is sup-t within each table.
+    Mammen weights are skewed, so on estimates driven by one or two states
+    the IQR understates their spread; Rademacher is the default for that
+    reason.
+    """
+    stacked = np.hstack(infs)
+    n = stacked.shape[0]
+    rng = np.random.default_rng(seed)
+    res = np.empty((boot_iterations, stacked.shape[1]))
+    for lo in range(0, boot_iterations, chunk_size):
+        hi = min(lo + chunk_size, boot_iterations)
+        res[lo:hi] = multiplier_draws(rng, (hi - lo, n), multiplier) @ stacked
+    res /= np.sqrt(n)
+
+    # Columns with no bootstrap spread (e.g. a cell no state moves) get no
+    # standard error and stay out of the uniform band.
+    spread = res.std(axis=0)
+    live = spread > _SE_FLOOR
+    res = res[:, live]
+    q75, q25 = np.quantile(res, [0.75, 0.25], axis=0, method="inverted_cdf")
+    z = NormalDist()
+    iqr_sigma = (q75 - q25) / (z.inv_cdf(0.75) - z.inv_cdf(0.25))
+    # When one or two states carry an estimate, the bootstrap distribution
+    # has a point mass at its centre and the IQR collapses towards zero as
+    # the draws grow. Only those columns fall back to the bootstrap standard
+    # deviation (a departure from both reference packages, which would
+    # report a near-zero SE there); every other column keeps their IQR rule.
+    sd = spread[live]
+    sigma = np.where(iqr_sigma < IQR_COLLAPSE * sd, sd, iqr_sigma)
+    se = np.full(len(live), np.nan)
+    se[live] = sigma / np.sqrt(n)
+    t_abs = np.abs(res / sigma)
+
+    out = []
+    bounds = np.cumsum([0] + [inf.shape[1] for inf in infs])
+    live_pos = np.cumsum(live) - live  # column of t_abs for each live column
+    for lo, hi in zip(bounds[:-1], bounds[1:]):
+        cols = live_pos[lo:hi][live[lo:hi]]
+        crit = (float(np.quantile(t_abs[:, cols].max(axis=1), 1 - alpha,
+                                  method="inverted_cdf"))
+                if len(cols) else np.nan)
+        out.append((se[lo:hi], crit))
+    return out
+
+
+def _table(name: str, index: pd.Index, att: np.ndarray, se: np.ndarray,
+           crit: float) -> pd.DataFrame:
+    """A result table laid out like a `differences` aggregation."""
+    lower, upper = att - crit * se, att + crit * se
+    columns = pd.MultiIndex.from_tuples([
+        (name, "", "ATT"),
+        (name, "bootstrap", "std_error"),
+        (name, "simult. conf. band", "lower"),
+        (name, "simult. conf. band", "upper"),
+        (name, "simult. conf. band", "zero_not_in_cband"),
+    ])
+    flag = np.where((lower > 0) | (upper < 0), "*", "")
+    return pd.DataFrame(
+        {columns[0]: att, columns[1]: se, columns[2]: lower,
+         columns[3]: upper, columns[4]: flag.astype(object)},
+        index=index)
+
+
+def fit(df: pd.DataFrame, outcome: str, control_group: str,
+        boot_iterations: int, seed: int | None, alpha: float = 0.05,
+        multiplier: str = "rademacher") -> dict:
+    """ATT(g,t) plus simple / event / cohort aggregations, as the frames
+    run_did.CSFit holds (overall, event, cohort, raw_gt, gt_influence).
+
+    The cells and all three aggregations are bootstrapped together from
+    one set of draws (see bootstrap).
+    """
+    gt = att_gt(df, outcome, control_group)
+    tables = {"raw_gt": ("ATTgtElements", pd.MultiIndex.from_arrays(
+        [gt.cohort, gt.base_period, gt.time],
+        names=["cohort", "base_period", "time"]), gt.att, gt.inf)}
+    layout = {"overall": ("simple", "SimpleAggregation", None),
+              "event": ("event", "EventAggregation", "relative_period"),
+              "cohort": ("cohort", "CohortAggregation", "cohort")}
+    for key, (agg, name, index_name) in layout.items():
+        labels, att, inf = aggregate(gt, agg)
+        index = (pd.RangeIndex(len(labels)) if index_name is None
+                 else pd.Index(labels, name=index_name))
+        tables[key] = (name, index, att, inf)
+
+    inference = bootstrap([inf for *_, inf in tables.values()],
+                          boot_iterations, seed, alpha, multiplier)
+    parts = {key: _table(name, index, att, se, crit)
+             for (key, (name, index, att, _)), (se, crit)
+             in zip(tables.items(), inference)}
+    parts["gt_influence"] = gt.inf
+    return parts
+
+
+# ------------------------- validation -------------------------
+
+R_OUTPUTS = {
+    "overall": ("did_r_simple_v2_conservative.csv", None),
+    "event": ("did_r_event_v2_conservative.csv", "event_time"),
+    "cohort": ("did_r_cohort_v2_conservative.csv", "cohort"),
+}
+
+# Inference reference: the `differences` tables run_did.py publishes for
+# the same fit (v2-conservative, primary outcome, not-yet-treated). R's
+# point estimates are exact, but its bands come from R's own bootstrap; the
+# `differences` ones use the same weights and band rule as bootstrap().
+INFERENCE_REF = {
+    "overall": "did_results_v2_conservative.csv",
+    "event": "did_event_study_v2_conservative.csv",
+    "cohort": "did_cohort_effects_v2_conservative.csv",
+}
+
+# Tolerances for the inference checks. The reference is itself one
+# bootstrap run, and three of the five cohorts (plus event 2-4) rest on one
+# or two states, whose IQR SEs move by +-50% between seeds under the
+# reference rule and, where the IQR collapsed, are floored here (module
+# docstring). Hence the wide per-estimate range; the median and the band
+# width are what a real difference in the estimator would move.
+SE_MEDIAN_TOL = 0.20   # median |SE / reference SE - 1| per table
+SE_RATIO_RANGE = (0.5, 2.0)  # every SE
+CRIT_TOL = 0.10        # |crit / reference crit - 1| per table
+
+
+def _aligned(table: pd.DataFrame, labels) -> pd.DataFrame | None:
+    """Rows of a native result table for labels (None for 'overall')."""
+    flat = table.copy()
+    flat.columns = [c[-1] for c in flat.columns]
+    if labels is None:
+        return flat
+    pos = flat.index.get_indexer(labels)
+    return None if (pos < 0).any() else flat.iloc[pos]
+
+
+def _inference_ref(key: str) -> pd.DataFrame:
+    """(label, ATT, std_error, upper) from a published `differences` table."""
+    ref = pd.read_csv(os.path.join(BASE, INFERENCE_REF[key]))
+    if key == "overall":
+        ref = ref.iloc[[0]].rename(columns={"coef": "ATT", "se": "std_error",
+                                            "ci_hi": "upper"})
+        ref["label"] = 0
+    elif key == "event":
+        ref = ref[ref["spec"] == "CS not-yet-treated"]
+        ref = ref.rename(columns={"event_time": "label"})
+    else:
+        ref = ref.rename(columns={"cohort": "label"})
+    return ref[["label", "ATT", "std_error", "upper"]]
+
+
+def validate(tol: float = 5e-5, boot_iterations: int = 999,
+             multiplier: str = "rademacher") -> bool:
+    """Validate a native fit on the v2-conservative panel.
+
+    Point estimates must match R `did` (did_r_validation.R) within tol.
+    Standard errors and uniform-band critical values (for a single estimate,
+    the band width) must match the published `differences` tables within
+    SE_MEDIAN_TOL / SE_RATIO_RANGE / CRIT_TOL, which allow for bootstrap
+    noise and the collapsed-IQR floor (see the tolerances above). The
+    reference uses Rademacher weights; with Mammen weights the IQR scale is
+    systematically smaller, so those runs report the inference comparison
+    but are checked on point estimates only. Returns True if all checks
+    pass.
+    """
+    df = pd.read_csv(os.path.join(BASE, "did_panel_v2_conservative.csv"))
+    t0 = time.perf_counter()
+    parts = fit(df, "rate_per_1000_estabs", "not_yet_treated",
+                boot_iterations=boot_iterations, seed=42, multiplier=multiplier)
+    print(f"Native CS fit ({boot_iterations:,} {multiplier} bootstrap draws): "
+          f"{(time.perf_counter() - t0) * 1000:.1f} ms")
+    ok = True
+    for key, (fname, col) in R_OUTPUTS.items():
+        r = pd.read_csv(os.path.join(BASE, fname))
+        ours = _aligned(parts[key], None if col is None else r[col])
+        if ours is None:
+            print(f"  {key}: labels missing from native fit")
+            ok = False
+            continue
+        diff = np.max(np.abs(ours["ATT"].to_numpy() - r["estimate"].to_numpy()))
+
+        ref = _inference_ref(key)
+        mine = _aligned(parts[key], None if key == "overall" else ref["label"])
+        ratio = mine["std_error"].to_numpy() / ref["std_error"].to_numpy()
+        crit = ((mine["upper"] - mine["ATT"]) / mine["std_error"]).iloc[0]
+        ref_crit = ((ref["upper"] - ref["ATT"]) / ref["std_error"]).iloc[0]
+        # With one estimate only the band width (crit x SE, the bootstrap
+        # quantile) is identified, not how it splits into crit and SE.
+        band = crit / ref_crit * (ratio[0] if len(ratio) == 1 else 1)
+        checks = {
+            "point": diff <= tol,
+            "se": (np.abs(np.median(ratio) - 1) <= SE_MEDIAN_TOL
+                   and SE_RATIO_RANGE[0] <= ratio.min()
+                   and ratio.max() <= SE_RATIO_RANGE[1]),
+            "crit": abs(band - 1) <= CRIT_TOL,
+        }
+        if multiplier != "rademacher":
+            checks = {"point": checks["point"]}
+        failed = [name for name, passed in checks.items() if not passed]
+        print(f"  {key:8s} {len(r):2d} estimates: max |native - R| = "
+              f"{diff:.2e}; SE / ref SE in [{ratio.min():.3f}, "
+              f"{ratio.max():.3f}] (median {np.median(ratio):.3f}); band "
+              f"crit {crit:.3f} vs ref {ref_crit:.3f}"
+              + (f"  [FAIL: {', '.join(failed)}]" if failed else ""))
+        ok &= not failed
+    print("Native estimates and inference match the references" if ok
+          else "[ERROR] Native fit differs from the references")
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Validate the native CS "
+                                                 "engine against R `did`.")
+    parser.add_argument("--boot", type=int, default=999,
+                        help="bootstrap draws (default 999)")
+    parser.add_argument("--multiplier", choices=MULTIPLIERS,
+                        default="rademacher",
+                        help="bootstrap weights (default rademacher, as in "
+                             "`differences`)")
+    args = parser.parse_args()
+    sys.exit(0 if validate(boot_iterations=args.boot,
+                           multiplier=args.multiplier) else 1)
+
+
+if __name__ == "__main__":
+    main()
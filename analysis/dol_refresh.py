@@ -2,21 +2,31 @@
 
 Steps:
   1. Verify the four refresh zips exist in form5500-raw-data/refresh_2026_04/.
-  2. Back up the prior 2024 CSVs in form5500-raw-data/.
-  3. Extract refreshed 2024 + 2025 CSVs into the existing folder structure
-     (form5500/, form5500sf/). The CSV name inside each zip matches the
-     historical convention (lowercase, e.g., f_5500_2024_all.csv).
+  2. Copy the prior 2024 CSVs in form5500-raw-data/ to the backup folder.
+  3. Install the refreshed 2024 + 2025 zips into the existing folder
+     structure (form5500/, form5500sf/) as e.g. f_5500_2024_all.zip — a hard
+     link, so no multi-GB copy. The ingest layer reads the CSV member of the
+     zip as a stream, so nothing is extracted to disk. An extracted CSV of
+     the same year would take precedence over the zip, so it is renamed to
+     <name>.csv.superseded (never deleted). `--extract` restores the old
+     behaviour of writing the CSV (lowercase, e.g., f_5500_2024_all.csv)
+     over the previous one instead.
   4. Compute per-file row counts (raw, post-2J, post-single-employer,
-     post-state-filter, post-date-filter for v1 and v2).
+     post-state-filter, post-date-filter for v1 and v2). This is the single
+     decompress pass: unless `--no-cache` is given it also writes the
+     columnar cache that build_both.py then reads.
   5. Write the row counts to methodology/source_provenance_log.csv,
      replacing the TBD placeholders with actual values.
 
 This script does NOT re-run the full dataset build; that is delegated to
-the patched build_both.py (extended to YEARS = range(2017, 2026)).
+the patched build_both.py (extended to YEARS = range(2017, 2026)), which
+re-ingests only the refreshed files and reuses the cached partitions of
+every unchanged year (see the partition manifest in form5500_ingest.py).
 """
 
 from __future__ import annotations
 
+import argparse
 import csv
 import datetime as dt
 import os
@@ -25,28 +35,29 @@ import shutil
 import sys
 import zipfile
 
-import pandas as pd
-
 REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO)
+from form5500_ingest import (F5500_COLS, F5500SF_COLS,  # noqa: E402
+                             DateParser, mandate_masks, read_form,
+                             read_header, resolve_columns)
+from mandate_versions import MANDATE_STATES, VERSIONS  # noqa: E402
+from raw_catalog import (drift_report, entry_fingerprint,  # noqa: E402
+                         entry_for, refresh_catalog)
+
 RAW_DIR = os.path.join(REPO, "form5500-raw-data")
 REFRESH_DIR = os.path.join(RAW_DIR, "refresh_2026_04")
 BACKUP_DIR = os.path.join(RAW_DIR, "pre_refresh_backup_2026_04")
+
+# The pre-refresh originals copied to BACKUP_DIR (2025 is new in this pull).
+BACKUP_FILES = [
+    os.path.join(RAW_DIR, "form5500", "f_5500_2024_all.csv"),
+    os.path.join(RAW_DIR, "form5500sf", "f_5500_sf_2024_all.csv"),
+]
 PROVENANCE_PATH = os.path.join(REPO, "methodology", "source_provenance_log.csv")
 
-# Mandate dates copied from build_both.py — needed to compute the
-# "post-mandate" row count for the provenance log.
-MANDATE_V1 = {
-    "OR": "2017-11-01", "IL": "2018-05-01", "CA": "2018-11-01",
-    "CT": "2022-04-01", "MD": "2022-09-01", "CO": "2023-01-01",
-    "VA": "2023-07-01", "ME": "2024-01-01", "DE": "2024-01-01",
-    "NJ": "2024-03-01",
-}
-MANDATE_V2 = {
-    "OR": "2017-11-01", "IL": "2018-11-01", "CA": "2019-07-01",
-    "CT": "2022-04-01", "MD": "2022-09-01", "CO": "2023-01-01",
-    "VA": "2023-07-01", "ME": "2024-01-01", "DE": "2024-07-01",
-    "NJ": "2024-06-30",
-}
+# Needed to compute the "post-mandate" row count for the provenance log.
+MANDATE_V1 = VERSIONS["v1-inclusive"]
+MANDATE_V2 = VERSIONS["v2-conservative"]
 
 ZIP_FILES = {
     # zip-name → (subdir under raw, expected CSV stem)
@@ -64,36 +75,14 @@ URL_TEMPLATE = {
     "F_5500_SF_2025_All.zip": f"{URL_BASE}/2025/All/F_5500_SF_2025_All.zip",
 }
 
-F5500_COLS = {
-    "pension": "TYPE_PENSION_BNFT_CODE",
-    "entity": "TYPE_PLAN_ENTITY_CD",
-    "entity_value": ["2", "2.0"],
-    "date": "PLAN_EFF_DATE",
-    "state": "SPONS_DFE_MAIL_US_STATE",
-    "ein": "SPONS_DFE_EIN",
-}
-F5500SF_COLS = {
-    "pension": "SF_TYPE_PENSION_BNFT_CODE",
-    "entity": "SF_PLAN_ENTITY_CD",
-    "entity_value": ["1", "1.0"],
-    "date": "SF_PLAN_EFF_DATE",
-    "state": "SF_SPONS_US_STATE",
-    "ein": "SF_SPONS_EIN",
-}
-
-
-def get_col(df, name):
-    if name in df.columns:
-        return name
-    upper = name.upper()
-    for c in df.columns:
-        if c.upper() == upper:
-            return c
-    return None
+# The part of the shared column maps (form5500_ingest) the counts need.
+COUNT_KEYS = ("pension", "entity", "entity_value", "date", "state", "ein")
 
 
-def count_after_filters(csv_path: str, col_map: dict) -> dict:
-    """Return per-stage row counts for one CSV file.
+def count_after_filters(csv_path: str, col_map: dict,
+                        use_cache: bool = True, fp: dict | None = None) -> dict:
+    """Return per-stage row counts for one CSV file (or DOL zip). fp is the
+    file's current fingerprint if known (see form5500_ingest.read_form).
 
     Stages:
         raw            : total rows in CSV
@@ -104,17 +93,15 @@ def count_after_filters(csv_path: str, col_map: dict) -> dict:
         after_v2_date  : after plan-effective-date > v2 mandate date
     """
     print(f"  reading {os.path.basename(csv_path)}...", flush=True)
-    use_cols = [col_map[k] for k in ("pension", "entity", "date", "state", "ein")]
-    head = pd.read_csv(csv_path, nrows=0, encoding="latin1")
-    actual = {k: get_col(head, col_map[k]) for k in
-              ("pension", "entity", "date", "state", "ein")}
+    # Reading through the Parquet cache also pre-converts the refreshed file
+    # for the build_both.py run that follows.
+    df = read_form(csv_path, col_map, use_cache=use_cache, fp=fp)
+    actual = resolve_columns(df.columns, col_map)
     if not all(actual.values()):
         print(f"  [WARN] missing cols in {csv_path}: {actual}")
         return {"raw": 0, "after_2J": 0, "after_single": 0,
                 "after_state": 0, "after_v1_date": 0, "after_v2_date": 0}
 
-    df = pd.read_csv(csv_path, usecols=list(actual.values()),
-                     encoding="latin1", low_memory=False)
     raw = len(df)
 
     df[actual["pension"]] = df[actual["pension"]].astype(str)
@@ -126,22 +113,18 @@ def count_after_filters(csv_path: str, col_map: dict) -> dict:
     after_single = len(df)
 
     df[actual["state"]] = df[actual["state"]].astype(str).str.strip().str.upper()
-    df = df[df[actual["state"]].isin(set(MANDATE_V1.keys()))]
+    df = df[df[actual["state"]].isin(MANDATE_STATES)]
     after_state = len(df)
 
-    df[actual["date"]] = pd.to_datetime(df[actual["date"]], errors="coerce")
+    dates = DateParser()
+    df[actual["date"]] = dates.parse(df[actual["date"]])
+    dates.report(os.path.basename(csv_path))
     df = df.dropna(subset=[actual["date"]])
 
-    after_v1 = sum(
-        ((df[actual["state"]] == s)
-         & (df[actual["date"]] > pd.Timestamp(d))).sum()
-        for s, d in MANDATE_V1.items()
-    )
-    after_v2 = sum(
-        ((df[actual["state"]] == s)
-         & (df[actual["date"]] > pd.Timestamp(d))).sum()
-        for s, d in MANDATE_V2.items()
-    )
+    masks = mandate_masks(df[actual["state"]], df[actual["date"]],
+                          {"v1": MANDATE_V1, "v2": MANDATE_V2})
+    after_v1 = masks["v1"].sum()
+    after_v2 = masks["v2"].sum()
 
     return {"raw": raw, "after_2J": after_2J, "after_single": after_single,
             "after_state": after_state,
@@ -162,7 +145,60 @@ def extract_zip(zip_path: str, dest_dir: str) -> str:
     return target
 
 
+def install_zip(zip_path: str, dest_dir: str, stem: str) -> str:
+    """Make a refresh zip visible to the ingest layer as <stem>.zip in
+    dest_dir without extracting it; return the installed path."""
+    target = os.path.join(dest_dir, f"{stem}.zip")
+    if os.path.exists(target):
+        os.remove(target)
+    try:
+        os.link(zip_path, target)
+    except OSError:  # different filesystem / no hard-link support
+        shutil.copy2(zip_path, target)
+    return target
+
+
+def backup_original(path: str):
+    """Copy a pre-refresh raw CSV into BACKUP_DIR unless it is backed up
+    already; the original stays where it is."""
+    if not os.path.exists(path):
+        return
+    backup_target = os.path.join(BACKUP_DIR, os.path.basename(path))
+    if not os.path.exists(backup_target):
+        shutil.copy2(path, backup_target)
+        print(f"  backed up {path} -> {backup_target}")
+    else:
+        print(f"  backup exists: {backup_target}")
+
+
+def set_aside_csv(path: str):
+    """Rename an extracted CSV that the zip of the same year is about to
+    supersede (the ingest layer would otherwise prefer the CSV). The new
+    name is not a raw-file extension, so the catalog no longer sees it; a
+    name already taken by an earlier run gets a numeric suffix."""
+    if not os.path.exists(path):
+        return
+    target = f"{path}.superseded"
+    n = 1
+    while os.path.exists(target):
+        n += 1
+        target = f"{path}.superseded{n}"
+    os.replace(path, target)
+    print(f"  set aside {path} -> {target}")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="DOL Form 5500 refresh helper.")
+    parser.add_argument("--extract", action="store_true",
+                        help="extract the CSVs to disk instead of reading the "
+                             "zips in place")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="do not write the columnar cache while counting")
+    return parser.parse_args()
+
+
 def main():
+    args = parse_args()
     pull_date = dt.date.today().isoformat()
     print(f"DOL Form 5500 refresh, pull date {pull_date}")
 
@@ -175,35 +211,58 @@ def main():
 
     # 2. backup pre-refresh 2024 files
     os.makedirs(BACKUP_DIR, exist_ok=True)
-    for src in [
-        os.path.join(RAW_DIR, "form5500", "f_5500_2024_all.csv"),
-        os.path.join(RAW_DIR, "form5500sf", "f_5500_sf_2024_all.csv"),
-    ]:
-        if os.path.exists(src):
-            backup_target = os.path.join(BACKUP_DIR, os.path.basename(src))
-            if not os.path.exists(backup_target):
-                shutil.copy2(src, backup_target)
-                print(f"  backed up {src} -> {backup_target}")
-            else:
-                print(f"  backup exists: {backup_target}")
-
-    # 3. extract refresh zips into the existing data dirs
+    for src in BACKUP_FILES:
+        backup_original(src)
+
+    # 3. install (or, with --extract, extract) refresh zips into the data dirs
     refresh_csvs = {}
-    for zip_name, (subdir, _stem) in ZIP_FILES.items():
+    for zip_name, (subdir, stem) in ZIP_FILES.items():
         zip_path = os.path.join(REFRESH_DIR, zip_name)
         dest_dir = os.path.join(RAW_DIR, subdir)
         os.makedirs(dest_dir, exist_ok=True)
-        csv_path = extract_zip(zip_path, dest_dir)
+        if args.extract:
+            csv_path = extract_zip(zip_path, dest_dir)
+            print(f"  extracted {zip_name} -> {csv_path}")
+        else:
+            set_aside_csv(os.path.join(dest_dir, f"{stem}.csv"))
+            csv_path = install_zip(zip_path, dest_dir, stem)
+            print(f"  installed {zip_name} -> {csv_path}")
         refresh_csvs[zip_name] = csv_path
-        print(f"  extracted {zip_name} -> {csv_path}")
 
-    # 4. count rows post-filter for each refreshed CSV
+    # Catalog the installed files; a refresh is where DOL schema changes
+    # (renamed / dropped columns) first show up.
+    refresh_catalog()
+    drift = drift_report()
+    if drift:
+        print("\nSchema drift in the raw catalog:")
+        for line in drift:
+            print(f"  {line}")
+
+    # 4. count rows post-filter for each refreshed file (streams the zip
+    #    member and writes the columnar cache in the same pass; the content
+    #    hash comes from the catalog, which has just computed it)
     print("\nCounting filter stages for each refreshed file...")
     counts: dict[str, dict] = {}
     for zip_name, csv_path in refresh_csvs.items():
-        col_map = (F5500_COLS if "F_5500_" in zip_name and "SF" not in zip_name
-                   else F5500SF_COLS)
-        counts[zip_name] = count_after_filters(csv_path, col_map)
+        shared = (F5500_COLS if "F_5500_" in zip_name and "SF" not in zip_name
+                  else F5500SF_COLS)
+        col_map = {k: shared[k] for k in COUNT_KEYS}
+        # Resolve against the file's actual header names from the catalog,
+        # or from the file itself if it is not cataloged (a name the
+        # catalog's folder / year pattern does not recognize).
+        entry = entry_for(csv_path)
+        if entry is not None:
+            columns = entry["columns"]
+            fp = entry_fingerprint(entry)
+        else:
+            print(f"  [catalog] {csv_path} not cataloged; reading its header")
+            columns = resolve_columns(read_header(csv_path), col_map)
+            fp = None
+        col_map = {**col_map, **{k: v for k, v in columns.items()
+                                 if v and k in col_map}}
+        counts[zip_name] = count_after_filters(csv_path, col_map,
+                                               use_cache=not args.no_cache,
+                                               fp=fp)
         print(f"  {zip_name}: {counts[zip_name]}")
 
     # 5. update source_provenance_log.csv with row counts for 2024 / 2025
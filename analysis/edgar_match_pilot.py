@@ -27,8 +27,11 @@ Approach:
 EDGAR best practices observed:
   - User-Agent: identifies the requester per SEC.gov/oit/announcement/
     new-rate-control-limits — using the user's email address.
-  - Rate limit: ≤10 req/sec — script adds 0.15s sleep between calls so
-    typical run is ~1 req/sec.
+  - Rate limit: ≤10 req/sec — requests share a token bucket capped at
+    5 req/sec, spent only when a request actually goes to the network.
+  - Every response goes through the shared HTTP cache (http_cache), so a
+    rerun makes no requests; HTTP_CACHE_MODE=refresh revalidates them and
+    HTTP_CACHE_MODE=offline replays the cache only.
 """
 
 from __future__ import annotations
@@ -39,11 +42,12 @@ import json
 import os
 import re
 import sys
-import time
 import urllib.parse
 
 import pandas as pd
-import requests
+
+import http_cache
+from http_fetch import TokenBucket
 
 REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 DATA_PATH = os.path.join(REPO, "data", "v2-conservative",
@@ -54,6 +58,7 @@ LOG_PATH = os.path.join(REPO, "analysis", "edgar_search.log")
 USER_AGENT = ("State Auto-IRA Research jruei@americafirstpolicy.com "
               "(SEC EDGAR pilot - read-only)")
 HEADERS = {"User-Agent": USER_AGENT, "Accept": "application/json"}
+SEC_BUCKET = TokenBucket(5, burst=1)
 
 EDGAR_FULL_TEXT = "https://efts.sec.gov/LATEST/search-index"
 EDGAR_SUBMISSIONS = "https://data.sec.gov/submissions/CIK{cik:010d}.json"
@@ -187,7 +192,7 @@ def load_ticker_index() -> dict:
     if _TICKER_CACHE is not None:
         return _TICKER_CACHE
     url = "https://www.sec.gov/files/company_tickers.json"
-    r = requests.get(url, headers=HEADERS, timeout=60)
+    r = http_cache.fetch(url, headers=HEADERS, bucket=SEC_BUCKET)
     r.raise_for_status()
     raw = r.json()
     by_token: dict[str, list[dict]] = {}
@@ -267,7 +272,12 @@ def edgar_full_text_search(name: str, forms: list[str]) -> dict:
     params = {"q": q, "forms": forms_q}
     url = f"{EDGAR_FULL_TEXT}?{urllib.parse.urlencode(params)}"
     try:
-        r = requests.get(url, headers=HEADERS, timeout=30)
+        # No retries: the 500s are query-pattern related, not transient.
+        r = http_cache.fetch(url, headers=HEADERS, bucket=SEC_BUCKET,
+                             retries=0, timeout=30)
+        if r.status_code == -1:
+            return {"status": "error", "n_hits": 0, "query": q, "hits": [],
+                    "error_msg": r.reason}
         if r.status_code == 500:
             return {"status": "error", "n_hits": 0, "query": q, "hits": [],
                     "error_msg": "EDGAR full-text 500 (often query-pattern related)"}
@@ -295,7 +305,8 @@ def find_recent_filing(cik: int, target_forms: list[str]) -> dict | None:
     """
     url = EDGAR_SUBMISSIONS.format(cik=cik)
     try:
-        r = requests.get(url, headers=HEADERS, timeout=30)
+        r = http_cache.fetch(url, headers=HEADERS, bucket=SEC_BUCKET,
+                             timeout=30)
         if r.status_code != 200:
             return None
         sub = r.json()
@@ -416,7 +427,7 @@ def fetch_filing_text(doc_url: str) -> str | None:
     if not doc_url:
         return None
     try:
-        r = requests.get(doc_url, headers=HEADERS, timeout=60)
+        r = http_cache.fetch(doc_url, headers=HEADERS, bucket=SEC_BUCKET)
         if r.status_code != 200:
             return None
         return r.text
@@ -559,7 +570,6 @@ def main():
         rec["search_query"] = result.get("query", "")
         if result.get("error_msg"):
             rec["notes"] = result["error_msg"]
-        time.sleep(0.3)
 
         if result["status"] in ("found", "ambiguous"):
             rec["edgar_cik"] = result["cik"] or ""
@@ -576,7 +586,6 @@ def main():
             print(log_lines[-1])
 
             html = fetch_filing_text(result.get("doc_url") or "")
-            time.sleep(0.3)
             if html:
                 ext = extract_match_text(html)
                 rec["match_text_excerpt"] = ext["excerpt"]
@@ -618,6 +627,7 @@ def main():
     print(f"Match formula extracted: {n_match}")
     print(f"Safe-harbor mentioned: {n_sh}")
     print(f"Output: {DELIVERABLE}")
+    print(http_cache.stats())
 
 
 if __name__ == "__main__":
@@ -11,15 +11,26 @@ Census API URL forms (no key needed for state-level queries):
         ?get=ESTAB&for=state:*&NAICS{17|22}=00
 
 NAICS scheme changed in 2022 — query parameter switches.
+
+The years are fetched concurrently through the shared HTTP cache
+(http_cache). A year Census has published is downloaded once and from then
+on replayed from disk, so a rerun only probes the years not yet released and
+costs nothing else; --refresh revalidates the cached years (conditional GET)
+and --offline replays the cached JSON without touching the network.
+
+Usage:
+    python analysis/fetch_cbp.py [--workers N] [--refresh | --offline]
 """
 
-import json
+import argparse
 import os
 import sys
-import time
 
+import numpy as np
 import pandas as pd
-import requests
+
+import http_cache
+from http_fetch import TokenBucket, run_parallel
 
 OUT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)),
                         "cbp_state_year.csv")
@@ -40,18 +51,23 @@ FIPS_TO_STATE = {
     "55":"WI","56":"WY",
 }
 
+DEFAULT_BASE_URL = "https://api.census.gov/data"
+VALUE_COLS = ["establishments", "employment"]
 
-def fetch_year(year):
+# Be polite to the Census API: at most 2 requests per second.
+BUCKET = TokenBucket(2, burst=1)
+
+
+def fetch_year(year, base_url=DEFAULT_BASE_URL):
+    """One CBP year as (df or None, status line)."""
     # CBP API uses NAICS2017 as the predicate variable name across 2017-2023
     # (Census kept the variable name even after the underlying classification
     # switched to NAICS 2022). 2024 is not yet released.
-    url = ("https://api.census.gov/data/"
+    url = (f"{base_url.rstrip('/')}/"
            f"{year}/cbp?get=ESTAB,EMP&for=state:*&NAICS2017=00")
-    print(f"  GET {url}")
-    r = requests.get(url, timeout=60)
+    r = http_cache.fetch(url, bucket=BUCKET)
     if r.status_code != 200:
-        print(f"  [ERR] {year}: HTTP {r.status_code} {r.text[:200]}")
-        return None
+        return None, f"  [ERR] {year}: HTTP {r.status_code} {r.text[:200]}"
     data = r.json()
     header, *rows = data
     df = pd.DataFrame(rows, columns=header)
@@ -60,19 +76,63 @@ def fetch_year(year):
     df = df.dropna(subset=["state"])
     df["establishments"] = pd.to_numeric(df["ESTAB"], errors="coerce")
     df["employment"] = pd.to_numeric(df["EMP"], errors="coerce")
-    return df[["state", "year", "establishments", "employment"]]
+    how = "cached" if r.from_cache else "downloaded"
+    return (df[["state", "year", "establishments", "employment"]],
+            f"  {year}: {len(df)} states ({how}) {url}")
+
+
+def fill_grid(cbp):
+    """Full state x year grid with missing years filled within state: carry
+    forward from the last available year, then back from the first.
+
+    Works on a states x years array per column (one pass of index
+    arithmetic, no groupby); a state with no data at all stays missing.
+    """
+    states = sorted(FIPS_TO_STATE.values())
+    years = np.asarray(YEARS)
+    out = pd.DataFrame({"state": np.repeat(states, len(years)),
+                        "year": np.tile(years, len(states))})
+    pos = np.arange(len(years))
+    for col in VALUE_COLS:
+        wide = (cbp.pivot(index="state", columns="year", values=col)
+                   .reindex(index=states, columns=years)
+                   .to_numpy(dtype=float))
+        have = ~np.isnan(wide)
+        # Column of the last available year at or before each year ...
+        src = np.maximum.accumulate(np.where(have, pos, -1), axis=1)
+        # ... or, before the first available year, that first year.
+        src = np.where(src < 0, have.argmax(axis=1)[:, None], src)
+        out[col] = np.take_along_axis(wide, src, axis=1).ravel()
+    return out
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Fetch Census CBP state-year "
+                                                 "private establishments.")
+    parser.add_argument("--workers", type=int, default=4,
+                        help="concurrent requests (default 4)")
+    parser.add_argument("--base-url",
+                        default=os.environ.get("CBP_BASE_URL", DEFAULT_BASE_URL),
+                        help="Census API root (default: Census; or CBP_BASE_URL)")
+    http_cache.add_arguments(parser)
+    return parser.parse_args()
 
 
 def main():
+    args = parse_args()
+    http_cache.configure_from_args(args)
+
+    results = run_parallel(lambda y: fetch_year(y, args.base_url),
+                           [(y,) for y in YEARS], args.workers)
     frames = []
-    for y in YEARS:
-        f = fetch_year(y)
+    for f, line in results:
+        print(line)
         if f is not None:
             frames.append(f)
-        time.sleep(0.5)  # be polite
 
     if not frames:
         print("[ERROR] No CBP data fetched")
+        print(http_cache.stats())
         sys.exit(1)
 
     cbp = pd.concat(frames, ignore_index=True)
@@ -80,21 +140,22 @@ def main():
     # Carry-forward fill for missing years (CBP release lag).
     available_years = sorted(cbp["year"].unique())
     print(f"\nCBP years actually returned: {available_years}")
-    full_grid = pd.MultiIndex.from_product(
-        [sorted(FIPS_TO_STATE.values()), YEARS], names=["state", "year"]
-    ).to_frame(index=False)
-    out = full_grid.merge(cbp, on=["state", "year"], how="left")
-
-    # Forward-fill within state, then back-fill at the start
-    out = out.sort_values(["state", "year"])
-    out[["establishments", "employment"]] = (
-        out.groupby("state")[["establishments", "employment"]]
-           .ffill().bfill()
-    )
-
-    out.to_csv(OUT_PATH, index=False)
-    print(f"\nWrote {OUT_PATH}: {len(out):,} state-year rows")
+    out = fill_grid(cbp)
+
+    text = out.to_csv(index=False)
+    if os.path.exists(OUT_PATH):
+        with open(OUT_PATH, "r", encoding="utf-8", newline="") as fh:
+            unchanged = fh.read() == text
+    else:
+        unchanged = False
+    if unchanged:
+        print(f"\n{OUT_PATH} unchanged: {len(out):,} state-year rows")
+    else:
+        with open(OUT_PATH, "w", encoding="utf-8", newline="") as fh:
+            fh.write(text)
+        print(f"\nWrote {OUT_PATH}: {len(out):,} state-year rows")
     print(f"Sample:\n{out.head(10)}")
+    print(http_cache.stats())
 
 
 if __name__ == "__main__":
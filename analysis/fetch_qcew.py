@@ -23,22 +23,54 @@ The annual average columns we extract:
 QCEW annual data is published with a ~6-month lag, so 2024 should be the most
 recent full-year data available as of mid-2026; 2025 will not yet be released.
 
+The 408 state-year requests run concurrently through http_fetch (thread
+pool, token-bucket rate limit, retry with backoff) and the shared HTTP
+cache (http_cache): a rerun is served entirely from disk, --refresh
+revalidates every area file with a conditional GET so only changed files
+are downloaded again, and --offline never touches the network. The
+total-private row is picked out of each CSV line by line, so no per-area
+CSV is parsed into a DataFrame. --base-url (or QCEW_BASE_URL) points the
+fetcher at a local stand-in server that serves recorded responses under
+the same {year}/a/area/{area_code}.csv layout (tests/test_fetch_qcew.py
+does this with the fixtures in tests/fixtures/qcew/api). An area whose
+CSV lacks one of the filter / value columns is logged and skipped.
+
+Bulk mode (--bulk DIR) skips the API altogether. BLS also publishes each
+year as one annual file,
+    https://data.bls.gov/cew/data/files/{year}/csv/{year}_annual_singlefile.zip
+    https://data.bls.gov/cew/data/files/{year}/csv/{year}_annual_by_area.zip
+and with those downloaded into DIR (zipped, or the singlefile extracted as
+{year}.annual.singlefile.csv) every year is one sequential scan with the
+same total-private filter, giving the same panel and provenance files.
+Only the statewide members of a by-area zip are read.
+
+Usage:
+    python analysis/fetch_qcew.py [--workers N] [--rate R] [--retries N]
+                                  [--base-url URL] [--refresh | --offline]
+    python analysis/fetch_qcew.py --bulk DIR
+
 Outputs:
-    data/bls_qcew/raw/qcew_{state}_{year}.csv  (raw single-state-year CSVs)
+    data/bls_qcew/raw/qcew_{state}_{year}.csv  (raw single-state-year CSVs;
+                                                API mode only)
     data/bls_qcew/state_year_private_establishments.csv  (standardized panel)
     methodology/bls_qcew_provenance_addendum.csv         (per-file provenance)
 """
 
 from __future__ import annotations
 
+import argparse
+import csv
 import io
 import os
+import re
 import sys
-import time
+import zipfile
 from datetime import datetime
 
 import pandas as pd
-import requests
+
+import http_cache
+from http_fetch import TokenBucket, run_parallel
 
 REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
 RAW_DIR = os.path.join(REPO_ROOT, "data", "bls_qcew", "raw")
@@ -64,55 +96,185 @@ FIPS_TO_STATE = {
     "54": "WV", "55": "WI", "56": "WY",
 }
 
-URL_PATTERN = "https://data.bls.gov/cew/data/api/{year}/a/area/{area_code}.csv"
+DEFAULT_BASE_URL = "https://data.bls.gov/cew/data/api"
+URL_PATTERN = "{base_url}/{year}/a/area/{area_code}.csv"
+
+# One row per state-year of total private (see module docstring).
+TOTAL_PRIVATE = {"own_code": "5", "industry_code": "10", "agglvl_code": "51"}
+# Columns every area / bulk CSV must have for the filter and the panel.
+REQUIRED_COLUMNS = (*TOTAL_PRIVATE, "area_fips", "annual_avg_estabs",
+                    "annual_avg_emplvl")
+
+# Annual bulk files looked for in --bulk DIR, in order of preference.
+BULK_FILES = ("{year}.annual.singlefile.csv", "{year}_annual_singlefile.zip",
+              "{year}_annual_by_area.zip")
+BULK_URL = ("https://data.bls.gov/cew/data/files/{year}/csv/"
+            "{year}_annual_{layout}.zip")
+_STATEWIDE_RE = re.compile(r"(?<!\d)(\d{2})000(?!\d)")
 
 
-def fetch_state_year(state: str, fips: str, year: int):
+def scan_area_csv(lines):
+    """Stream the lines of a QCEW area CSV. Returns (n_rows, matches), where
+    matches are the total-private rows as {column: value} dicts, or None if
+    the header lacks one of REQUIRED_COLUMNS (the caller skips the area)."""
+    reader = csv.reader(lines)
+    header = next(reader, None)
+    if header is None:
+        return 0, []
+    header = [h.strip() for h in header]
+    if not set(REQUIRED_COLUMNS) <= set(header):
+        return 0, None
+    wanted = [(header.index(col), value) for col, value in TOTAL_PRIVATE.items()]
+    n_rows = 0
+    matches = []
+    for row in reader:
+        if not row:
+            continue
+        n_rows += 1
+        if all(row[i].strip() == value for i, value in wanted):
+            matches.append(dict(zip(header, row)))
+    return n_rows, matches
+
+
+def fetch_state_year(state: str, fips: str, year: int,
+                     base_url: str = DEFAULT_BASE_URL,
+                     bucket: TokenBucket | None = None, retries: int = 4):
     """Fetch one state-year QCEW CSV. Returns (raw_path, url, http_status,
     n_rows_total, n_rows_filtered, est, emp).
     """
     area_code = f"{fips}000"
-    url = URL_PATTERN.format(year=year, area_code=area_code)
+    url = URL_PATTERN.format(base_url=base_url.rstrip("/"), year=year,
+                             area_code=area_code)
     raw_path = os.path.join(RAW_DIR, f"qcew_{state}_{year}.csv")
 
-    # Skip download if cached.
+    # Raw files downloaded before the HTTP cache existed count as cached.
     if os.path.exists(raw_path):
-        text = open(raw_path, "r", encoding="utf-8").read()
-        status = 200
-    else:
-        try:
-            r = requests.get(url, timeout=60)
-            status = r.status_code
-            if status != 200:
-                print(f"  [WARN] {state} {year}: HTTP {status}")
-                return raw_path, url, status, 0, 0, None, None
-            text = r.text
-            with open(raw_path, "w", encoding="utf-8") as f:
-                f.write(text)
-        except Exception as e:
-            print(f"  [ERR] {state} {year}: {e}")
-            return raw_path, url, -1, 0, 0, None, None
-
-    df = pd.read_csv(io.StringIO(text),
-                      dtype={"area_fips": str, "industry_code": str})
-    n_total = len(df)
+        http_cache.adopt(url, raw_path)
+    r = http_cache.fetch(url, bucket=bucket, retries=retries)
+    status = r.status_code
+    if status != 200:
+        if status == -1:
+            print(f"  [ERR] {state} {year}: {r.reason}")
+        else:
+            print(f"  [WARN] {state} {year}: HTTP {status}")
+        return raw_path, url, status, 0, 0, None, None
+    r.save_to(raw_path)
+    with r.open_text() as f:
+        n_total, sel = scan_area_csv(f)
+    if sel is None:
+        print(f"  [WARN] {state} {year}: CSV lacks one of "
+              f"{', '.join(REQUIRED_COLUMNS)}")
+        return raw_path, url, status, 0, 0, None, None
 
     # Total private state aggregate: own_code=5, industry_code='10', agglvl_code=51
-    sel = df[(df["own_code"] == 5)
-             & (df["industry_code"] == "10")
-             & (df["agglvl_code"] == 51)]
     n_filt = len(sel)
     if n_filt != 1:
         print(f"  [WARN] {state} {year}: expected 1 total-private row, got {n_filt}")
         return raw_path, url, status, n_total, n_filt, None, None
 
-    row = sel.iloc[0]
+    row = sel[0]
     est = float(row["annual_avg_estabs"])
     emp = float(row["annual_avg_emplvl"])
     return raw_path, url, status, n_total, n_filt, est, emp
 
 
+def find_bulk_file(bulk_dir, year):
+    """Path of the annual bulk file for year in bulk_dir, or None."""
+    for pattern in BULK_FILES:
+        path = os.path.join(bulk_dir, pattern.format(year=year))
+        if os.path.exists(path):
+            return path
+    return None
+
+
+def _bulk_members(path):
+    """Text streams of the CSVs in a bulk file: the file itself, or the CSV
+    members of a zip. A zip holding many CSVs is the by-area layout (one
+    file per area); only its statewide (FIPS xx000) members are opened."""
+    if not path.lower().endswith(".zip"):
+        with open(path, "r", encoding="utf-8", newline="") as f:
+            yield f
+        return
+    with zipfile.ZipFile(path) as zf:
+        names = [n for n in zf.namelist() if n.lower().endswith(".csv")]
+        if len(names) > 1:
+            names = [n for n in names
+                     if (m := _STATEWIDE_RE.search(os.path.basename(n)))
+                     and m.group(1) in FIPS_TO_STATE]
+        for name in names:
+            with zf.open(name) as raw:
+                yield io.TextIOWrapper(raw, encoding="utf-8", newline="")
+
+
+def fetch_bulk_year(year: int, bulk_dir: str):
+    """Scan one year's annual bulk file once. Returns {(state, year):
+    result} for every state, each result shaped like fetch_state_year's
+    (n_rows_total counts the rows scanned in the whole bulk file)."""
+    path = find_bulk_file(bulk_dir, year)
+    if path is None:
+        path = os.path.join(bulk_dir, BULK_FILES[0].format(year=year))
+        url = BULK_URL.format(year=year, layout="singlefile")
+        print(f"  [WARN] {year}: no annual bulk file in {bulk_dir}")
+        return {(state, year): (path, url, -1, 0, 0, None, None)
+                for state in FIPS_TO_STATE.values()}
+
+    layout = "by_area" if "by_area" in os.path.basename(path) else "singlefile"
+    url = BULK_URL.format(year=year, layout=layout)
+    print(f"  Scanning {os.path.basename(path)}... ", end="", flush=True)
+    n_total = 0
+    rows = {state: [] for state in FIPS_TO_STATE.values()}
+    for f in _bulk_members(path):
+        n, matches = scan_area_csv(f)
+        if matches is None:
+            name = os.path.basename(getattr(f, "name", path))
+            print(f"\n  [WARN] {year}: skipping {name}, which lacks one of "
+                  f"{', '.join(REQUIRED_COLUMNS)}")
+            continue
+        n_total += n
+        for row in matches:
+            area = row["area_fips"].strip()
+            state = FIPS_TO_STATE.get(area[:2]) if area[2:] == "000" else None
+            if state is not None:
+                rows[state].append(row)
+    print(f"{n_total:,} rows")
+
+    results = {}
+    for state, sel in rows.items():
+        if len(sel) != 1:
+            print(f"  [WARN] {state} {year}: expected 1 total-private row, "
+                  f"got {len(sel)}")
+            results[(state, year)] = (path, url, 200, n_total, len(sel),
+                                      None, None)
+            continue
+        results[(state, year)] = (path, url, 200, n_total, 1,
+                                  float(sel[0]["annual_avg_estabs"]),
+                                  float(sel[0]["annual_avg_emplvl"]))
+    return results
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Fetch BLS QCEW state-year "
+                                                 "private-sector aggregates.")
+    parser.add_argument("--workers", type=int, default=8,
+                        help="concurrent requests (default 8)")
+    parser.add_argument("--rate", type=float, default=10.0,
+                        help="max requests per second across all workers "
+                             "(default 10; 0 = unlimited)")
+    parser.add_argument("--retries", type=int, default=4,
+                        help="retries per request on errors / 429 / 5xx")
+    parser.add_argument("--base-url",
+                        default=os.environ.get("QCEW_BASE_URL", DEFAULT_BASE_URL),
+                        help="QCEW API root (default: BLS; or QCEW_BASE_URL)")
+    http_cache.add_arguments(parser)
+    parser.add_argument("--bulk", metavar="DIR",
+                        help="read annual bulk files from DIR instead of "
+                             "calling the API (see module docstring)")
+    return parser.parse_args()
+
+
 def main():
+    args = parse_args()
+    http_cache.configure_from_args(args)
     os.makedirs(RAW_DIR, exist_ok=True)
     os.makedirs(os.path.dirname(PROVENANCE_OUT), exist_ok=True)
 
@@ -120,35 +282,51 @@ def main():
     prov_rows = []
     today = datetime.utcnow().strftime("%Y-%m-%d")
 
-    for fips, state in sorted(FIPS_TO_STATE.items(), key=lambda kv: kv[1]):
+    jobs = [(state, fips, year)
+            for fips, state in sorted(FIPS_TO_STATE.items(), key=lambda kv: kv[1])
+            for year in YEARS]
+    if args.bulk:
+        by_key = {}
         for year in YEARS:
-            raw_path, url, status, n_total, n_filt, est, emp = fetch_state_year(
-                state, fips, year
-            )
-            print(f"  {state} {year}: status={status}, total_rows={n_total}, "
-                  f"private_total_rows={n_filt}, estabs={est}, emp={emp}")
-            if est is not None and emp is not None:
-                panel_rows.append({
-                    "state": state,
-                    "year": year,
-                    "private_establishments": est,
-                    "private_employment": emp,
-                    "source_url": url,
-                })
-            prov_rows.append({
-                "downloaded_date": today,
+            by_key.update(fetch_bulk_year(year, args.bulk))
+        results = [by_key[(state, year)] for state, _, year in jobs]
+    else:
+        bucket = TokenBucket(args.rate)
+        results = run_parallel(
+            lambda state, fips, year: fetch_state_year(
+                state, fips, year, args.base_url, bucket, args.retries),
+            jobs, args.workers)
+
+    for (state, fips, year), result in zip(jobs, results):
+        raw_path, url, status, n_total, n_filt, est, emp = result
+        print(f"  {state} {year}: status={status}, total_rows={n_total}, "
+              f"private_total_rows={n_filt}, estabs={est}, emp={emp}")
+        if est is not None and emp is not None:
+            panel_rows.append({
                 "state": state,
                 "year": year,
-                "url": url,
-                "raw_path": os.path.relpath(raw_path, REPO_ROOT).replace("\\", "/"),
-                "http_status": status,
-                "n_rows_total": n_total,
-                "n_rows_total_private_state_agg": n_filt,
-                "annual_avg_estabs": est if est is not None else "",
-                "annual_avg_emplvl": emp if emp is not None else "",
+                "private_establishments": est,
+                "private_employment": emp,
+                "source_url": url,
             })
-            # Be polite to BLS servers.
-            time.sleep(0.05)
+        prov_rows.append({
+            "downloaded_date": today,
+            "state": state,
+            "year": year,
+            "url": url,
+            "raw_path": os.path.relpath(raw_path, REPO_ROOT).replace("\\", "/"),
+            "http_status": status,
+            "n_rows_total": n_total,
+            "n_rows_total_private_state_agg": n_filt,
+            "annual_avg_estabs": est if est is not None else "",
+            "annual_avg_emplvl": emp if emp is not None else "",
+        })
+
+    if not panel_rows:
+        print("[ERROR] No QCEW data fetched")
+        if not args.bulk:
+            print(http_cache.stats())
+        sys.exit(1)
 
     panel = pd.DataFrame(panel_rows).sort_values(["state", "year"]).reset_index(drop=True)
     prov = pd.DataFrame(prov_rows)
@@ -158,6 +336,8 @@ def main():
 
     print(f"\nWrote {PANEL_OUT}: {len(panel):,} state-year rows")
     print(f"Wrote {PROVENANCE_OUT}: {len(prov):,} provenance rows")
+    if not args.bulk:
+        print(http_cache.stats())
     print(f"\nYears: {sorted(panel['year'].unique())}")
     print(f"States: {len(panel['state'].unique())} unique")
     print(f"\nSample (first 8 rows):")
@@ -27,19 +27,32 @@ The header row in the SUSB Excel file is row 3 (0-indexed: 2).
 
 Filter: NAICS code = '--' (Total), NAICS Description = 'Total'.
 
+Downloads go through the shared HTTP cache (http_cache), keyed by URL and
+revalidated with ETag / Last-Modified under HTTP_CACHE_MODE=refresh, so a
+workbook Census republishes in place is picked up; the raw/ copy is
+refreshed from the cache.
+
+Workbooks are read with openpyxl in read-only mode, streaming the first sheet
+and keeping only the NAICS-total rows (read_total_rows), and each parsed
+year is memoized under data/census_susb/parsed/ keyed on the workbook's
+SHA-256, so a rerun over unchanged workbooks opens none of them.
+
 Outputs:
     data/census_susb/raw/us_state_naics_detailedsizes_{year}.xlsx (raw)
+    data/census_susb/parsed/susb_{year}_{hash}_v{n}.parquet (parse cache)
     data/census_susb/state_year_firms_by_size.csv (standardized panel)
     methodology/census_susb_provenance_addendum.csv (per-file provenance)
 """
 
+import hashlib
 import os
 import sys
-import time
 from datetime import date
 
 import pandas as pd
-import requests
+
+import http_cache
+from http_fetch import TokenBucket
 
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 RAW_DIR = os.path.join(BASE_DIR, "data", "census_susb", "raw")
@@ -116,67 +129,130 @@ SIZE_BIN_MAP = {
 # Subtotals to drop (already covered by their constituents)
 SUBTOTAL_LABELS = {"<20", "<500"}
 
+# The header row in the SUSB Excel file, 0-indexed (see module docstring).
+HEADER_ROW = 2
+
+# Parsed panels, memoized by workbook SHA-256 (see parse_cached). Bump
+# PARSE_VERSION whenever parse_one's output changes.
+PARSED_DIR = os.path.join(BASE_DIR, "data", "census_susb", "parsed")
+PARSE_VERSION = 1
+
+# Be polite to www2.census.gov: at most 2 requests per second.
+BUCKET = TokenBucket(2, burst=1)
+
 
 def download_one(year: int) -> tuple[str, str] | None:
     """Download SUSB state-by-size file for a year. Returns (path, url)."""
     url = URL_TEMPLATE.format(year=year)
     out_path = os.path.join(RAW_DIR, f"us_state_naics_detailedsizes_{year}.xlsx")
-    if os.path.exists(out_path):
-        size = os.path.getsize(out_path)
-        if size > 100_000:
-            print(f"  cached: {out_path} ({size:,} bytes)")
-            return out_path, url
-    print(f"  GET {url}")
-    r = requests.get(url, timeout=300)
+    # Workbooks downloaded before the HTTP cache existed count as cached.
+    if os.path.exists(out_path) and os.path.getsize(out_path) > 100_000:
+        http_cache.adopt(url, out_path)
+    r = http_cache.fetch(url, bucket=BUCKET, timeout=300)
     if r.status_code != 200:
         print(f"  [ERR] {year}: HTTP {r.status_code}")
         return None
-    with open(out_path, "wb") as f:
-        f.write(r.content)
-    print(f"  wrote {out_path} ({len(r.content):,} bytes)")
+    r.save_to(out_path)
+    size = os.path.getsize(out_path)
+    print(f"  {'cached' if r.from_cache else 'downloaded'}: {out_path} "
+          f"({size:,} bytes)")
     return out_path, url
 
 
+def _find_column(columns, names, default, index):
+    """Header matching one of names (case-insensitive), else default if
+    present, else the column at index."""
+    col = next((c for c in columns if c.lower() in names), None)
+    if col is None:
+        col = default if default in columns else columns[index]
+    return col
+
+
+def _cell(value):
+    """Cell value as pandas' openpyxl reader returns it (whole floats as
+    int), so counts keep the dtype they had with read_excel."""
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    return value
+
+
+def read_total_rows(path: str):
+    """NAICS-total rows of a SUSB workbook, streamed with openpyxl.
+
+    Opens the workbook read-only, walks the first sheet row by row (only up
+    to the last needed column) and keeps only rows whose NAICS description
+    is 'Total', instead of loading every state x NAICS x size row into a
+    DataFrame. The header is the third non-blank row, as with read_excel
+    (header=2). The sheet is in state blocks, with each state's total rows
+    contiguous; once every state's total block has been passed the rest of
+    the sheet is skipped.
+
+    Returns (df, (state_col, naics_desc_col, size_col, firms_col,
+    estabs_col)).
+    """
+    from openpyxl import load_workbook
+
+    wb = load_workbook(path, read_only=True, data_only=True)
+    try:
+        rows = (r for r in wb.worksheets[0].iter_rows(values_only=True)
+                if any(v is not None and v != "" for v in r))
+        for _ in range(HEADER_ROW):
+            next(rows)
+        header = next(rows)
+        # Sometimes column names have leading/trailing whitespace
+        columns = [str(c).strip() if c is not None else f"Unnamed: {i}"
+                   for i, c in enumerate(header)]
+
+        # Column-name variation across years: handle both 'NAICS' and 'NAICS Code'
+        cols = (
+            _find_column(columns, ("state name", "statedscr", "state_dscr"),
+                         "State Name", 1),
+            _find_column(columns, ("naics description", "naicsdscr",
+                                   "naics_dscr"), "NAICS Description", 3),
+            _find_column(columns, ("enterprise size", "entrsizedscr",
+                                   "entrsizedsc"), "Enterprise Size", 4),
+            _find_column(columns, ("firms", "firm", "number of firms"),
+                         "Firms", 5),
+            _find_column(columns, ("establishments", "estb",
+                                   "number of establishments"),
+                         "Establishments", 6),
+        )
+        idx = [columns.index(c) for c in cols]
+        width = max(idx) + 1
+        state_i, naics_i = idx[0], idx[1]
+
+        kept = []
+        wanted = set(STATE_FIPS)
+        seen, passed = set(), set()
+        current = None
+        for row in rows:
+            row = row[:width] + (None,) * (width - len(row))
+            state = str(row[state_i]).strip()
+            if state != current:
+                if current in seen:
+                    passed.add(current)
+                current = state
+            if str(row[naics_i]).strip().lower() == "total":
+                kept.append([_cell(row[i]) for i in idx])
+                seen.add(state)
+            elif state in seen:
+                passed.add(state)
+                if wanted <= passed:
+                    break
+    finally:
+        wb.close()
+    df = pd.DataFrame({c: [r[j] for r in kept] for j, c in enumerate(cols)},
+                      columns=list(dict.fromkeys(cols)))
+    return df, cols
+
+
 def parse_one(path: str, year: int) -> pd.DataFrame:
     """Parse a SUSB state-by-size file into long format.
 
     Returns columns: state | year | size_class | firm_count | establishment_count
     """
-    df = pd.read_excel(path, sheet_name=0, header=2, engine="openpyxl")
-
-    # Sometimes column names have leading/trailing whitespace
-    df.columns = [str(c).strip() for c in df.columns]
-
-    # Column-name variation across years: handle both 'NAICS' and 'NAICS Code'
-    state_col = next((c for c in df.columns
-                       if c.lower() in ("state name", "statedscr", "state_dscr")), None)
-    if state_col is None:
-        # fall back: 'State Name' column index
-        state_col = "State Name" if "State Name" in df.columns else df.columns[1]
-
-    naics_desc_col = next((c for c in df.columns
-                            if c.lower() in ("naics description",
-                                             "naicsdscr",
-                                             "naics_dscr")), None)
-    if naics_desc_col is None:
-        naics_desc_col = "NAICS Description" if "NAICS Description" in df.columns else df.columns[3]
-
-    size_col = next((c for c in df.columns
-                      if c.lower() in ("enterprise size",
-                                       "entrsizedscr", "entrsizedsc")), None)
-    if size_col is None:
-        size_col = "Enterprise Size" if "Enterprise Size" in df.columns else df.columns[4]
-
-    firms_col = next((c for c in df.columns
-                       if c.lower() in ("firms", "firm", "number of firms")), None)
-    if firms_col is None:
-        firms_col = "Firms" if "Firms" in df.columns else df.columns[5]
-
-    estabs_col = next((c for c in df.columns
-                        if c.lower() in ("establishments", "estb", "number of establishments")),
-                       None)
-    if estabs_col is None:
-        estabs_col = "Establishments" if "Establishments" in df.columns else df.columns[6]
+    df, (state_col, naics_desc_col, size_col, firms_col,
+         estabs_col) = read_total_rows(path)
 
     # Filter to NAICS Total
     df = df[df[naics_desc_col].astype(str).str.strip().str.lower() == "total"].copy()
@@ -218,6 +294,32 @@ def parse_one(path: str, year: int) -> pd.DataFrame:
     return out
 
 
+def _sha256(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def parse_cached(path: str, year: int) -> pd.DataFrame:
+    """parse_one, memoized on disk under PARSED_DIR by the workbook's
+    SHA-256 (plus year and PARSE_VERSION): an unchanged workbook is never
+    opened again, a republished one is parsed afresh."""
+    sha = _sha256(path)
+    cache = os.path.join(PARSED_DIR,
+                         f"susb_{year}_{sha[:16]}_v{PARSE_VERSION}.parquet")
+    if os.path.exists(cache):
+        print(f"  parsed (cached): {os.path.relpath(cache, BASE_DIR)}")
+        return pd.read_parquet(cache)
+    df = parse_one(path, year)
+    os.makedirs(PARSED_DIR, exist_ok=True)
+    tmp = cache + ".tmp"
+    df.to_parquet(tmp, index=False)
+    os.replace(tmp, cache)
+    return df
+
+
 def main():
     os.makedirs(RAW_DIR, exist_ok=True)
     os.makedirs(os.path.dirname(OUT_PANEL), exist_ok=True)
@@ -244,7 +346,7 @@ def main():
             continue
         path, url = result
         try:
-            df = parse_one(path, year)
+            df = parse_cached(path, year)
         except Exception as e:
             print(f"  ERROR parsing {year}: {e}")
             provenance.append({
@@ -271,7 +373,6 @@ def main():
             "status": "OK",
             "notes": "",
         })
-        time.sleep(0.5)
 
     if not panel_frames:
         print("[ERROR] No SUSB data parsed")
@@ -286,6 +387,7 @@ def main():
 
     pd.DataFrame(provenance).to_csv(PROVENANCE_OUT, index=False)
     print(f"Wrote {PROVENANCE_OUT}")
+    print(http_cache.stats())
 
     # Quick sanity printout: CA all years
     print("\nSample (CA all years, all sizes):")
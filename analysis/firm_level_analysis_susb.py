@@ -44,11 +44,15 @@ Outputs:
 """
 
 import os
+import sys
 
 import pandas as pd
 
 BASE = os.path.dirname(os.path.abspath(__file__))
 ROOT = os.path.dirname(BASE)
+sys.path.insert(0, ROOT)
+from mandate_versions import VERSIONS  # noqa: E402
+
 SUSB_PATH = os.path.join(ROOT, "data", "census_susb",
                           "state_year_firms_by_size.csv")
 DATASET_PATH = os.path.join(ROOT, "data", "v2-conservative",
@@ -58,12 +62,10 @@ OUT_TABLE = os.path.join(BASE, "tables",
                           "susb_normalized_rates_by_state_size.csv")
 OUT_MD = os.path.join(BASE, "firm_level_analysis_susb_normalized.md")
 
-# Mandate-state mandate years (for pre-treatment SUSB lookup) — same as
-# v2_conservative dates in build_did_panels_susb.py
-MANDATE_FIRST_YEAR = {
-    "OR": 2017, "IL": 2018, "CA": 2019, "CT": 2022, "MD": 2022,
-    "CO": 2023, "VA": 2023, "ME": 2024, "DE": 2024, "NJ": 2024,
-}
+# Mandate-state mandate years (for pre-treatment SUSB lookup) — the
+# v2-conservative dates from ../mandate_versions.py
+MANDATE_FIRST_YEAR = {state: pd.Timestamp(d).year
+                      for state, d in VERSIONS["v2-conservative"].items()}
 
 # Size threshold for state mandates — most states require 5+ employees
 # to be subject to the program (CA, OR are exceptions extending to 1+).
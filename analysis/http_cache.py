@@ -0,0 +1,315 @@
+"""On-disk HTTP response cache shared by the external-data fetchers.
+
+fetch_cbp, fetch_qcew, fetch_susb and the EDGAR pilot all GET their inputs
+through fetch() here instead of calling requests directly. Each successful
+(HTTP 200) response is stored as
+
+    data/http_cache/bodies/<sha[:2]>/<sha256 of body>   content-addressed body
+    data/http_cache/meta/<sha256 of URL>.json           url, status, headers,
+                                                        ETag / Last-Modified,
+                                                        body hash and size,
+                                                        fetched_at, validated_at
+
+so identical bodies (e.g. an unchanged file re-published under a new URL)
+are stored once. Three modes, set per process with configure() or the
+HTTP_CACHE_MODE environment variable:
+
+    cached   (default) a cached URL is served from disk with no request at
+             all; only URLs never fetched before go to the network. A rerun
+             costs zero network.
+    refresh  cached URLs are revalidated with a conditional GET
+             (If-None-Match / If-Modified-Since); a 304 re-serves the stored
+             body, so only resources that changed are transferred.
+    offline  never touch the network. Cache misses come back as HTTP 504,
+             the status HTTP itself uses for an only-if-cached miss, so
+             callers handle them like any other failed request.
+
+Only 200 responses are cached; errors are always retried on the next run.
+Network requests go through http_fetch.get (rate limit, retries), and the
+rate-limit token is only spent when a request is actually made.
+
+HTTP_CACHE_DIR overrides the cache location.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import threading
+from datetime import datetime, timezone
+
+import requests
+
+from http_fetch import TokenBucket, get
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+CACHE_DIR = os.environ.get("HTTP_CACHE_DIR",
+                           os.path.join(REPO_ROOT, "data", "http_cache"))
+
+MODES = ("cached", "refresh", "offline")
+KEPT_HEADERS = ("content-type", "etag", "last-modified", "content-length")
+
+_settings = {"mode": os.environ.get("HTTP_CACHE_MODE", "cached")}
+_counts = {"hit": 0, "revalidated": 0, "downloaded": 0, "miss": 0}
+_counts_lock = threading.Lock()
+
+
+def configure(mode: str | None = None, cache_dir: str | None = None):
+    """Set the cache mode ('cached', 'refresh', 'offline') and/or location
+    for this process."""
+    global CACHE_DIR
+    if mode is not None:
+        if mode not in MODES:
+            raise ValueError(f"unknown HTTP cache mode {mode!r}; "
+                             f"expected one of {', '.join(MODES)}")
+        _settings["mode"] = mode
+    if cache_dir is not None:
+        CACHE_DIR = cache_dir
+
+
+def mode() -> str:
+    return _settings["mode"]
+
+
+def add_arguments(parser):
+    """--refresh / --offline flags for a fetcher's argparse parser; pass the
+    parsed args to configure_from_args."""
+    group = parser.add_mutually_exclusive_group()
+    group.add_argument("--refresh", action="store_true",
+                       help="revalidate cached responses (conditional GET)")
+    group.add_argument("--offline", action="store_true",
+                       help="serve only from the HTTP cache; no network")
+
+
+def configure_from_args(args):
+    if args.refresh:
+        configure("refresh")
+    elif args.offline:
+        configure("offline")
+
+
+def _now():
+    return datetime.now(timezone.utc).isoformat(timespec="seconds")
+
+
+def _count(what):
+    with _counts_lock:
+        _counts[what] += 1
+
+
+def stats() -> str:
+    """One-line summary of what the cache did in this process."""
+    return (f"HTTP cache ({mode()}): {_counts['hit']} served from disk, "
+            f"{_counts['revalidated']} revalidated unchanged, "
+            f"{_counts['downloaded']} downloaded, {_counts['miss']} offline misses")
+
+
+def _meta_path(url):
+    key = hashlib.sha256(url.encode("utf-8")).hexdigest()
+    return os.path.join(CACHE_DIR, "meta", f"{key}.json")
+
+
+def _body_path(sha):
+    return os.path.join(CACHE_DIR, "bodies", sha[:2], sha)
+
+
+def _read_meta(url):
+    try:
+        with open(_meta_path(url), "r", encoding="utf-8") as f:
+            meta = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if meta.get("url") != url or not os.path.exists(_body_path(meta["sha256"])):
+        return None
+    return meta
+
+
+def _write_meta(meta):
+    path = _meta_path(meta["url"])
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        json.dump(meta, f, indent=2)
+    os.replace(tmp, path)
+
+
+def _store_body(chunks):
+    """Write chunks to the body store; returns (sha256, size)."""
+    tmp_dir = os.path.join(CACHE_DIR, "bodies")
+    os.makedirs(tmp_dir, exist_ok=True)
+    digest = hashlib.sha256()
+    size = 0
+    fd, tmp = tempfile.mkstemp(dir=tmp_dir, suffix=".part")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            for chunk in chunks:
+                digest.update(chunk)
+                size += len(chunk)
+                f.write(chunk)
+        sha = digest.hexdigest()
+        path = _body_path(sha)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+    return sha, size
+
+
+class CachedResponse:
+    """The parts of a requests.Response the fetchers use, backed by the
+    cache. from_cache is True when no body was transferred (a disk hit or a
+    304); path is the body file (None for errors)."""
+
+    def __init__(self, url, status_code, headers=None, path=None,
+                 from_cache=False, fetched_at=None, reason=""):
+        self.url = url
+        self.status_code = status_code
+        self.headers = headers or {}
+        self.path = path
+        self.from_cache = from_cache
+        self.fetched_at = fetched_at
+        self.reason = reason
+        self._content = None
+
+    @property
+    def ok(self):
+        return self.status_code == 200
+
+    @property
+    def encoding(self):
+        ctype = self.headers.get("content-type", "")
+        for part in ctype.split(";")[1:]:
+            key, _, value = part.strip().partition("=")
+            if key.lower() == "charset" and value:
+                return value.strip('"')
+        return "utf-8"
+
+    @property
+    def content(self) -> bytes:
+        if self._content is None:
+            if self.path is None:
+                self._content = self.reason.encode("utf-8")
+            else:
+                with open(self.path, "rb") as f:
+                    self._content = f.read()
+        return self._content
+
+    @property
+    def text(self) -> str:
+        return self.content.decode(self.encoding, errors="replace")
+
+    def json(self):
+        return json.loads(self.content)
+
+    def raise_for_status(self):
+        if self.status_code != 200:
+            raise requests.HTTPError(
+                f"{self.status_code} for url: {self.url} {self.reason[:200]}")
+
+    def open_text(self):
+        """The body as a text stream (for line-by-line scanning)."""
+        return open(self.path, "r", encoding=self.encoding, newline="")
+
+    def save_to(self, dest):
+        """Materialize the body at dest (hard link if possible, else copy);
+        a no-op if dest already holds the same bytes."""
+        if os.path.exists(dest):
+            if os.path.samefile(dest, self.path) or _sha256_file(dest) == \
+                    os.path.basename(self.path):
+                return dest
+        os.makedirs(os.path.dirname(dest) or ".", exist_ok=True)
+        tmp = dest + ".part"
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        try:
+            os.link(self.path, tmp)
+        except OSError:
+            shutil.copyfile(self.path, tmp)
+        os.replace(tmp, dest)
+        return dest
+
+
+def _sha256_file(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _from_meta(meta, from_cache):
+    return CachedResponse(meta["url"], 200, meta["headers"],
+                          _body_path(meta["sha256"]), from_cache,
+                          meta["fetched_at"])
+
+
+def adopt(url: str, path: str) -> bool:
+    """Record an existing local download of url (e.g. a raw file fetched
+    before this cache existed) as its cached response, so it is not fetched
+    again. It carries no validators, so --refresh re-downloads it once.
+    Returns False if url is already cached."""
+    if _read_meta(url) is not None:
+        return False
+    with open(path, "rb") as f:
+        sha, size = _store_body(iter(lambda: f.read(1 << 20), b""))
+    mtime = datetime.fromtimestamp(os.path.getmtime(path), timezone.utc)
+    _write_meta({"url": url, "status": 200, "headers": {}, "sha256": sha,
+                 "size": size,
+                 "fetched_at": mtime.isoformat(timespec="seconds"),
+                 "validated_at": None, "adopted_from": path})
+    return True
+
+
+def fetch(url: str, headers: dict | None = None,
+          bucket: TokenBucket | None = None, retries: int = 4,
+          timeout: float = 60) -> CachedResponse:
+    """GET url through the cache (see module docstring for the modes).
+
+    Network errors are not raised: they come back as status -1 with the
+    message in .reason, and .text.
+    """
+    meta = _read_meta(url)
+    current = mode()
+    if meta is not None and current != "refresh":
+        _count("hit")
+        return _from_meta(meta, from_cache=True)
+    if current == "offline":
+        _count("miss")
+        return CachedResponse(url, 504, reason="not in HTTP cache (offline)")
+
+    request_headers = dict(headers or {})
+    if meta is not None:
+        if meta["headers"].get("etag"):
+            request_headers["If-None-Match"] = meta["headers"]["etag"]
+        if meta["headers"].get("last-modified"):
+            request_headers["If-Modified-Since"] = meta["headers"]["last-modified"]
+
+    try:
+        r = get(url, bucket, retries=retries, timeout=timeout, stream=True,
+                headers=request_headers)
+    except Exception as e:
+        return CachedResponse(url, -1, reason=str(e))
+
+    with r:
+        if r.status_code == 304 and meta is not None:
+            meta["validated_at"] = _now()
+            _write_meta(meta)
+            _count("revalidated")
+            return _from_meta(meta, from_cache=True)
+        if r.status_code != 200:
+            return CachedResponse(url, r.status_code,
+                                  {k.lower(): v for k, v in r.headers.items()},
+                                  reason=r.text[:500])
+        sha, size = _store_body(r.iter_content(1 << 20))
+        kept = {k: r.headers[k] for k in KEPT_HEADERS if k in r.headers}
+        now = _now()
+        meta = {"url": url, "status": 200, "headers": kept, "sha256": sha,
+                "size": size, "fetched_at": now, "validated_at": now}
+    _write_meta(meta)
+    _count("downloaded")
+    return _from_meta(meta, from_cache=False)
@@ -0,0 +1,111 @@
+"""Small concurrent HTTP fetch engine shared by the external-data fetchers.
+
+The fetch_* scripts used to issue their requests one at a time with a fixed
+time.sleep between them. This module runs them on a thread pool instead,
+with
+
+    - a concurrency cap (max_workers),
+    - a token-bucket rate limit shared by all workers, so the request rate
+      stays polite no matter how many threads are running,
+    - retry with exponential backoff (plus jitter) on connection errors,
+      timeouts, HTTP 429 and 5xx, honouring Retry-After when it is given.
+
+Results come back in job order, so the outputs of a parallel run are the
+same as a serial one. Base URLs are owned by the callers and can be
+pointed at a local stand-in server (e.g. `python -m http.server` over a
+directory of recorded responses).
+"""
+
+from __future__ import annotations
+
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+RETRY_STATUS = {429, 500, 502, 503, 504}
+
+
+class TokenBucket:
+    """Thread-safe token bucket: `rate` tokens per second, at most `burst`
+    banked. acquire() blocks until a token is available."""
+
+    def __init__(self, rate: float, burst: int | None = None):
+        self.rate = float(rate)
+        self.capacity = float(burst if burst is not None else max(1, rate))
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        if self.rate <= 0:
+            return
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity,
+                                  self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+_local = threading.local()
+
+
+def session() -> requests.Session:
+    """One requests.Session per thread (connection reuse without sharing a
+    Session across threads)."""
+    if not hasattr(_local, "session"):
+        _local.session = requests.Session()
+    return _local.session
+
+
+def _retry_after(response) -> float | None:
+    try:
+        return float(response.headers.get("Retry-After", ""))
+    except ValueError:
+        return None
+
+
+def get(url: str, bucket: TokenBucket | None = None, retries: int = 4,
+        backoff: float = 0.5, timeout: float = 60, **kwargs):
+    """GET url with rate limiting and retries.
+
+    Returns the last response (which may be a non-retryable error such as
+    404; callers check status_code). Raises the last exception if every
+    attempt failed without a response. kwargs go to Session.get (e.g.
+    stream=True, headers=...).
+    """
+    for attempt in range(retries + 1):
+        if bucket is not None:
+            bucket.acquire()
+        try:
+            r = session().get(url, timeout=timeout, **kwargs)
+        except (requests.ConnectionError, requests.Timeout):
+            if attempt == retries:
+                raise
+            delay = None
+        else:
+            if r.status_code not in RETRY_STATUS or attempt == retries:
+                return r
+            delay = _retry_after(r)
+            r.close()
+        if delay is None:
+            delay = backoff * 2 ** attempt * (1 + random.random())
+        time.sleep(delay)
+
+
+def run_parallel(fn, jobs, max_workers: int = 8):
+    """[fn(*job) for job in jobs], run on up to max_workers threads; results
+    are in job order."""
+    jobs = list(jobs)
+    if max_workers <= 1 or len(jobs) <= 1:
+        return [fn(*job) for job in jobs]
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        return list(pool.map(lambda job: fn(*job), jobs))
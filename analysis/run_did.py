@@ -23,22 +23,59 @@ Robustness:
 Permutation inference:
     - Randomize treatment assignment among never-treated states; recompute
       simple ATT 200 times; report fraction of placebos exceeding |observed|.
+
+Every specification (and the permutation draws) is an independent Spec;
+run_specs fits them across a process pool and the outputs are assembled
+afterwards, so both panels run at once. Each spec carries its own fixed
+seed (CS_SEED, PERM_SEED), so results are identical to a serial run
+(--workers 1). run_did_all.py runs this sweep together with the QCEW and
+SUSB runners in one pool.
+
+Every fit (CS, TWFE, event study, permutation draws) is memoized on disk
+under data/did_cache, keyed by the content hash of the panel it is given
+plus its outcome, control group, bootstrap iterations and seed (see
+memoized). Rerunning after a change that does not touch the panels or the
+estimation code — a doc edit, an output-format tweak — costs zero model
+fits. DID_CACHE_MODE=refit refits and overwrites the cached results;
+DID_CACHE_DIR moves the cache.
+
+DID_CS_ENGINE=native fits CS with the in-repo array estimator (cs_did.py)
+instead of `differences`: same point estimates (validated against R `did`),
+bootstrap standard errors from one batched draw matrix shared by all
+aggregations, and a full fit in milliseconds even at DID_BOOT=10000 —
+meant for large sensitivity sweeps. The default stays
+`differences`, which produced the published tables.
+
+Usage:
+    python analysis/run_did.py [--workers N]
 """
 
 from __future__ import annotations
 
+import argparse
+import functools
+import hashlib
 import math
 import os
-from dataclasses import dataclass
+import pickle
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from typing import Callable
 
 import matplotlib
 matplotlib.use("Agg")
 import matplotlib.pyplot as plt
 import numpy as np
 import pandas as pd
+import statsmodels
 import statsmodels.formula.api as smf
+import differences
 from differences import ATTgt
 
+import cs_did
+
 BASE = os.path.dirname(os.path.abspath(__file__))
 
 PANELS = {
@@ -53,26 +90,90 @@ OUTCOMES = {
 }
 
 ALPHA = 0.05
-BOOT = 999  # bootstrap iterations for cluster-robust inference
+# Bootstrap iterations for cluster-robust inference (DID_BOOT overrides;
+# with DID_CS_ENGINE=native 10,000+ draws cost well under a second).
+BOOT = int(os.environ.get("DID_BOOT", 999))
+CS_SEED = 42  # bootstrap seed of every CS fit
+PERM_SEED = 13  # placebo-assignment seed of permutation inference
+PERM_ITER = 200
+
+# Memoized fits (see memoized). Bump CACHE_VERSION whenever a memoized
+# function's output changes for the same inputs.
+CACHE_DIR = os.environ.get("DID_CACHE_DIR",
+                           os.path.join(BASE, "..", "data", "did_cache"))
+CACHE_VERSION = 6
 
 
 # ------------------------- helpers -------------------------
 
+def _panel_hash(df: pd.DataFrame) -> str:
+    """SHA-256 of a panel's content (column names, dtypes and values)."""
+    digest = hashlib.sha256()
+    digest.update(repr(list(zip(df.columns, map(str, df.dtypes)))).encode())
+    digest.update(pd.util.hash_pandas_object(df, index=False).to_numpy().tobytes())
+    return digest.hexdigest()
+
+
+def memoized(fn):
+    """Memoize fn(df, *args, **kwargs) on disk under CACHE_DIR.
+
+    The key is the content hash of df plus fn's name, its other arguments,
+    the module-level estimation settings (BOOT, ALPHA), the `differences`
+    and statsmodels versions and CACHE_VERSION, so an edited panel or a
+    changed setting is refit while an unchanged one is read back. The result
+    must be picklable without this module (plain pandas / numpy / builtins),
+    since the cache is shared by every runner and worker process.
+    """
+    @functools.wraps(fn)
+    def wrapper(df, *args, **kwargs):
+        params = (fn.__name__, args, sorted(kwargs.items()), BOOT, ALPHA,
+                  differences.__version__, statsmodels.__version__,
+                  CACHE_VERSION)
+        key = hashlib.sha256(
+            (_panel_hash(df) + repr(params)).encode()).hexdigest()
+        path = os.path.join(CACHE_DIR, f"{fn.__name__}_{key[:32]}.pkl")
+        if os.environ.get("DID_CACHE_MODE") != "refit" and os.path.exists(path):
+            try:
+                with open(path, "rb") as f:
+                    return pickle.load(f)
+            except (OSError, EOFError, pickle.UnpicklingError):
+                pass  # unreadable entry: refit and overwrite it
+        result = fn(df, *args, **kwargs)
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=CACHE_DIR, suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            pickle.dump(result, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, path)
+        return result
+    return wrapper
+
+
 @dataclass
 class CSFit:
     overall: pd.DataFrame
     event: pd.DataFrame
     cohort: pd.DataFrame
     raw_gt: pd.DataFrame  # group-time ATTs (pre-aggregation)
+    # Influence functions of the group-time ATTs (one row per state, one
+    # column per raw_gt row). Native engine only: `differences` has no
+    # public accessor for them.
+    gt_influence: np.ndarray | None = None
 
 
-def fit_cs(df: pd.DataFrame, outcome: str, control_group: str) -> CSFit:
-    """Fit Callaway-Sant'Anna group-time ATT and return aggregations.
+@memoized
+def _fit_cs_parts(df: pd.DataFrame, outcome: str, control_group: str,
+                  seed: int, engine: str = "differences") -> dict:
+    """The fit behind fit_cs, as plain frames so it can be memoized.
 
-    Inference is from the wild bootstrap inside `differences` (the package
-    bootstraps over the entity dimension by default, which is the
-    state-level cluster we want).
+    ATTgt is fitted once; the three aggregations reuse its group-time ATTs
+    and influence functions, and with the same seed they all draw the same
+    bootstrap multiplier matrix.
     """
+    if engine == "native":
+        return cs_did.fit(df, outcome, control_group, BOOT, seed, ALPHA)
+    if engine != "differences":
+        raise ValueError(f"unknown CS engine {engine!r}; "
+                         f"expected 'differences' or 'native'")
     d = df.copy()
     # `differences` requires NaN (not 0) for never-treated cohorts.
     d["cohort"] = d["cohort"].replace(0, np.nan)
@@ -82,28 +183,36 @@ def fit_cs(df: pd.DataFrame, outcome: str, control_group: str) -> CSFit:
         formula=outcome,
         control_group=control_group,
         boot_iterations=BOOT,
-        random_state=42,
+        random_state=seed,
         progress_bar=False,
     )
-    overall = model.aggregate(
-        type_of_aggregation="simple",
-        boot_iterations=BOOT,
-        random_state=42,
-    )
-    event = model.aggregate(
-        type_of_aggregation="event",
-        boot_iterations=BOOT,
-        random_state=42,
-    )
-    cohort = model.aggregate(
-        type_of_aggregation="cohort",
-        boot_iterations=BOOT,
-        random_state=42,
-    )
-    raw_gt = model.results.copy() if isinstance(model.results, pd.DataFrame) else pd.DataFrame()
-    return CSFit(overall=overall, event=event, cohort=cohort, raw_gt=raw_gt)
+    parts = {
+        agg_name: model.aggregate(
+            type_of_aggregation=agg,
+            boot_iterations=BOOT,
+            random_state=seed,
+        )
+        for agg_name, agg in (("overall", "simple"), ("event", "event"),
+                              ("cohort", "cohort"))
+    }
+    parts["raw_gt"] = model.results()
+    return parts
+
+
+def fit_cs(df: pd.DataFrame, outcome: str, control_group: str,
+           seed: int = CS_SEED) -> CSFit:
+    """Fit Callaway-Sant'Anna group-time ATT and return aggregations.
+
+    Inference is from the wild bootstrap inside `differences` (the package
+    bootstraps over the entity dimension by default, which is the
+    state-level cluster we want), or from cs_did with DID_CS_ENGINE=native.
+    Memoized on disk (see memoized).
+    """
+    engine = os.environ.get("DID_CS_ENGINE", "differences")
+    return CSFit(**_fit_cs_parts(df, outcome, control_group, seed, engine))
 
 
+@memoized
 def fit_twfe(df: pd.DataFrame, outcome: str) -> dict:
     """Two-way fixed effects with state + year FE, treatment dummy, clustered SE."""
     formula = f"{outcome} ~ treated + C(state) + C(year)"
@@ -121,6 +230,7 @@ def fit_twfe(df: pd.DataFrame, outcome: str) -> dict:
     }
 
 
+@memoized
 def event_study_twfe(df: pd.DataFrame, outcome: str,
                       lead_max: int = 4, lag_max: int = 5) -> pd.DataFrame:
     """TWFE event study with leads/lags (used for the dynamic plot beside CS).
@@ -158,46 +268,117 @@ def event_study_twfe(df: pd.DataFrame, outcome: str,
     return pd.DataFrame(rows).sort_values("event_time").reset_index(drop=True)
 
 
-def permutation_inference(df: pd.DataFrame, outcome: str, observed: float,
-                           n_iter: int = 200, seed: int = 13) -> dict:
-    """Randomize treatment among never-treated states; recompute TWFE ATT."""
+def placebo_cohorts(df: pd.DataFrame, n_iter: int = PERM_ITER,
+                    seed: int = PERM_SEED) -> tuple[list, np.ndarray]:
+    """Placebo treatment assignments among never-treated states.
+
+    Each draw gives the real cohort pattern (how many states adopted in
+    each year) to randomly chosen never-treated states. Returns the
+    never-treated states and an (n_iter x states) array of their placebo
+    cohorts (0 = untreated). The draws are the same PERM_SEED stream the
+    original per-draw loop used.
+    """
     rng = np.random.default_rng(seed)
     real_treated = df.loc[df["cohort"] != 0, ["state", "cohort"]].drop_duplicates()
     cohort_pattern = real_treated["cohort"].value_counts().to_dict()
     never_treated_states = sorted(df.loc[df["cohort"] == 0, "state"].unique())
-    placebo_atts = []
-    for _ in range(n_iter):
-        sampled = rng.choice(never_treated_states,
-                             size=sum(cohort_pattern.values()),
+    pattern = np.repeat(np.array(list(cohort_pattern), dtype=int),
+                        list(cohort_pattern.values()))
+    cohorts = np.zeros((n_iter, len(never_treated_states)), dtype=int)
+    for i in range(n_iter):
+        sampled = rng.choice(len(never_treated_states), size=len(pattern),
                              replace=False)
-        assignment = {}
-        i = 0
-        for cohort_year, n in cohort_pattern.items():
-            for _ in range(n):
-                assignment[sampled[i]] = int(cohort_year)
-                i += 1
-        d = df.copy()
-        # Wipe real treatment
-        d = d[~d["state"].isin(real_treated["state"])].copy()
-        d["cohort_p"] = d["state"].map(assignment).fillna(0).astype(int)
-        d["treated_p"] = ((d["cohort_p"] != 0)
-                           & (d["year"] >= d["cohort_p"])).astype(int)
+        cohorts[i, sampled] = pattern
+    return never_treated_states, cohorts
+
+
+def _demean_two_way(x: np.ndarray) -> np.ndarray:
+    """Sweep state and year means out of (... x states x years) arrays —
+    the state + year fixed effects of a balanced panel."""
+    return (x - x.mean(axis=-1, keepdims=True) - x.mean(axis=-2, keepdims=True)
+            + x.mean(axis=(-2, -1), keepdims=True))
+
+
+@memoized
+def placebo_atts(df: pd.DataFrame, outcome: str, n_iter: int = PERM_ITER,
+                 seed: int = PERM_SEED, chunk_size: int = 2048) -> np.ndarray:
+    """Randomize treatment among never-treated states; recompute TWFE ATT.
+
+    Returns the placebo ATTs of the fits that succeeded. Independent of the
+    observed estimate, so it runs as its own spec next to the CS fits.
+
+    Only the treatment column changes between draws, so by
+    Frisch-Waugh-Lovell each placebo TWFE coefficient is
+    <D~, y~> / <D~, D~> with y~ and D~ the two-way-demeaned outcome and
+    placebo treatment. y~ is computed once and the placebo treatments are
+    demeaned and projected chunk_size draws at a time, so 100,000 draws
+    take seconds. Panels that are not balanced fall back to one OLS per
+    draw.
+    """
+    states, cohorts = placebo_cohorts(df, n_iter, seed)
+    d = df[df["state"].isin(states)]
+    wide = d.pivot(index="state", columns="year", values=outcome).reindex(states)
+    if wide.isna().to_numpy().any():
+        return _placebo_atts_ols(d, outcome, states, cohorts)
+    years = wide.columns.to_numpy()
+    y = _demean_two_way(wide.to_numpy(dtype=float)).ravel()
+
+    atts = np.empty(n_iter)
+    for lo in range(0, n_iter, chunk_size):
+        c = cohorts[lo:lo + chunk_size, :, None]
+        treat = _demean_two_way(((c != 0) & (years >= c)).astype(float))
+        treat = treat.reshape(len(treat), -1)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            atts[lo:lo + chunk_size] = (treat @ y) / np.einsum("ij,ij->i",
+                                                                treat, treat)
+    return atts[np.isfinite(atts)]
+
+
+def _placebo_atts_ols(d: pd.DataFrame, outcome: str, states: list,
+                      cohorts: np.ndarray) -> np.ndarray:
+    """placebo_atts for unbalanced panels: one TWFE OLS per draw."""
+    atts = []
+    for row in cohorts:
+        p = d.copy()
+        p["cohort_p"] = p["state"].map(dict(zip(states, row)))
+        p["treated_p"] = ((p["cohort_p"] != 0)
+                           & (p["year"] >= p["cohort_p"])).astype(int)
         try:
-            res = smf.ols(f"{outcome} ~ treated_p + C(state) + C(year)", data=d).fit()
-            placebo_atts.append(float(res.params["treated_p"]))
+            res = smf.ols(f"{outcome} ~ treated_p + C(state) + C(year)", data=p).fit()
+            atts.append(float(res.params["treated_p"]))
         except Exception:
-            placebo_atts.append(np.nan)
-    placebo_atts = np.array([x for x in placebo_atts if not np.isnan(x)])
-    p_two_sided = float(np.mean(np.abs(placebo_atts) >= abs(observed)))
+            atts.append(np.nan)
+    return np.array([x for x in atts if not np.isnan(x)])
+
+
+def permutation_summary(placebos: np.ndarray, observed: float) -> dict:
+    """Two-sided permutation p-value of observed against placebo ATTs."""
+    p_two_sided = float(np.mean(np.abs(placebos) >= abs(observed)))
     return {
         "observed_att": observed,
-        "placebo_mean": float(np.mean(placebo_atts)),
-        "placebo_sd": float(np.std(placebo_atts)),
+        "placebo_mean": float(np.mean(placebos)),
+        "placebo_sd": float(np.std(placebos)),
         "two_sided_p": p_two_sided,
-        "n_placebos": int(len(placebo_atts)),
+        "n_placebos": int(len(placebos)),
     }
 
 
+def permutation_inference(df: pd.DataFrame, outcome: str, observed: float,
+                           n_iter: int = PERM_ITER, seed: int = PERM_SEED) -> dict:
+    """Randomize treatment among never-treated states; recompute TWFE ATT."""
+    return permutation_summary(placebo_atts(df, outcome, n_iter, seed), observed)
+
+
+def permutation_row(perm: dict, spec: str, outcome: str) -> dict:
+    """Robustness-table row for a permutation_summary result."""
+    return {"spec": spec,
+            "outcome": outcome,
+            "coef": perm["observed_att"],
+            "se": perm["placebo_sd"],
+            "ci_lo": np.nan, "ci_hi": np.nan,
+            "pval": perm["two_sided_p"], "n_obs": perm["n_placebos"]}
+
+
 def flatten_attgt(df: pd.DataFrame) -> pd.DataFrame:
     """Reshape a `differences` aggregation result to plain DataFrame.
 
@@ -229,76 +410,138 @@ def attgt_aggrow(agg_result: pd.DataFrame, label: str) -> dict:
     }
 
 
+# ------------------------- spec executor -------------------------
+
+@dataclass(frozen=True)
+class Spec:
+    """One independent fit: fn(*args, **kwargs), stored under key.
+
+    fn must be a module-level function so it can be sent to a worker
+    process; any seed it uses is passed explicitly in kwargs.
+    """
+    key: tuple
+    label: str
+    fn: Callable
+    args: tuple
+    kwargs: dict = field(default_factory=dict)
+
+
+def run_specs(specs: list[Spec], workers: int | None = None) -> dict:
+    """Run specs across a process pool; returns {spec.key: result}.
+
+    Specs are independent, so the order they finish in does not matter;
+    with workers=1 they run serially in this process. Submit the slowest
+    specs first (the permutation draws) to keep the pool busy.
+    """
+    workers = min(workers or os.cpu_count() or 1, len(specs))
+    print(f"Running {len(specs)} specs on {workers} worker(s)")
+    t0 = time.perf_counter()
+    if workers <= 1:
+        results = {}
+        for spec in specs:
+            print(f"  {spec.label}")
+            results[spec.key] = spec.fn(*spec.args, **spec.kwargs)
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = {}
+            for spec in specs:
+                print(f"  {spec.label}")
+                futures[spec.key] = pool.submit(spec.fn, *spec.args, **spec.kwargs)
+            results = {key: f.result() for key, f in futures.items()}
+    print(f"  {len(specs)} specs done in {time.perf_counter() - t0:.1f}s")
+    return results
+
+
+def add_worker_argument(parser):
+    parser.add_argument("--workers", type=int, default=None,
+                        help="processes for the spec pool "
+                             "(default: all CPUs; 1 = serial)")
+
+
 # ------------------------- main per-panel pipeline -------------------------
 
-def run_panel(panel_name: str, panel_path: str):
-    print(f"\n{'='*70}\nRunning DiD on panel: {panel_name}\n{'='*70}")
+RUNNER = "cbp"
+
+
+def load_panel(panel_path: str) -> pd.DataFrame:
     df = pd.read_csv(os.path.join(BASE, panel_path))
     df["cohort"] = df["cohort"].astype(int)
+    return df
 
-    out_rows: list[dict] = []
-    rob_rows: list[dict] = []
-
-    # ----- Spec 1: CS, not-yet-treated, primary outcome -----
-    print("\n[1/8] CS not-yet-treated, primary outcome (rate per 1k estabs)")
-    cs_nyt = fit_cs(df, OUTCOMES["rate"], control_group="not_yet_treated")
-    out_rows.append({**attgt_aggrow(cs_nyt.overall, "CS: not-yet-treated (primary)"),
-                     "outcome": OUTCOMES["rate"]})
-
-    # ----- Spec 2: CS, never-treated -----
-    print("[2/8] CS never-treated")
-    cs_nt = fit_cs(df, OUTCOMES["rate"], control_group="never_treated")
-    out_rows.append({**attgt_aggrow(cs_nt.overall, "CS: never-treated"),
-                     "outcome": OUTCOMES["rate"]})
-
-    # ----- Spec 3: TWFE -----
-    print("[3/8] TWFE (biased under staggered adoption — for contrast only)")
-    twfe = fit_twfe(df, OUTCOMES["rate"])
-    out_rows.append({"spec": "TWFE (biased — contrast only)", "outcome": OUTCOMES["rate"],
-                     **twfe})
-
-    # ----- Spec 4: TWFE Event study -----
-    print("[4/8] TWFE event study (-4..+5)")
-    es_twfe = event_study_twfe(df, OUTCOMES["rate"])
-
-    # ----- Spec 5: Drop CA -----
-    print("[5/8] Robustness: drop California")
+
+def panel_specs(panel_name: str, df: pd.DataFrame) -> list[Spec]:
+    """The eight specifications plus permutation draws for one panel."""
+    rate = OUTCOMES["rate"]
     df_noca = df[df["state"] != "CA"].copy()
-    cs_noca = fit_cs(df_noca, OUTCOMES["rate"], control_group="not_yet_treated")
-    rob_rows.append({**attgt_aggrow(cs_noca.overall, "Drop CA"),
-                     "outcome": OUTCOMES["rate"]})
-
-    # ----- Spec 6: Outcome restricted to plans with positive employees -----
-    print("[6/8] Robustness: outcome = 401(k) with positive employees")
-    cs_emp = fit_cs(df, OUTCOMES["rate_with_emp"], control_group="not_yet_treated")
-    rob_rows.append({**attgt_aggrow(cs_emp.overall, "Outcome: 401(k) w/ employees"),
-                     "outcome": OUTCOMES["rate_with_emp"]})
-
-    # ----- Spec 7: Outcome = ESRP (any pension code, single-employer) -----
-    print("[7/8] Robustness: outcome = any ESRP (substitution test)")
-    cs_esrp = fit_cs(df, OUTCOMES["rate_esrp"], control_group="not_yet_treated")
-    rob_rows.append({**attgt_aggrow(cs_esrp.overall, "Outcome: any ESRP"),
-                     "outcome": OUTCOMES["rate_esrp"]})
-
-    # ----- Spec 8: Drop late-treatment states (ME, DE, NJ) -----
-    print("[8/8] Robustness: drop late-treatment states (ME, DE, NJ)")
-    df_nolate = df[~df["state"].isin(["ME", "DE", "NJ"])].copy()
     # If the state had cohort 2024, drop it; remaining cohorts retained.
-    cs_nolate = fit_cs(df_nolate, OUTCOMES["rate"], control_group="not_yet_treated")
-    rob_rows.append({**attgt_aggrow(cs_nolate.overall, "Drop late-treatment (ME/DE/NJ)"),
-                     "outcome": OUTCOMES["rate"]})
+    df_nolate = df[~df["state"].isin(["ME", "DE", "NJ"])].copy()
+    cs_seed = {"seed": CS_SEED}
+
+    def spec(name, label, fn, *args, **kwargs):
+        return Spec((RUNNER, panel_name, name), f"{panel_name}: {label}",
+                    fn, args, kwargs)
+
+    return [
+        spec("perm", f"Permutation inference ({PERM_ITER} iterations)",
+             placebo_atts, df, rate, n_iter=PERM_ITER, seed=PERM_SEED),
+        spec("cs_nyt", "[1/8] CS not-yet-treated, primary outcome "
+             "(rate per 1k estabs)",
+             fit_cs, df, rate, "not_yet_treated", **cs_seed),
+        spec("cs_nt", "[2/8] CS never-treated",
+             fit_cs, df, rate, "never_treated", **cs_seed),
+        spec("twfe", "[3/8] TWFE (biased under staggered adoption — "
+             "for contrast only)", fit_twfe, df, rate),
+        spec("es_twfe", "[4/8] TWFE event study (-4..+5)",
+             event_study_twfe, df, rate),
+        spec("drop_ca", "[5/8] Robustness: drop California",
+             fit_cs, df_noca, rate, "not_yet_treated", **cs_seed),
+        spec("with_emp", "[6/8] Robustness: outcome = 401(k) with positive "
+             "employees", fit_cs, df, OUTCOMES["rate_with_emp"],
+             "not_yet_treated", **cs_seed),
+        spec("esrp", "[7/8] Robustness: outcome = any ESRP (substitution test)",
+             fit_cs, df, OUTCOMES["rate_esrp"], "not_yet_treated", **cs_seed),
+        spec("drop_late", "[8/8] Robustness: drop late-treatment states "
+             "(ME, DE, NJ)", fit_cs, df_nolate, rate, "not_yet_treated",
+             **cs_seed),
+    ]
+
+
+def build_specs() -> list[Spec]:
+    return [s for name, path in PANELS.items()
+            for s in panel_specs(name, load_panel(path))]
+
+
+def write_panel(panel_name: str, results: dict):
+    """Assemble and persist one panel's outputs from run_specs results."""
+    def r(name):
+        return results[(RUNNER, panel_name, name)]
+
+    cs_nyt = r("cs_nyt")
+    es_twfe = r("es_twfe")
+
+    out_rows: list[dict] = [
+        {**attgt_aggrow(cs_nyt.overall, "CS: not-yet-treated (primary)"),
+         "outcome": OUTCOMES["rate"]},
+        {**attgt_aggrow(r("cs_nt").overall, "CS: never-treated"),
+         "outcome": OUTCOMES["rate"]},
+        {"spec": "TWFE (biased — contrast only)", "outcome": OUTCOMES["rate"],
+         **r("twfe")},
+    ]
+    rob_rows: list[dict] = [
+        {**attgt_aggrow(r("drop_ca").overall, "Drop CA"),
+         "outcome": OUTCOMES["rate"]},
+        {**attgt_aggrow(r("with_emp").overall, "Outcome: 401(k) w/ employees"),
+         "outcome": OUTCOMES["rate_with_emp"]},
+        {**attgt_aggrow(r("esrp").overall, "Outcome: any ESRP"),
+         "outcome": OUTCOMES["rate_esrp"]},
+        {**attgt_aggrow(r("drop_late").overall, "Drop late-treatment (ME/DE/NJ)"),
+         "outcome": OUTCOMES["rate"]},
+    ]
 
     # ----- Permutation inference on the primary CS estimate -----
-    print("Running permutation inference (200 iterations)...")
-    perm = permutation_inference(df, OUTCOMES["rate"],
-                                  observed=out_rows[0]["coef"],
-                                  n_iter=200)
-    rob_rows.append({"spec": "Permutation 2-sided p (200 iter)",
-                     "outcome": OUTCOMES["rate"],
-                     "coef": perm["observed_att"],
-                     "se": perm["placebo_sd"],
-                     "ci_lo": np.nan, "ci_hi": np.nan,
-                     "pval": perm["two_sided_p"], "n_obs": perm["n_placebos"]})
+    perm = permutation_summary(r("perm"), observed=out_rows[0]["coef"])
+    rob_rows.append(permutation_row(perm, f"Permutation 2-sided p ({PERM_ITER} iter)",
+                                    OUTCOMES["rate"]))
 
     # ----- Persist results -----
     pd.DataFrame(out_rows).to_csv(
@@ -341,6 +584,12 @@ def run_panel(panel_name: str, panel_path: str):
     }
 
 
+def run_panel(panel_name: str, panel_path: str, workers: int | None = None):
+    print(f"\n{'='*70}\nRunning DiD on panel: {panel_name}\n{'='*70}")
+    results = run_specs(panel_specs(panel_name, load_panel(panel_path)), workers)
+    return write_panel(panel_name, results)
+
+
 def plot_event_study(cs_event: pd.DataFrame, twfe_event: pd.DataFrame,
                       panel_name: str):
     fig, ax = plt.subplots(figsize=(9, 5.5))
@@ -377,10 +626,11 @@ def plot_event_study(cs_event: pd.DataFrame, twfe_event: pd.DataFrame,
     print(f"  Saved plot: {out}")
 
 
-def main():
+def write_outputs(results: dict) -> dict:
     summaries = {}
-    for name, path in PANELS.items():
-        summaries[name] = run_panel(name, path)
+    for name in PANELS:
+        print(f"\n{'='*70}\nDiD results for panel: {name}\n{'='*70}")
+        summaries[name] = write_panel(name, results)
 
     # ----- Final cross-panel summary table -----
     rows = []
@@ -397,6 +647,15 @@ def main():
     print("\n" + "=" * 70)
     print("DiD analysis complete. Outputs in analysis/.")
     print("=" * 70)
+    return summaries
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run all DiD specifications "
+                                                 "on both panels.")
+    add_worker_argument(parser)
+    args = parser.parse_args()
+    write_outputs(run_specs(build_specs(), args.workers))
 
 
 if __name__ == "__main__":
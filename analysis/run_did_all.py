@@ -0,0 +1,40 @@
+"""Run the full DiD sweep — CBP (run_did.py), QCEW (run_did_qcew.py) and
+SUSB (run_did_susb.py) denominators — in one process pool.
+
+Every specification of every runner and panel is independent, so they are
+all submitted to a single run_did.run_specs pool and each runner's outputs
+are then written exactly as its own main() would write them. With enough
+workers the sweep takes about as long as its slowest spec. Seeds are fixed
+per spec, so the outputs match running the three scripts serially.
+
+Usage:
+    python analysis/run_did_all.py [--workers N]
+"""
+
+from __future__ import annotations
+
+import argparse
+
+import run_did
+import run_did_qcew
+import run_did_susb
+
+RUNNERS = (run_did, run_did_qcew, run_did_susb)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the CBP, QCEW and SUSB "
+                                                 "DiD sweeps in one pool.")
+    run_did.add_worker_argument(parser)
+    args = parser.parse_args()
+
+    specs = [spec for runner in RUNNERS for spec in runner.build_specs()]
+    # Slowest first: the permutation draws, then everything else in order.
+    specs.sort(key=lambda spec: spec.fn is not run_did.placebo_atts)
+    results = run_did.run_specs(specs, args.workers)
+    for runner in RUNNERS:
+        runner.write_outputs(results)
+
+
+if __name__ == "__main__":
+    main()
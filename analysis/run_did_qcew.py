@@ -1,7 +1,7 @@
 """Run CS-DiD on the QCEW-denominated outcome.
 
 Reuses the helper functions in run_did.py (fit_cs, fit_twfe,
-permutation_inference, attgt_aggrow, flatten_attgt) so the QCEW results are
+placebo_atts / permutation_summary, attgt_aggrow) so the QCEW results are
 directly comparable to the CBP headline.
 
 Specifications mirror run_did.py:
@@ -26,22 +26,35 @@ The headline outcome (mirroring rate_per_1000_estabs in the CBP runner) is
 new_401k_per_1000_qcew_establishments — the same numerator (new 401(k) plan
 formations from Form 5500), divided by QCEW annual-average private
 establishments.
+
+Specs run across a process pool through run_did.run_specs, with the same
+fixed seeds as the serial run.
+
+Usage:
+    python analysis/run_did_qcew.py [--workers N]
 """
 
 from __future__ import annotations
 
+import argparse
 import os
 
-import numpy as np
 import pandas as pd
 
 # Reuse the existing CS / TWFE / permutation helpers.
 from run_did import (
+    CS_SEED,
+    PERM_ITER,
+    PERM_SEED,
+    Spec,
+    add_worker_argument,
     fit_cs,
     fit_twfe,
-    permutation_inference,
+    placebo_atts,
+    permutation_row,
+    permutation_summary,
     attgt_aggrow,
-    flatten_attgt,
+    run_specs,
 )
 
 BASE = os.path.dirname(os.path.abspath(__file__))
@@ -59,8 +72,10 @@ OUTCOMES = {
 }
 
 
-def run_panel(panel_name: str, panel_path: str):
-    print(f"\n{'='*70}\nRunning QCEW DiD on panel: {panel_name}\n{'='*70}")
+RUNNER = "qcew"
+
+
+def load_panel(panel_path: str) -> pd.DataFrame:
     df = pd.read_csv(os.path.join(BASE, panel_path))
     df["cohort"] = df["cohort"].astype(int)
 
@@ -70,58 +85,72 @@ def run_panel(panel_name: str, panel_path: str):
     df = df.dropna(subset=[OUTCOMES["rate"]])
     if len(df) != initial_n:
         print(f"  Dropped {initial_n - len(df)} rows with missing QCEW denominator")
+    return df
 
-    out_rows: list[dict] = []
-    rob_rows: list[dict] = []
 
-    print("\n[1/6] CS not-yet-treated (primary)")
-    cs_nyt = fit_cs(df, OUTCOMES["rate"], control_group="not_yet_treated")
-    out_rows.append({**attgt_aggrow(cs_nyt.overall, "CS: not-yet-treated (primary)"),
-                     "outcome": OUTCOMES["rate"]})
-
-    print("[2/6] CS never-treated")
-    cs_nt = fit_cs(df, OUTCOMES["rate"], control_group="never_treated")
-    out_rows.append({**attgt_aggrow(cs_nt.overall, "CS: never-treated"),
-                     "outcome": OUTCOMES["rate"]})
-
-    print("[3/6] TWFE (biased — for contrast only)")
-    twfe = fit_twfe(df, OUTCOMES["rate"])
-    out_rows.append({"spec": "TWFE (biased — contrast only)",
-                     "outcome": OUTCOMES["rate"], **twfe})
-
-    print("[4/6] Robustness: drop California")
+def panel_specs(panel_name: str, df: pd.DataFrame) -> list[Spec]:
+    rate = OUTCOMES["rate"]
     df_noca = df[df["state"] != "CA"].copy()
-    cs_noca = fit_cs(df_noca, OUTCOMES["rate"], control_group="not_yet_treated")
-    rob_rows.append({**attgt_aggrow(cs_noca.overall, "Drop CA"),
-                     "outcome": OUTCOMES["rate"]})
-
-    print("[5/6] Robustness: outcome = 401(k) with positive employees")
-    cs_emp = fit_cs(df, OUTCOMES["rate_with_emp"], control_group="not_yet_treated")
-    rob_rows.append({**attgt_aggrow(cs_emp.overall, "Outcome: 401(k) w/ employees"),
-                     "outcome": OUTCOMES["rate_with_emp"]})
-
-    print("[6/6] Robustness: drop late-treatment states (ME, DE, NJ)")
     df_nolate = df[~df["state"].isin(["ME", "DE", "NJ"])].copy()
-    cs_nolate = fit_cs(df_nolate, OUTCOMES["rate"], control_group="not_yet_treated")
-    rob_rows.append({**attgt_aggrow(cs_nolate.overall, "Drop late-treatment (ME/DE/NJ)"),
-                     "outcome": OUTCOMES["rate"]})
-
-    print("Robustness: outcome = any ESRP (substitution test)")
-    cs_esrp = fit_cs(df, OUTCOMES["rate_esrp"], control_group="not_yet_treated")
-    rob_rows.append({**attgt_aggrow(cs_esrp.overall, "Outcome: any ESRP"),
-                     "outcome": OUTCOMES["rate_esrp"]})
-
-    print("Permutation inference (200 iterations)...")
-    perm = permutation_inference(df, OUTCOMES["rate"],
-                                  observed=out_rows[0]["coef"],
-                                  n_iter=200)
-    rob_rows.append({"spec": "Permutation 2-sided p (200 iter)",
-                     "outcome": OUTCOMES["rate"],
-                     "coef": perm["observed_att"],
-                     "se": perm["placebo_sd"],
-                     "ci_lo": np.nan, "ci_hi": np.nan,
-                     "pval": perm["two_sided_p"],
-                     "n_obs": perm["n_placebos"]})
+    cs_seed = {"seed": CS_SEED}
+
+    def spec(name, label, fn, *args, **kwargs):
+        return Spec((RUNNER, panel_name, name), f"QCEW {panel_name}: {label}",
+                    fn, args, kwargs)
+
+    return [
+        spec("perm", f"Permutation inference ({PERM_ITER} iterations)",
+             placebo_atts, df, rate, n_iter=PERM_ITER, seed=PERM_SEED),
+        spec("cs_nyt", "[1/6] CS not-yet-treated (primary)",
+             fit_cs, df, rate, "not_yet_treated", **cs_seed),
+        spec("cs_nt", "[2/6] CS never-treated",
+             fit_cs, df, rate, "never_treated", **cs_seed),
+        spec("twfe", "[3/6] TWFE (biased — for contrast only)",
+             fit_twfe, df, rate),
+        spec("drop_ca", "[4/6] Robustness: drop California",
+             fit_cs, df_noca, rate, "not_yet_treated", **cs_seed),
+        spec("with_emp", "[5/6] Robustness: outcome = 401(k) with positive "
+             "employees", fit_cs, df, OUTCOMES["rate_with_emp"],
+             "not_yet_treated", **cs_seed),
+        spec("drop_late", "[6/6] Robustness: drop late-treatment states "
+             "(ME, DE, NJ)", fit_cs, df_nolate, rate, "not_yet_treated",
+             **cs_seed),
+        spec("esrp", "Robustness: outcome = any ESRP (substitution test)",
+             fit_cs, df, OUTCOMES["rate_esrp"], "not_yet_treated", **cs_seed),
+    ]
+
+
+def build_specs() -> list[Spec]:
+    return [s for name, path in PANELS.items()
+            for s in panel_specs(name, load_panel(path))]
+
+
+def write_panel(panel_name: str, results: dict):
+    def r(name):
+        return results[(RUNNER, panel_name, name)]
+
+    out_rows: list[dict] = [
+        {**attgt_aggrow(r("cs_nyt").overall, "CS: not-yet-treated (primary)"),
+         "outcome": OUTCOMES["rate"]},
+        {**attgt_aggrow(r("cs_nt").overall, "CS: never-treated"),
+         "outcome": OUTCOMES["rate"]},
+        {"spec": "TWFE (biased — contrast only)",
+         "outcome": OUTCOMES["rate"], **r("twfe")},
+    ]
+    rob_rows: list[dict] = [
+        {**attgt_aggrow(r("drop_ca").overall, "Drop CA"),
+         "outcome": OUTCOMES["rate"]},
+        {**attgt_aggrow(r("with_emp").overall, "Outcome: 401(k) w/ employees"),
+         "outcome": OUTCOMES["rate_with_emp"]},
+        {**attgt_aggrow(r("drop_late").overall, "Drop late-treatment (ME/DE/NJ)"),
+         "outcome": OUTCOMES["rate"]},
+        {**attgt_aggrow(r("esrp").overall, "Outcome: any ESRP"),
+         "outcome": OUTCOMES["rate_esrp"]},
+    ]
+
+    perm = permutation_summary(r("perm"), observed=out_rows[0]["coef"])
+    rob_rows.append(permutation_row(perm, f"Permutation 2-sided p ({PERM_ITER} iter)",
+                                    OUTCOMES["rate"]))
 
     pd.DataFrame(out_rows).to_csv(
         os.path.join(BASE, f"did_results_qcew_{panel_name}.csv"), index=False
@@ -139,10 +168,16 @@ def run_panel(panel_name: str, panel_path: str):
     }
 
 
-def main():
+def run_panel(panel_name: str, panel_path: str, workers: int | None = None):
+    print(f"\n{'='*70}\nRunning QCEW DiD on panel: {panel_name}\n{'='*70}")
+    results = run_specs(panel_specs(panel_name, load_panel(panel_path)), workers)
+    return write_panel(panel_name, results)
+
+
+def write_outputs(results: dict) -> dict:
     summaries = {}
-    for name, path in PANELS.items():
-        summaries[name] = run_panel(name, path)
+    for name in PANELS:
+        summaries[name] = write_panel(name, results)
 
     print("\n" + "=" * 70)
     print("QCEW DiD complete. Summary:")
@@ -157,6 +192,15 @@ def main():
         print(f"  Drop CA: ATT={drop_ca['coef']:.3f}, "
               f"95% CI=[{drop_ca['ci_lo']:.3f}, {drop_ca['ci_hi']:.3f}]")
         print(f"  Permutation 2-sided p: {s['perm']['two_sided_p']:.4f}")
+    return summaries
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run CS-DiD on the "
+                                                 "QCEW-denominated outcome.")
+    add_worker_argument(parser)
+    args = parser.parse_args()
+    write_outputs(run_specs(build_specs(), args.workers))
 
 
 if __name__ == "__main__":
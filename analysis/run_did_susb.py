@@ -8,32 +8,45 @@ For each panel (v1-inclusive, v2-conservative) the same Callaway-Sant'Anna
 specification is fit on both denominators, plus robustness checks
 (drop-CA, with-employees outcome, drop late-treatment).
 
-The helpers (fit_cs, fit_twfe, permutation_inference, flatten_attgt,
+The helpers (fit_cs, fit_twfe, placebo_atts / permutation_summary,
 attgt_aggrow) are imported from run_did to keep the spec exactly aligned.
 
 Outputs (per panel):
     analysis/did_results_susb_<panel>.csv
     analysis/did_robustness_susb_<panel>.csv
+
+Specs for both outcomes and both panels run across a process pool through
+run_did.run_specs, with the same fixed seeds as the serial run.
+
+Usage:
+    python analysis/run_did_susb.py [--workers N]
 """
 
 from __future__ import annotations
 
+import argparse
 import os
 import sys
 
-import numpy as np
 import pandas as pd
 
 # Import helpers from the existing CBP runner so the methodology is
 # identical (same bootstrap iterations, same control_group conventions, same
 # random seeds for permutation inference).
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
-from run_did import (
+from run_did import (  # noqa: E402
+    CS_SEED,
+    PERM_ITER,
+    PERM_SEED,
+    Spec,
+    add_worker_argument,
     fit_cs,
     fit_twfe,
-    permutation_inference,
+    placebo_atts,
+    permutation_row,
+    permutation_summary,
     attgt_aggrow,
-    flatten_attgt,
+    run_specs,
 )
 
 BASE = os.path.dirname(os.path.abspath(__file__))
@@ -55,83 +68,107 @@ WITH_EMP_OUTCOMES = {
 }
 
 
-def run_one_outcome(df: pd.DataFrame, outcome_label: str, outcome_col: str,
-                     panel_name: str) -> tuple[list, list, dict]:
-    """Run CS primary, CS never-treated, TWFE, and robustness for one outcome.
+RUNNER = "susb"
 
-    Returns (out_rows, rob_rows, primary_dict).
-    """
-    out_rows: list[dict] = []
-    rob_rows: list[dict] = []
-
-    print(f"  CS not-yet-treated, primary ({outcome_col})")
-    cs_nyt = fit_cs(df, outcome_col, control_group="not_yet_treated")
-    primary = {**attgt_aggrow(cs_nyt.overall, f"CS: not-yet-treated ({outcome_label})"),
-                "outcome": outcome_col}
-    out_rows.append(primary)
-
-    print(f"  CS never-treated ({outcome_col})")
-    cs_nt = fit_cs(df, outcome_col, control_group="never_treated")
-    out_rows.append({**attgt_aggrow(cs_nt.overall, f"CS: never-treated ({outcome_label})"),
-                      "outcome": outcome_col})
-
-    print(f"  TWFE ({outcome_col})")
-    twfe = fit_twfe(df, outcome_col)
-    out_rows.append({"spec": f"TWFE biased ({outcome_label})", "outcome": outcome_col,
-                      **twfe})
-
-    # Robustness 1: drop CA
-    print(f"  Drop CA ({outcome_col})")
-    df_noca = df[df["state"] != "CA"].copy()
-    cs_noca = fit_cs(df_noca, outcome_col, control_group="not_yet_treated")
-    rob_rows.append({**attgt_aggrow(cs_noca.overall, f"Drop CA ({outcome_label})"),
-                      "outcome": outcome_col})
 
+def outcome_specs(df: pd.DataFrame, outcome_label: str, outcome_col: str,
+                  panel_name: str) -> list[Spec]:
+    """CS primary, CS never-treated, TWFE, robustness and permutation draws
+    for one outcome."""
+    df_noca = df[df["state"] != "CA"].copy()
+    df_nolate = df[~df["state"].isin(["ME", "DE", "NJ"])].copy()
+    cs_seed = {"seed": CS_SEED}
+
+    def spec(name, label, fn, *args, **kwargs):
+        return Spec((RUNNER, panel_name, outcome_label, name),
+                    f"SUSB {panel_name}: {label}", fn, args, kwargs)
+
+    specs = [
+        spec("perm", f"Permutation inference ({PERM_ITER} iter, {outcome_col})",
+             placebo_atts, df, outcome_col, n_iter=PERM_ITER, seed=PERM_SEED),
+        spec("cs_nyt", f"CS not-yet-treated, primary ({outcome_col})",
+             fit_cs, df, outcome_col, "not_yet_treated", **cs_seed),
+        spec("cs_nt", f"CS never-treated ({outcome_col})",
+             fit_cs, df, outcome_col, "never_treated", **cs_seed),
+        spec("twfe", f"TWFE ({outcome_col})", fit_twfe, df, outcome_col),
+        # Robustness 1: drop CA
+        spec("drop_ca", f"Drop CA ({outcome_col})",
+             fit_cs, df_noca, outcome_col, "not_yet_treated", **cs_seed),
+    ]
     # Robustness 2: with-employees outcome on same denominator
     we_outcome = WITH_EMP_OUTCOMES.get(outcome_label)
     if we_outcome and we_outcome in df.columns:
-        print(f"  With-employees ({we_outcome})")
-        cs_we = fit_cs(df, we_outcome, control_group="not_yet_treated")
-        rob_rows.append({**attgt_aggrow(cs_we.overall,
-                                          f"With-employees ({outcome_label})"),
-                          "outcome": we_outcome})
-
+        specs.append(spec("with_emp", f"With-employees ({we_outcome})",
+                          fit_cs, df, we_outcome, "not_yet_treated", **cs_seed))
     # Robustness 3: drop late-treatment cohort (ME, DE, NJ)
-    print(f"  Drop late-treatment ME/DE/NJ ({outcome_col})")
-    df_nolate = df[~df["state"].isin(["ME", "DE", "NJ"])].copy()
-    cs_nolate = fit_cs(df_nolate, outcome_col, control_group="not_yet_treated")
-    rob_rows.append({**attgt_aggrow(cs_nolate.overall,
-                                      f"Drop late-treatment ME/DE/NJ ({outcome_label})"),
-                      "outcome": outcome_col})
+    specs.append(spec("drop_late", f"Drop late-treatment ME/DE/NJ ({outcome_col})",
+                      fit_cs, df_nolate, outcome_col, "not_yet_treated",
+                      **cs_seed))
+    return specs
+
+
+def outcome_rows(results: dict, outcome_label: str, outcome_col: str,
+                 panel_name: str) -> tuple[list, list, dict]:
+    """Result rows for one outcome from run_specs results.
+
+    Returns (out_rows, rob_rows, primary_dict).
+    """
+    def r(name):
+        return results.get((RUNNER, panel_name, outcome_label, name))
+
+    primary = {**attgt_aggrow(r("cs_nyt").overall,
+                              f"CS: not-yet-treated ({outcome_label})"),
+               "outcome": outcome_col}
+    out_rows: list[dict] = [
+        primary,
+        {**attgt_aggrow(r("cs_nt").overall, f"CS: never-treated ({outcome_label})"),
+         "outcome": outcome_col},
+        {"spec": f"TWFE biased ({outcome_label})", "outcome": outcome_col,
+         **r("twfe")},
+    ]
+    rob_rows: list[dict] = [
+        {**attgt_aggrow(r("drop_ca").overall, f"Drop CA ({outcome_label})"),
+         "outcome": outcome_col},
+    ]
+    if r("with_emp") is not None:
+        rob_rows.append({**attgt_aggrow(r("with_emp").overall,
+                                        f"With-employees ({outcome_label})"),
+                         "outcome": WITH_EMP_OUTCOMES[outcome_label]})
+    rob_rows.append({**attgt_aggrow(r("drop_late").overall,
+                                    f"Drop late-treatment ME/DE/NJ ({outcome_label})"),
+                     "outcome": outcome_col})
 
     # Permutation inference (200 iter) on primary
-    print(f"  Permutation inference (200 iter, {outcome_col})")
-    perm = permutation_inference(df, outcome_col,
-                                  observed=primary["coef"],
-                                  n_iter=200)
-    rob_rows.append({"spec": f"Permutation 2-sided p ({outcome_label})",
-                      "outcome": outcome_col,
-                      "coef": perm["observed_att"],
-                      "se": perm["placebo_sd"],
-                      "ci_lo": np.nan, "ci_hi": np.nan,
-                      "pval": perm["two_sided_p"], "n_obs": perm["n_placebos"]})
+    perm = permutation_summary(r("perm"), observed=primary["coef"])
+    rob_rows.append(permutation_row(perm, f"Permutation 2-sided p ({outcome_label})",
+                                    outcome_col))
 
     return out_rows, rob_rows, {**primary, "perm_p": perm["two_sided_p"]}
 
 
-def run_panel(panel_name: str, panel_path: str):
-    print(f"\n{'='*70}\nSUSB DiD on panel: {panel_name}\n{'='*70}")
+def load_panel(panel_path: str) -> pd.DataFrame:
     df = pd.read_csv(os.path.join(BASE, panel_path))
     df["cohort"] = df["cohort"].astype(int)
+    return df
+
+
+def build_specs() -> list[Spec]:
+    specs = []
+    for panel_name, path in PANELS.items():
+        df = load_panel(path)
+        for outcome_label, outcome_col in SUSB_OUTCOMES.items():
+            specs += outcome_specs(df, outcome_label, outcome_col, panel_name)
+    return specs
 
+
+def write_panel(panel_name: str, results: dict):
     all_out: list[dict] = []
     all_rob: list[dict] = []
 
     summaries: dict[str, dict] = {}
     for outcome_label, outcome_col in SUSB_OUTCOMES.items():
-        print(f"\n--- Outcome: {outcome_label} ({outcome_col}) ---")
-        out_rows, rob_rows, summary = run_one_outcome(
-            df, outcome_label, outcome_col, panel_name
+        out_rows, rob_rows, summary = outcome_rows(
+            results, outcome_label, outcome_col, panel_name
         )
         all_out.extend(out_rows)
         all_rob.extend(rob_rows)
@@ -149,10 +186,10 @@ def run_panel(panel_name: str, panel_path: str):
     return summaries
 
 
-def main():
+def write_outputs(results: dict) -> dict:
     cross_panel: dict[str, dict] = {}
-    for name, path in PANELS.items():
-        cross_panel[name] = run_panel(name, path)
+    for name in PANELS:
+        cross_panel[name] = write_panel(name, results)
 
     # Cross-panel summary
     print("\n" + "=" * 70)
@@ -178,6 +215,15 @@ def main():
     pd.DataFrame(rows).to_csv(
         os.path.join(BASE, "did_susb_summary.csv"), index=False
     )
+    return cross_panel
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run CS-DiD on the "
+                                                 "SUSB-denominator panels.")
+    add_worker_argument(parser)
+    args = parser.parse_args()
+    write_outputs(run_specs(build_specs(), args.workers))
 
 
 if __name__ == "__main__":
@@ -1,42 +1,36 @@
 # Build both dataset versions
 # v1-inclusive: legislation/regulation dates (more firms)
 # v2-conservative: program launch dates (fewer firms, more defensible)
-# Usage: python build_both.py
-
+# (mandate dates live in mandate_versions.py)
+# Usage: python build_both.py [--max-memory-mb N] [--workers N] [--full-rebuild]
+#                              [--sensitivity]
+#   --max-memory-mb streams each raw file in chunks sized to that ceiling
+#   (default: read each file in one piece)
+#   --workers loads the per-year raw files in N parallel processes; the
+#   outputs are identical to the serial run
+#   --full-rebuild ignores the partition manifest; by default only raw files
+#   whose content changed since the last build are re-ingested
+#   --sensitivity also builds every date-sensitivity scenario registered in
+#   mandate_versions.py, under data/refresh_2026_04/sensitivity/<name>
+
+import argparse
+import contextlib
+import io
 import pandas as pd
 import os
 import sys
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
 
+from form5500_ingest import (SCAN_COLUMNS, SCAN_VERSION, cached_partition,
+                             chunk_rows_for_memory, concat_frames,
+                             dedupe_by_ein, format_ein, iter_scan_chunks,
+                             latest_contributions, load_manifest,
+                             mandate_masks, read_schedule, store_partition)
+from mandate_versions import MANDATE_STATES, VERSIONS, get_versions
+from raw_catalog import raw_files, schedule_files
+
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
-RAW_DIR = os.path.join(BASE_DIR, "form5500-raw-data")
-
-VERSIONS = {
-    "v1-inclusive": {
-        "OR": "2017-11-01",
-        "IL": "2018-05-01",
-        "CA": "2018-11-01",
-        "CT": "2022-04-01",
-        "MD": "2022-09-01",
-        "CO": "2023-01-01",
-        "VA": "2023-07-01",
-        "ME": "2024-01-01",
-        "DE": "2024-01-01",
-        "NJ": "2024-03-01",
-    },
-    "v2-conservative": {
-        "OR": "2017-11-01",
-        "IL": "2018-11-01",
-        "CA": "2019-07-01",
-        "CT": "2022-04-01",
-        "MD": "2022-09-01",
-        "CO": "2023-01-01",
-        "VA": "2023-07-01",
-        "ME": "2024-01-01",
-        "DE": "2024-07-01",
-        "NJ": "2024-06-30",
-    },
-}
 
 PROGRAM_NAMES = {
     "OR": "OregonSaves", "IL": "Secure Choice", "CA": "CalSavers",
@@ -47,170 +41,100 @@ PROGRAM_NAMES = {
 
 YEARS = range(2017, 2026)  # 2026-04 refresh adds partial 2025
 
-F5500_COLS = {
-    "pension": "TYPE_PENSION_BNFT_CODE",
-    "entity": "TYPE_PLAN_ENTITY_CD",
-    "entity_value": ["2", "2.0"],
-    "date": "PLAN_EFF_DATE",
-    "state": "SPONS_DFE_MAIL_US_STATE",
-    "ein": "SPONS_DFE_EIN",
-    "name": "SPONSOR_DFE_NAME",
-    "city": "SPONS_DFE_MAIL_US_CITY",
-    "plan_name": "PLAN_NAME",
-    "participants": "TOT_PARTCP_BOY_CNT",
-}
+# Shared-scan columns carried into the datasets (drops the filter flags).
+BASE_COLUMNS = SCAN_COLUMNS[:8]
 
-F5500SF_COLS = {
-    "pension": "SF_TYPE_PENSION_BNFT_CODE",
-    "entity": "SF_PLAN_ENTITY_CD",
-    "entity_value": ["1", "1.0"],
-    "date": "SF_PLAN_EFF_DATE",
-    "state": "SF_SPONS_US_STATE",
-    "ein": "SF_SPONS_EIN",
-    "name": "SF_SPONSOR_NAME",
-    "city": "SF_SPONS_US_CITY",
-    "plan_name": "SF_PLAN_NAME",
-    "participants": "SF_TOT_PARTCP_BOY_CNT",
-}
+# Identifies the Phase 1 filter a cached partition was built under; change
+# it (or the mandate-state list / scan version it embeds) and every
+# partition is re-ingested on the next run.
+PARTITION_KEY = (f"scan-v{SCAN_VERSION}|401k+single|"
+                 + ",".join(MANDATE_STATES))
 
 
-def find_file(folder, pattern):
-    if not os.path.exists(folder):
-        return None
-    for f in os.listdir(folder):
-        if pattern.lower() in f.lower() and f.lower().endswith(".csv"):
-            return os.path.join(folder, f)
-    return None
+def load_and_filter_base(filepath, col_map, label, chunk_rows=None):
+    """Load file and apply non-date filters. Returns filtered df with standardized columns.
 
-
-def get_col(df, col_name):
-    if col_name in df.columns:
-        return col_name
-    for c in df.columns:
-        if c.upper() == col_name.upper():
-            return c
-    return None
-
-
-def load_and_filter_base(filepath, col_map, label):
-    """Load file and apply non-date filters. Returns filtered df with standardized columns."""
+    Parsing and normalization come from the shared scan in form5500_ingest
+    (the same one build_state_year_panel.py counts from); this only applies
+    the 401(k) / single-employer / mandate-state filters. With chunk_rows
+    set, the file is streamed and only surviving rows of each chunk are
+    kept, so memory scales with the filtered output rather than the file.
+    """
     print(f"  Loading {label}... ", end="", flush=True)
-    df = pd.read_csv(filepath, low_memory=False, encoding="latin1")
-    print(f"{len(df):,} rows")
-
-    pension_col = get_col(df, col_map["pension"])
-    entity_col = get_col(df, col_map["entity"])
-    date_col = get_col(df, col_map["date"])
-    state_col = get_col(df, col_map["state"])
-    ein_col = get_col(df, col_map["ein"])
-    name_col = get_col(df, col_map["name"])
-    city_col = get_col(df, col_map["city"])
-    plan_name_col = get_col(df, col_map["plan_name"])
-    part_col = get_col(df, col_map["participants"])
-
-    if not all([pension_col, date_col, state_col, ein_col]):
-        print(f"  [SKIP] Missing required columns")
+    target_states = MANDATE_STATES
+    n_rows = 0
+    kept = []
+    for df in iter_scan_chunks(filepath, col_map, label, chunk_rows):
+        n_rows += len(df)
+        keep = df["IS_401K"] & df["IS_SINGLE_EMPLOYER"] & df["STATE"].isin(target_states)
+        if keep.any():
+            kept.append(df.loc[keep, BASE_COLUMNS])
+    print(f"{n_rows:,} rows (valid state + effective date)")
+
+    if not kept:
         return pd.DataFrame()
-
-    # Filter: 401(k) plans
-    df[pension_col] = df[pension_col].astype(str)
-    df = df[df[pension_col].str.contains("2J", na=False)].copy()
-
-    # Filter: Single-employer
-    if entity_col:
-        df[entity_col] = df[entity_col].astype(str).str.strip()
-        df = df[df[entity_col].isin(col_map["entity_value"])].copy()
-
-    # Filter: Mandate states
-    target_states = list(VERSIONS["v1-inclusive"].keys())
-    df[state_col] = df[state_col].astype(str).str.strip().str.upper()
-    df = df[df[state_col].isin(target_states)].copy()
-
-    if len(df) == 0:
-        return pd.DataFrame()
-
-    # Parse dates
-    df[date_col] = pd.to_datetime(df[date_col], errors="coerce")
-    df = df.dropna(subset=[date_col])
-
-    # Build standardized output
-    output = pd.DataFrame()
-    output["EIN"] = df[ein_col].astype(str).str.strip().str.replace('.0', '', regex=False).str.zfill(9)
-    output["FIRM_NAME"] = df[name_col].astype(str).str.strip() if name_col and name_col in df.columns else ""
-    output["PLAN_NAME"] = df[plan_name_col].astype(str).str.strip() if plan_name_col and plan_name_col in df.columns else ""
-    output["STATE"] = df[state_col].values
-    output["CITY"] = df[city_col].astype(str).str.strip() if city_col and city_col in df.columns else ""
-    output["PLAN_EFFECTIVE_DATE"] = df[date_col].values
-    if part_col and part_col in df.columns:
-        output["EMPLOYEE_COUNT"] = pd.to_numeric(df[part_col], errors="coerce")
-    else:
-        output["EMPLOYEE_COUNT"] = None
-    output["SOURCE"] = label
-
-    # Clean up nan firm names
-    output.loc[output["FIRM_NAME"].isin(["nan", "NaN", ""]), "FIRM_NAME"] = None
+    output = concat_frames(kept)
 
     print(f"  => {len(output):,} records (pre-date filter)")
     return output
 
 
-def apply_mandate_filter(df, mandate_dates):
-    """Filter by mandate dates for a specific version."""
-    rows = []
-    for state, mandate_str in mandate_dates.items():
-        mandate_dt = pd.Timestamp(mandate_str)
-        state_df = df[(df["STATE"] == state) & (df["PLAN_EFFECTIVE_DATE"] > mandate_dt)]
-        if len(state_df) > 0:
-            rows.append(state_df)
-    if not rows:
-        return pd.DataFrame()
-    return pd.concat(rows, ignore_index=True)
+def build_versions(combined, versions):
+    """Yield (version_name, n_filtered, deduped) for every mandate version.
+
+    Every version is a mask over the combined records (see
+    form5500_ingest.mandate_masks) followed by a latest-effective-date EIN
+    dedupe (dedupe_by_ein), so no version needs a sort of the combined
+    records and each extra scenario costs one filter and one hash pass.
+    Only the (much smaller) deduped frame is sorted, newest effective date
+    first, so the saved datasets keep their published row order. Versions
+    are yielded one at a time so only one version's frames are alive at
+    once.
+    """
+    masks = mandate_masks(combined["STATE"], combined["PLAN_EFFECTIVE_DATE"],
+                          versions)
+    for version_name in versions:
+        filtered = combined[masks.pop(version_name)]
+        deduped = dedupe_by_ein(filtered, "PLAN_EFFECTIVE_DATE", keep="latest")
+        yield (version_name, len(filtered),
+               deduped.sort_values("PLAN_EFFECTIVE_DATE", ascending=False,
+                                   kind="mergesort"))
+
+
+def iter_schedules():
+    """Schedule H and I frames (see form5500_ingest.read_schedule) for every
+    filing year in the raw catalog."""
+    for year in YEARS:
+        for path, col_map, _ in schedule_files(year):
+            subset = read_schedule(path, year, col_map)
+            if subset is not None:
+                yield subset
 
 
 def load_contributions():
-    """Load Schedule H and I for employer contribution data."""
+    """Load Schedule H and I for employer contribution data: one row per EIN,
+    the contribution reported for its latest plan year."""
     print(f"\nLoading employer contribution data...")
-    contrib_data = []
-    for year in YEARS:
-        for sched, folder in [("Schedule H", "schedule_h"), ("Schedule I", "schedule_i")]:
-            path = find_file(os.path.join(RAW_DIR, folder), f"sch_{folder.split('_')[1]}_{year}")
-            if not path:
-                continue
-            sch = pd.read_csv(path, low_memory=False, encoding="latin1")
-            ein_col = contrib_col = None
-            for c in sch.columns:
-                if "SPONS" in c.upper() and "EIN" in c.upper():
-                    ein_col = c
-                    break
-            if not ein_col:
-                for c in sch.columns:
-                    if "EIN" in c.upper():
-                        ein_col = c
-                        break
-            for c in sch.columns:
-                if "EMPLR" in c.upper() and "CONTRIB" in c.upper():
-                    contrib_col = c
-                    break
-            if ein_col and contrib_col:
-                subset = sch[[ein_col, contrib_col]].copy()
-                subset.columns = ["EIN", "EMPLOYER_CONTRIBUTION"]
-                contrib_data.append(subset)
-
-    if not contrib_data:
+    latest = latest_contributions(iter_schedules())
+    if latest is None:
         return pd.DataFrame()
+    return latest[["EIN", "EMPLOYER_CONTRIBUTION"]]
 
-    all_contrib = pd.concat(contrib_data, ignore_index=True)
-    all_contrib["EIN"] = all_contrib["EIN"].astype(str).str.strip().str.replace('.0', '', regex=False).str.zfill(9)
-    all_contrib["EMPLOYER_CONTRIBUTION"] = pd.to_numeric(all_contrib["EMPLOYER_CONTRIBUTION"], errors="coerce")
-    all_contrib = all_contrib.dropna(subset=["EMPLOYER_CONTRIBUTION"])
-    return all_contrib.groupby("EIN")["EMPLOYER_CONTRIBUTION"].last().reset_index()
+
+def version_dir_for(version_name):
+    # 2026-04 refresh: write to data/refresh_2026_04/<version> so the
+    # original v3 outputs at data/<version> remain untouched for comparison.
+    # Every other scenario (SENSITIVITY or register()ed) goes one level
+    # down so it never mixes with the published versions.
+    parts = ["data", "refresh_2026_04"]
+    if version_name not in VERSIONS:
+        parts.append("sensitivity")
+    return os.path.join(BASE_DIR, *parts, version_name)
 
 
 def save_version(deduped, mandate_dates, version_name, contrib_df):
     """Save dataset and supporting files for one version."""
-    # 2026-04 refresh: write to data/refresh_2026_04/<version> so the
-    # original v3 outputs at data/<version> remain untouched for comparison.
-    version_dir = os.path.join(BASE_DIR, "data", "refresh_2026_04", version_name)
+    version_dir = version_dir_for(version_name)
     os.makedirs(version_dir, exist_ok=True)
 
     # Join contributions
@@ -221,7 +145,8 @@ def save_version(deduped, mandate_dates, version_name, contrib_df):
     else:
         deduped["EMPLOYER_CONTRIBUTION"] = None
 
-    # Save dataset
+    # Save dataset (EINs are uint32 until here; written as 9-digit text)
+    deduped["EIN"] = format_ein(deduped["EIN"])
     path = os.path.join(version_dir, "state_auto_ira_401k_dataset.csv")
     deduped.to_csv(path, index=False)
     size_mb = os.path.getsize(path) / (1024 * 1024)
@@ -243,7 +168,96 @@ def save_version(deduped, mandate_dates, version_name, contrib_df):
     return len(deduped)
 
 
+def _load_job(path, col_map, label, chunk_rows):
+    """Process-pool entry point: run load_and_filter_base with its progress
+    output captured, so the parent can print logs in submission order."""
+    buf = io.StringIO()
+    with contextlib.redirect_stdout(buf):
+        result = load_and_filter_base(path, col_map, label, chunk_rows)
+    return buf.getvalue(), result
+
+
+def load_all_base(chunk_rows=None, workers=1, incremental=True):
+    """Phase 1: base-filtered records for every (year, form) file, in
+    YEARS order with Form 5500 before 5500-SF.
+
+    Each file's filtered output is kept as a partition in the
+    form5500_ingest manifest, keyed on the source's content hash; with
+    incremental=True, files that have not changed since their partition was
+    written are not re-ingested (after a DOL refresh, only the refreshed
+    years are). With workers > 1 the remaining files are loaded in a process
+    pool; results (and their logs) are still consumed in submission order,
+    so the combined frame — and every output CSV — is identical to the
+    serial run.
+    """
+    jobs = [(year, path, col_map, label)
+            for year in YEARS
+            for path, col_map, label in raw_files(year)]
+
+    manifest = load_manifest()
+    cached = {}
+    if incremental:
+        for _, path, _, label in jobs:
+            part = cached_partition(manifest, path, label, PARTITION_KEY)
+            if part is not None:
+                cached[label] = part
+    stale = [label for _, _, _, label in jobs if label not in cached]
+    print(f"\nPartitions: {len(cached)} unchanged, {len(stale)} to ingest"
+          + (f" ({', '.join(stale)})" if stale else ""))
+
+    futures = {}
+    pool = None
+    if workers > 1 and len(stale) > 1:
+        print(f"Loading {len(stale)} raw files with {workers} workers...")
+        pool = ProcessPoolExecutor(max_workers=workers)
+        futures = {label: pool.submit(_load_job, path, col_map, label, chunk_rows)
+                   for _, path, col_map, label in jobs if label in stale}
+
+    try:
+        last_year = None
+        for year, path, col_map, label in jobs:
+            if year != last_year:
+                print(f"\n{'='*40} {year} {'='*40}")
+                last_year = year
+            if label in cached:
+                result = cached[label]
+                print(f"  {label}: unchanged source, "
+                      f"{len(result):,} cached records (pre-date filter)")
+                yield result
+                continue
+            if label in futures:
+                log, result = futures[label].result()
+                print(log, end="")
+            else:
+                result = load_and_filter_base(path, col_map, label, chunk_rows)
+            store_partition(manifest, path, label, PARTITION_KEY, result)
+            yield result
+    finally:
+        if pool is not None:
+            pool.shutdown(cancel_futures=True)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Build both dataset versions.")
+    parser.add_argument("--max-memory-mb", type=int, default=None,
+                        help="stream raw files in chunks sized to this memory "
+                             "ceiling instead of loading each file whole")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="load raw files in N parallel processes "
+                             "(output is identical to the serial run)")
+    parser.add_argument("--full-rebuild", action="store_true",
+                        help="re-ingest every raw file even if its cached "
+                             "partition is still valid")
+    parser.add_argument("--sensitivity", action="store_true",
+                        help="also build the date-sensitivity scenarios "
+                             "registered in mandate_versions.py")
+    return parser.parse_args()
+
+
 def main():
+    args = parse_args()
+    chunk_rows = chunk_rows_for_memory(args.max_memory_mb)
+
     print("=" * 60)
     print("State Auto-IRA 401(k) — Building BOTH Versions")
     print("=" * 60)
@@ -256,45 +270,32 @@ def main():
 
     # Phase 1: Load all data with base filters (no date filter yet)
     all_records = []
-    for year in YEARS:
-        print(f"\n{'='*40} {year} {'='*40}")
-
-        path = find_file(os.path.join(RAW_DIR, "form5500"), f"f_5500_{year}")
-        if path:
-            result = load_and_filter_base(path, F5500_COLS, f"Form5500_{year}")
-            if len(result) > 0:
-                all_records.append(result)
-
-        path = find_file(os.path.join(RAW_DIR, "form5500sf"), f"f_5500_sf_{year}")
-        if path:
-            result = load_and_filter_base(path, F5500SF_COLS, f"Form5500SF_{year}")
-            if len(result) > 0:
-                all_records.append(result)
+    for result in load_all_base(chunk_rows, args.workers,
+                                incremental=not args.full_rebuild):
+        if len(result) > 0:
+            all_records.append(result)
 
     if not all_records:
         print("\n[ERROR] No records found!")
         sys.exit(1)
 
-    combined = pd.concat(all_records, ignore_index=True)
+    combined = concat_frames(all_records)
     print(f"\nTotal base records (all states, pre-date-filter): {len(combined):,}")
 
     # Phase 2: Load contributions once
     contrib_df = load_contributions()
 
     # Phase 3: Build each version
-    for version_name, mandate_dates in VERSIONS.items():
+    versions = get_versions(sensitivity=args.sensitivity)
+    for version_name, n_filtered, deduped in build_versions(combined, versions):
         print(f"\n{'='*60}")
         print(f"  BUILDING: {version_name}")
         print(f"{'='*60}")
-
-        filtered = apply_mandate_filter(combined, mandate_dates)
-        print(f"  Records after mandate date filter: {len(filtered):,}")
-
-        filtered = filtered.sort_values("PLAN_EFFECTIVE_DATE", ascending=False)
-        deduped = filtered.drop_duplicates(subset=["EIN"], keep="first")
+        print(f"  Records after mandate date filter: {n_filtered:,}")
         print(f"  Unique firms (by EIN): {len(deduped):,}")
 
-        save_version(deduped.copy(), mandate_dates, version_name, contrib_df)
+        save_version(deduped.copy(), versions[version_name], version_name,
+                     contrib_df)
 
     # Phase 4: Save shared docs
     methodology_path = os.path.join(BASE_DIR, "methodology", "METHODOLOGY.md")
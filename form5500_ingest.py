@@ -0,0 +1,945 @@
+"""Shared raw-file access for the DOL Form 5500 / 5500-SF bulk CSVs.
+
+The EFAST2 bulk files are multi-GB latin1 CSVs with a few hundred columns,
+of which the build uses about ten. Re-parsing them with
+`pd.read_csv(low_memory=False)` dominated every rebuild, so the first read of
+each raw file now writes a column-projected Parquet copy to
+
+    form5500-raw-data/_parquet_cache/<csv stem>.parquet
+    form5500-raw-data/_parquet_cache/<csv stem>.json   (source fingerprint)
+
+and every later read is served from that copy. The cache entry is keyed on
+the source file's size + mtime + SHA-256: a size change invalidates it
+outright, and an mtime change triggers a re-hash so a plain copy / touch of an
+unchanged file does not force a rebuild.
+
+Column values are stored exactly as they appear in the CSV (text), except the
+participant / contribution counts which are stored as float64, so the filters
+in the loaders behave the same whether they read the cache or the raw file.
+
+Every reader here is a chunk iterator underneath (`iter_form_chunks`,
+`iter_scan_chunks`). With `chunk_rows=None` a file is read in one piece;
+with a row count (see `chunk_rows_for_memory`) the CSV is read with
+`usecols` + `chunksize` and both caches are written incrementally, so peak
+memory is one chunk plus whatever the caller keeps.
+
+Raw sources may also be the DOL's F_5500_*_All.zip archives: the CSV member
+is decompressed as a stream (open_raw), and the cache is written in that
+same pass.
+
+Usage (optional one-time conversion of everything under form5500-raw-data/):
+    python form5500_ingest.py [--max-memory-mb N]
+"""
+
+import argparse
+import contextlib
+import hashlib
+import json
+import os
+import zipfile
+
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    HAVE_PARQUET = True
+except ImportError:  # pragma: no cover - cache is an optimization only
+    pa = pq = None
+    HAVE_PARQUET = False
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+RAW_DIR = os.path.join(BASE_DIR, "form5500-raw-data")
+CACHE_DIR = os.path.join(RAW_DIR, "_parquet_cache")
+
+# Bump when the cached layout changes so stale entries are rebuilt.
+CACHE_VERSION = 1
+
+F5500_COLS = {
+    "pension": "TYPE_PENSION_BNFT_CODE",
+    "entity": "TYPE_PLAN_ENTITY_CD",
+    "entity_value": ["2", "2.0"],
+    "date": "PLAN_EFF_DATE",
+    "state": "SPONS_DFE_MAIL_US_STATE",
+    "ein": "SPONS_DFE_EIN",
+    "name": "SPONSOR_DFE_NAME",
+    "city": "SPONS_DFE_MAIL_US_CITY",
+    "plan_name": "PLAN_NAME",
+    "participants": "TOT_PARTCP_BOY_CNT",
+}
+
+F5500SF_COLS = {
+    "pension": "SF_TYPE_PENSION_BNFT_CODE",
+    "entity": "SF_PLAN_ENTITY_CD",
+    "entity_value": ["1", "1.0"],
+    "date": "SF_PLAN_EFF_DATE",
+    "state": "SF_SPONS_US_STATE",
+    "ein": "SF_SPONS_EIN",
+    "name": "SF_SPONSOR_NAME",
+    "city": "SF_SPONS_US_CITY",
+    "plan_name": "SF_PLAN_NAME",
+    "participants": "SF_TOT_PARTCP_BOY_CNT",
+}
+
+# Logical keys that are not column names.
+NON_COLUMN_KEYS = ("entity_value",)
+NUMERIC_KEYS = ("participants", "contribution")
+
+HASH_CHUNK = 8 * 1024 * 1024
+
+# Rough in-memory cost of one text cell read with dtype=str (CPython str
+# object + pointer + parser buffers), and how many working copies of a chunk
+# exist at once while it is normalized. Used only to turn a memory ceiling
+# into a chunk size, so it errs on the generous side.
+BYTES_PER_CELL = 96
+WORKING_COPIES = 4
+MIN_CHUNK_ROWS = 10_000
+
+
+def get_col(columns, name):
+    """Case-insensitive column lookup; returns the actual header or None."""
+    columns = list(columns)
+    if name in columns:
+        return name
+    upper = name.upper()
+    for c in columns:
+        if c.upper() == upper:
+            return c
+    return None
+
+
+def resolve_columns(columns, col_map):
+    """Map each logical key in col_map to the actual header (or None)."""
+    return {k: get_col(columns, v) for k, v in col_map.items()
+            if k not in NON_COLUMN_KEYS}
+
+
+def file_sha256(path):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(HASH_CHUNK), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def fingerprint(path, with_hash=True):
+    st = os.stat(path)
+    fp = {"size": st.st_size, "mtime_ns": st.st_mtime_ns}
+    if with_hash:
+        fp["sha256"] = file_sha256(path)
+    return fp
+
+
+def cache_paths(csv_path):
+    stem = os.path.splitext(os.path.basename(csv_path))[0].lower()
+    return (os.path.join(CACHE_DIR, f"{stem}.parquet"),
+            os.path.join(CACHE_DIR, f"{stem}.json"))
+
+
+def _read_meta(meta_path):
+    try:
+        with open(meta_path, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _write_meta(meta_path, meta):
+    tmp = meta_path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(meta, f, indent=2, sort_keys=True)
+    os.replace(tmp, meta_path)
+
+
+def source_unchanged(csv_path, fp):
+    """Compare csv_path against a recorded fingerprint dict.
+
+    Same size + mtime is trusted; same size with a new mtime is settled by
+    the content hash. On a hash match the new mtime is written into fp in
+    place, so callers that persist fp make the next check cheap.
+    """
+    now = fingerprint(csv_path, with_hash=False)
+    if now["size"] != fp.get("size"):
+        return False
+    if now["mtime_ns"] == fp.get("mtime_ns"):
+        return True
+    if file_sha256(csv_path) != fp.get("sha256"):
+        return False
+    fp["mtime_ns"] = now["mtime_ns"]
+    return True
+
+
+def _source_unchanged(csv_path, meta, meta_path):
+    """source_unchanged for a cache sidecar; rewrites it if the mtime moved."""
+    fp = meta.setdefault("fingerprint", {})
+    mtime = fp.get("mtime_ns")
+    if not source_unchanged(csv_path, fp):
+        return False
+    if fp["mtime_ns"] != mtime:
+        _write_meta(meta_path, meta)
+    return True
+
+
+def cache_is_valid(csv_path, columns):
+    """True if the Parquet copy of csv_path exists, matches the source
+    fingerprint, and contains every requested raw column."""
+    pq_path, meta_path = cache_paths(csv_path)
+    meta = _read_meta(meta_path)
+    if not meta or not os.path.exists(pq_path):
+        return False
+    if meta.get("cache_version") != CACHE_VERSION:
+        return False
+    if meta.get("source") != os.path.abspath(csv_path):
+        return False
+    if not set(columns) <= set(meta.get("columns", [])):
+        return False
+    return _source_unchanged(csv_path, meta, meta_path)
+
+
+# EINs are nine-digit integers; uint32 holds every one of them in 4 bytes
+# (vs ~60 for a Python str), so they are parsed once at read time and only
+# formatted back to zero-padded text when a dataset is written.
+EIN_DTYPE = "UInt32"
+EIN_MAX = 999_999_999
+
+
+def parse_ein(values):
+    """Parse raw EIN values (text like "123456789", "12345678.0", " 0123 ",
+    or numbers) into a nullable uint32 Series.
+
+    Anything that is not a whole number in [0, 999999999] becomes <NA>.
+    Vectorized through pd.to_numeric, so it never builds intermediate
+    strings, and unlike the old `str.replace('.0', '')` it cannot drop a
+    ".0" from the middle of a value.
+    """
+    num = pd.to_numeric(pd.Series(values, copy=False), errors="coerce")
+    valid = num.notna() & (num >= 0) & (num <= EIN_MAX) & (num % 1 == 0)
+    return num.where(valid).astype(EIN_DTYPE)
+
+
+def format_ein(values):
+    """Nine-digit zero-padded text for a parse_ein Series; <NA> stays NaN
+    (an empty cell in CSV output)."""
+    values = pd.Series(values, copy=False)
+    out = pd.Series(np.nan, index=values.index, dtype=object)
+    present = values.notna().to_numpy()
+    digits = values[present].to_numpy(dtype=np.uint32).astype(str)
+    out[present] = np.char.zfill(digits, 9)
+    return out
+
+
+DATE_DTYPE = "datetime64[s]"
+
+# Date formats found in the EFAST2 bulk files, most common first. Each is
+# applied with an explicit format (vectorized, no per-element inference) to
+# whatever the earlier ones left unparsed.
+DATE_FORMATS = ("%Y-%m-%d", "%m/%d/%Y", "%Y%m%d", "%Y-%m-%d %H:%M:%S",
+                "%m/%d/%y")
+UNPARSED_EXAMPLES = 5
+
+
+class DateParser:
+    """Memoized fixed-format parser for one date column of one source.
+
+    Effective dates repeat massively (a few thousand distinct strings over
+    millions of rows), so each chunk is factorized and only strings not seen
+    before are parsed, trying DATE_FORMATS in order; the string -> date memo
+    carries across chunks, so a chunked read parses every distinct value
+    once and chunk boundaries cannot change the result. Non-blank values
+    that match no format become NaT and are counted in `unparsed` (with a
+    few `examples`) instead of disappearing silently.
+    """
+
+    def __init__(self, formats=DATE_FORMATS):
+        self.formats = formats
+        self.memo = pd.Series(dtype=DATE_DTYPE)
+        self.unparsed = 0
+        self.examples = []
+
+    def _parse_new(self, values):
+        text = pd.Series(values, dtype=object).astype(str).str.strip()
+        parsed = pd.Series(pd.NaT, index=text.index, dtype="datetime64[ns]")
+        for fmt in self.formats:
+            todo = parsed.isna() & (text != "")
+            if not todo.any():
+                break
+            parsed[todo] = pd.to_datetime(text[todo], format=fmt,
+                                          errors="coerce")
+        return pd.Series(parsed.astype(DATE_DTYPE).to_numpy(), index=values)
+
+    def parse(self, values):
+        """values parsed to DATE_DTYPE; missing / unparseable -> NaT."""
+        values = pd.Series(values, copy=False)
+        codes, uniques = pd.factorize(values)
+        new = uniques[~pd.Index(uniques).isin(self.memo.index)]
+        if len(new):
+            self.memo = pd.concat([self.memo, self._parse_new(new)])
+        dates = self.memo.reindex(uniques).to_numpy(dtype=DATE_DTYPE)
+
+        bad = np.isnat(dates) & (pd.Series(uniques, dtype=object)
+                                 .astype(str).str.strip() != "").to_numpy()
+        if bad.any():
+            counts = np.bincount(codes[codes >= 0], minlength=len(uniques))
+            self.unparsed += int(counts[bad].sum())
+            room = UNPARSED_EXAMPLES - len(self.examples)
+            if room > 0:
+                self.examples += [str(v) for v in uniques[bad][:room]]
+
+        out = np.append(dates, np.datetime64("NaT"))[codes]  # -1 -> NaT
+        return pd.Series(out, index=values.index)
+
+    def report(self, label):
+        """Print the unparsed-value count for label, if any."""
+        if self.unparsed:
+            print(f"  [dates] {label}: {self.unparsed:,} unparseable values "
+                  f"set to missing (e.g. {', '.join(map(repr, self.examples))})")
+
+
+def chunk_rows_for_memory(max_memory_mb, n_columns=len(F5500_COLS) - 1):
+    """Rows per chunk that keep one projected chunk under max_memory_mb.
+
+    None (no ceiling) means read each file in one piece.
+    """
+    if not max_memory_mb:
+        return None
+    per_row = n_columns * BYTES_PER_CELL * WORKING_COPIES
+    return max(MIN_CHUNK_ROWS, int(max_memory_mb * 1024 * 1024 // per_row))
+
+
+def _projection(header, col_map):
+    """Raw columns to keep for col_map, plus which of them are numeric."""
+    actual = resolve_columns(header, col_map)
+    keep = [c for c in actual.values() if c]
+    numeric = [actual[k] for k in NUMERIC_KEYS if actual.get(k)]
+    return keep, numeric
+
+
+def _full_map(header, col_map):
+    """col_map widened to the full Form 5500 / 5500-SF map of the file, so one
+    cache conversion serves every loader regardless of which one ran first."""
+    for m in (F5500_COLS, F5500SF_COLS):
+        if get_col(header, m["pension"]):
+            return {**m, **col_map}
+    return dict(col_map)
+
+
+@contextlib.contextmanager
+def open_raw(path):
+    """Open a raw source for read_csv: a CSV path as-is, or the CSV member of
+    a DOL zip (F_5500_*_All.zip) as a decompressing stream, so refreshed
+    files can be read without extracting them to disk first."""
+    if not path.lower().endswith(".zip"):
+        yield path
+        return
+    with zipfile.ZipFile(path) as z:
+        names = [n for n in z.namelist() if n.lower().endswith(".csv")]
+        if not names:
+            raise RuntimeError(f"no CSV in {path}")
+        with z.open(names[0]) as member:  # always single CSV per DOL zip
+            yield member
+
+
+def read_header(path):
+    with open_raw(path) as src:
+        return list(pd.read_csv(src, nrows=0, encoding="latin1").columns)
+
+
+def _iter_csv(csv_path, keep, numeric, chunk_rows):
+    with open_raw(csv_path) as src:
+        reader = pd.read_csv(src, usecols=keep, dtype=str, low_memory=False,
+                             encoding="latin1", chunksize=chunk_rows)
+        chunks = [reader] if chunk_rows is None else reader
+        for df in chunks:
+            # float64 even when a column has no gaps (to_numeric would give
+            # int64): the Parquet cache stores these columns as float64, so
+            # a cold read must match a warm one.
+            for c in numeric:
+                df[c] = pd.to_numeric(df[c], errors="coerce").astype("float64")
+            yield df
+
+
+# Arrow types mapped back to their pandas extension dtype on read: files
+# written through _ParquetSink carry no pandas metadata, so a nullable
+# uint32 column would otherwise come back as float64.
+_PANDAS_TYPES = {pa.uint32(): pd.UInt32Dtype()} if HAVE_PARQUET else {}
+
+
+def _to_pandas(table):
+    df = _restore_nan(table.to_pandas(types_mapper=_PANDAS_TYPES.get))
+    # Parquet has no second-resolution timestamps (they come back as ms);
+    # every timestamp written here is a date, so restore DATE_DTYPE.
+    for c in df.columns:
+        if df[c].dtype.kind == "M":
+            df[c] = df[c].astype(DATE_DTYPE)
+    return df
+
+
+def _restore_nan(df):
+    # Parquet round-trips missing text as None; restore the NaN that
+    # read_csv produces so `.astype(str)` in the loaders still yields "nan".
+    for c in df.columns:
+        if df[c].dtype == object:
+            df[c] = df[c].where(df[c].notna(), np.nan)
+    return df
+
+
+def _iter_parquet(pq_path, columns, chunk_rows):
+    if chunk_rows is None:
+        yield _to_pandas(pq.read_table(pq_path, columns=columns))
+        return
+    for batch in pq.ParquetFile(pq_path).iter_batches(batch_size=chunk_rows,
+                                                      columns=columns):
+        yield _to_pandas(batch)
+
+
+def concat_frames(frames):
+    """pd.concat(ignore_index=True) that keeps categorical columns
+    categorical.
+
+    pd.concat falls back to object strings as soon as two frames' categories
+    differ (every file has its own SOURCE label and CITY dictionary), which
+    would undo the compact dtypes of the scan. The categories are unioned
+    first, in order of first appearance.
+    """
+    frames = list(frames)
+    if len(frames) == 1:
+        return frames[0].reset_index(drop=True)
+    for col in frames[0].columns:
+        if not isinstance(frames[0][col].dtype, pd.CategoricalDtype):
+            continue
+        cats = [f[col].cat.categories for f in frames
+                if isinstance(f[col].dtype, pd.CategoricalDtype)]
+        if len(cats) < len(frames):
+            continue  # mixed dtypes: let pd.concat decide
+        union = pd.Index(pd.unique(np.concatenate([c.to_numpy() for c in cats])))
+        frames = [f.assign(**{col: f[col].cat.set_categories(union)})
+                  for f in frames]
+    return pd.concat(frames, ignore_index=True)
+
+
+def _concat(chunks, columns=None):
+    chunks = list(chunks)
+    if len(chunks) == 1:
+        return chunks[0]
+    if not chunks:
+        return pd.DataFrame(columns=columns)
+    return concat_frames(chunks)
+
+
+class _ParquetSink:
+    """Incremental Parquet writer that only replaces the target on commit."""
+
+    def __init__(self, path, schema):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.path = path
+        self.tmp = path + ".tmp"
+        self.schema = schema
+        self.writer = pq.ParquetWriter(self.tmp, schema)
+
+    def write(self, df):
+        self.writer.write_table(
+            pa.Table.from_pandas(df, schema=self.schema, preserve_index=False))
+
+    def commit(self, meta_path, meta):
+        self.writer.close()
+        os.replace(self.tmp, self.path)
+        _write_meta(meta_path, meta)
+
+    def abort(self):
+        self.writer.close()
+        if os.path.exists(self.tmp):
+            os.remove(self.tmp)
+
+
+def iter_form_chunks(csv_path, col_map, chunk_rows=None, use_cache=True,
+                     fp=None):
+    """Yield the col_map columns of a Form 5500 / 5500-SF CSV.
+
+    Frames carry the file's actual header names (resolve them with get_col /
+    resolve_columns); columns the file lacks are simply absent. Served from
+    the Parquet cache when valid; otherwise the CSV is streamed with
+    `usecols` (+ `chunksize` when chunk_rows is set) and the cache is written
+    alongside, committed only once the whole file has been read. fp is a
+    fingerprint of csv_path the caller already knows to be current (e.g.
+    its raw-catalog entry); it is recorded instead of hashing the file again.
+    """
+    pq_path, meta_path = cache_paths(csv_path)
+    if use_cache and HAVE_PARQUET:
+        meta = _read_meta(meta_path)
+        if meta and meta.get("columns"):
+            keep, _ = _projection(meta["columns"], col_map)
+            if cache_is_valid(csv_path, keep):
+                yield from _iter_parquet(pq_path, keep, chunk_rows)
+                return
+
+    header = read_header(csv_path)
+    keep, _ = _projection(header, col_map)
+    if not (use_cache and HAVE_PARQUET):
+        _, numeric = _projection(header, col_map)
+        yield from _iter_csv(csv_path, keep, numeric, chunk_rows)
+        return
+
+    cached, numeric = _projection(header, _full_map(header, col_map))
+    print(f"  [cache] converting {os.path.basename(csv_path)} "
+          f"({len(cached)} of {len(header)} columns)")
+    fp = dict(fp) if fp else fingerprint(csv_path)
+    sink = _ParquetSink(pq_path, pa.schema(
+        [(c, pa.float64() if c in numeric else pa.string()) for c in cached]))
+    n = 0
+    try:
+        for df in _iter_csv(csv_path, cached, numeric, chunk_rows):
+            sink.write(df)
+            n += len(df)
+            yield df[keep]
+    except BaseException:
+        sink.abort()
+        raise
+    sink.commit(meta_path, {
+        "cache_version": CACHE_VERSION,
+        "source": os.path.abspath(csv_path),
+        "fingerprint": fp,
+        "header": header,
+        "columns": cached,
+        "rows": int(n),
+    })
+
+
+def read_form(csv_path, col_map, use_cache=True, fp=None):
+    """Read the columns named in col_map from a Form 5500 / 5500-SF CSV in
+    one piece (see iter_form_chunks)."""
+    return _concat(iter_form_chunks(csv_path, col_map, use_cache=use_cache,
+                                    fp=fp))
+
+
+def cached_header(csv_path):
+    """Full header of a raw file, from the cache sidecar when the source is
+    unchanged since it was converted (no need to open a multi-GB file or
+    zip just to look at column names)."""
+    pq_path, meta_path = cache_paths(csv_path)
+    meta = _read_meta(meta_path)
+    if (meta and meta.get("header")
+            and meta.get("source") == os.path.abspath(csv_path)
+            and _source_unchanged(csv_path, meta, meta_path)):
+        return meta["header"]
+    return read_header(csv_path)
+
+
+# ---------------------------------------------------------------------------
+# Schedule H / Schedule I
+#
+# The schedules only contribute the sponsor EIN, the plan-year start and the
+# employer contribution amount, but Schedule H is one of the widest files
+# DOL publishes. The columns are resolved from the header (names differ
+# between H, I and across years) and only they are read — through the same
+# Parquet cache as the Form 5500 files.
+# ---------------------------------------------------------------------------
+
+def schedule_columns(header):
+    """col_map {"ein", "contribution"[, "plan_year"]} for a Schedule H / I
+    header, or None if the EIN or contribution column cannot be found.
+
+    EIN: the first column naming both SPONS and EIN, else the first naming
+    EIN; contribution: the first naming both EMPLR and CONTRIB; plan year
+    (optional): the first naming PLAN_YEAR_BEGIN.
+    """
+    upper = [(c, c.upper()) for c in header]
+    ein = (next((c for c, u in upper if "SPONS" in u and "EIN" in u), None)
+           or next((c for c, u in upper if "EIN" in u), None))
+    contrib = next((c for c, u in upper if "EMPLR" in u and "CONTRIB" in u),
+                   None)
+    if not (ein and contrib):
+        return None
+    col_map = {"ein": ein, "contribution": contrib}
+    plan_year = next((c for c, u in upper if "PLAN_YEAR_BEGIN" in u), None)
+    if plan_year:
+        col_map["plan_year"] = plan_year
+    return col_map
+
+
+def read_schedule(path, filing_year, col_map=None, use_cache=True):
+    """EIN (uint32), PLAN_YEAR_BEGIN and EMPLOYER_CONTRIBUTION (float64) of
+    one Schedule H / I file; None if the file lacks the EIN or contribution
+    column. PLAN_YEAR_BEGIN falls back to January 1 of filing_year where the
+    file has no plan-year column or the value does not parse.
+
+    col_map is the schedule_columns mapping, normally from the raw catalog;
+    without it the header is looked up here."""
+    if col_map is None:
+        col_map = schedule_columns(cached_header(path))
+    if col_map is None:
+        return None
+    df = read_form(path, col_map, use_cache=use_cache)
+    fallback = pd.Timestamp(year=filing_year, month=1, day=1)
+    if "plan_year" in col_map:
+        plan_year = DateParser().parse(df[col_map["plan_year"]])
+        plan_year = plan_year.fillna(fallback)
+    else:
+        plan_year = pd.Series(fallback, index=df.index)
+    return pd.DataFrame({
+        "EIN": parse_ein(df[col_map["ein"]]),
+        "PLAN_YEAR_BEGIN": plan_year,
+        "EMPLOYER_CONTRIBUTION": df[col_map["contribution"]],
+    })
+
+
+def _latest_per_ein(df):
+    """Rows of df holding each EIN's latest PLAN_YEAR_BEGIN; among several
+    rows for that plan year, the largest contribution."""
+    codes, _ = pd.factorize(df["EIN"])
+    plan = df["PLAN_YEAR_BEGIN"].to_numpy(dtype="datetime64[ns]").view("i8")
+    latest = plan == pd.Series(plan).groupby(codes).transform("max").to_numpy()
+    df, codes = df[latest], codes[latest]
+    amount = pd.Series(df["EMPLOYER_CONTRIBUTION"].to_numpy())
+    winners = amount.groupby(codes, sort=False).idxmax().to_numpy()
+    mask = np.zeros(len(df), dtype=bool)
+    mask[winners] = True
+    return df[mask]
+
+
+def latest_contributions(frames):
+    """Reduce read_schedule frames to one row per EIN: the contribution
+    reported for its latest plan year.
+
+    A running EIN -> (plan year, contribution) table is merged with each
+    frame as it arrives, so memory is bounded by the distinct EINs plus one
+    schedule file, and because ties are settled by value (largest
+    contribution) rather than position, the result does not depend on the
+    order the files are read in. Returns None if no frame had a usable row.
+    """
+    best = None
+    for df in frames:
+        df = df.dropna(subset=["EIN", "EMPLOYER_CONTRIBUTION"])
+        if best is not None:
+            df = pd.concat([best, df], ignore_index=True)
+        if len(df):
+            best = _latest_per_ein(df).reset_index(drop=True)
+    return best
+
+
+# ---------------------------------------------------------------------------
+# Shared normalized scan
+#
+# build_both.py (mandate states, firm-level datasets) and
+# analysis/build_state_year_panel.py (all states, DiD counts) used to parse
+# the raw files independently with slightly different filters. Both now
+# derive from one normalized scan per raw file: every row with a valid
+# state and a parseable effective date, with EIN (uint32, see parse_ein) /
+# state / date / pension / entity normalized once. The scan is kept in
+# compact dtypes end to end: categorical STATE / SOURCE / CITY (Parquet
+# dictionary columns on disk) and second-resolution dates. The scan of each file is persisted next to the
+# Parquet cache (same fingerprint rules), so whichever script runs second
+# does not touch the raw data at all.
+# ---------------------------------------------------------------------------
+
+SCAN_DIR = os.path.join(RAW_DIR, "_shared_scan")
+SCAN_VERSION = 5
+
+VALID_STATES = {
+    "AL","AK","AZ","AR","CA","CO","CT","DE","DC","FL","GA","HI","ID","IL","IN",
+    "IA","KS","KY","LA","ME","MD","MA","MI","MN","MS","MO","MT","NE","NV","NH",
+    "NJ","NM","NY","NC","ND","OH","OK","OR","PA","RI","SC","SD","TN","TX","UT",
+    "VT","VA","WA","WV","WI","WY",
+}
+
+# Column order of the shared intermediate. The first eight columns are the
+# descriptive dataset's layout; the two flags feed the filters downstream.
+SCAN_COLUMNS = ["EIN", "FIRM_NAME", "PLAN_NAME", "STATE", "CITY",
+                "PLAN_EFFECTIVE_DATE", "EMPLOYEE_COUNT", "SOURCE",
+                "IS_401K", "IS_SINGLE_EMPLOYER"]
+
+STATE_DTYPE = pd.CategoricalDtype(sorted(VALID_STATES))
+
+if HAVE_PARQUET:
+    _DICT = pa.dictionary(pa.int32(), pa.string())
+    SCAN_SCHEMA = pa.schema(
+        [("EIN", pa.uint32()),
+         ("FIRM_NAME", pa.string()),
+         ("PLAN_NAME", pa.string()),
+         ("STATE", _DICT),
+         ("CITY", _DICT),
+         ("PLAN_EFFECTIVE_DATE", pa.timestamp("s")),
+         ("EMPLOYEE_COUNT", pa.float64()),
+         ("SOURCE", _DICT),
+         ("IS_401K", pa.bool_()),
+         ("IS_SINGLE_EMPLOYER", pa.bool_())])
+
+
+def normalize_frame(df, col_map, label, dates=None):
+    """Normalize one raw Form 5500 / 5500-SF frame into SCAN_COLUMNS.
+
+    Keeps rows whose sponsor state is one of the 50 states + DC and whose
+    plan effective date parses (with `dates`, a DateParser shared by every
+    chunk of the file); all other filtering (2J, single-employer, mandate
+    states, dedupe) is left to the consumers. Returns None if a required
+    column is missing.
+    """
+    actual = resolve_columns(df.columns, col_map)
+    if not all(actual[k] for k in ("pension", "date", "state", "ein")):
+        return None
+
+    state = df[actual["state"]].astype(str).str.strip().str.upper()
+    date = (dates or DateParser()).parse(df[actual["date"]])
+    keep = state.isin(VALID_STATES) & date.notna()
+    df = df[keep]
+    state = state[keep]
+    date = date[keep]
+
+    out = pd.DataFrame(index=df.index)
+    out["EIN"] = parse_ein(df[actual["ein"]])
+    for key, col in (("name", "FIRM_NAME"), ("plan_name", "PLAN_NAME"),
+                     ("city", "CITY")):
+        out[col] = df[actual[key]].astype(str).str.strip() if actual.get(key) else ""
+    # City names repeat heavily; dictionary-encode them like STATE / SOURCE.
+    out["CITY"] = out["CITY"].astype("category")
+    out["STATE"] = state.astype(STATE_DTYPE)
+    out["PLAN_EFFECTIVE_DATE"] = date
+    if actual.get("participants"):
+        out["EMPLOYEE_COUNT"] = pd.to_numeric(df[actual["participants"]],
+                                              errors="coerce")
+    else:
+        out["EMPLOYEE_COUNT"] = np.nan
+    out["SOURCE"] = pd.Categorical.from_codes(
+        np.zeros(len(out), dtype=np.int8), categories=[label])
+    out["IS_401K"] = df[actual["pension"]].astype(str).str.contains("2J", na=False)
+    if actual.get("entity"):
+        entity = df[actual["entity"]].astype(str).str.strip()
+        out["IS_SINGLE_EMPLOYER"] = entity.isin(col_map["entity_value"])
+    else:
+        # No entity column: treat every plan as single-employer (the
+        # descriptive build has always skipped the filter in that case;
+        # build_state_year_panel.py drops such files instead).
+        out["IS_SINGLE_EMPLOYER"] = True
+
+    out.loc[out["FIRM_NAME"].isin(["nan", "NaN", ""]), "FIRM_NAME"] = None
+    return out[SCAN_COLUMNS].reset_index(drop=True)
+
+
+def dedupe_by_ein(df, date_col, keep="latest", ein_col="EIN"):
+    """One row per EIN: the one with the latest (keep="latest") or earliest
+    (keep="earliest") date_col, ties going to the first row in frame order.
+
+    A hash group-argmax instead of sort_values + drop_duplicates: EINs are
+    factorized, the date is turned into an int64 key whose maximum is the
+    wanted row, and groupby().idxmax picks it per EIN in one O(n) pass. The
+    surviving rows keep the frame's order. Missing EINs form one group, as
+    they do in drop_duplicates; a missing date never wins over a present one.
+    """
+    if keep not in ("latest", "earliest"):
+        raise ValueError(f"keep must be 'latest' or 'earliest', not {keep!r}")
+    if df.empty:
+        return df
+    codes, _ = pd.factorize(df[ein_col], use_na_sentinel=False)
+    key = df[date_col].to_numpy(dtype="datetime64[ns]").view("i8")
+    if keep == "earliest":
+        # NaT is int64 min; move it to the top before flipping the order so
+        # it ends up as the smallest key.
+        key = ~np.where(key == np.iinfo(np.int64).min,
+                        np.iinfo(np.int64).max, key)
+    winners = pd.Series(key).groupby(codes, sort=False).idxmax().to_numpy()
+    mask = np.zeros(len(df), dtype=bool)
+    mask[winners] = True
+    return df[mask]
+
+
+def mandate_masks(states, dates, versions):
+    """Per-version masks of rows whose date falls after their state's
+    mandate date.
+
+    versions maps a version name to {state: "YYYY-MM-DD"}. The states are
+    factorized once into categorical codes; each version then costs one
+    lookup of a per-category threshold array and one vectorized comparison,
+    so adding versions does not add passes over per-state subsets. Rows
+    whose state has no date in a version, or whose date is missing, are
+    False. Returns {version name: numpy bool array}.
+    """
+    states = pd.Series(states, copy=False)
+    if not isinstance(states.dtype, pd.CategoricalDtype):
+        states = states.astype("category")
+    codes = states.cat.codes.to_numpy()
+    categories = list(states.cat.categories)
+    values = pd.Series(dates, copy=False).to_numpy(dtype="datetime64[ns]")
+    nat = np.datetime64("NaT", "ns")
+
+    masks = {}
+    for name, mandate_dates in versions.items():
+        # One slot per category plus a trailing NaT that code -1 (missing
+        # state) indexes into; NaT never compares greater.
+        thresholds = np.array(
+            [np.datetime64(pd.Timestamp(mandate_dates[s]), "ns")
+             if s in mandate_dates else nat for s in categories] + [nat],
+            dtype="datetime64[ns]")
+        masks[name] = values > thresholds[codes]
+    return masks
+
+
+def scan_paths(csv_path):
+    stem = os.path.splitext(os.path.basename(csv_path))[0].lower()
+    return (os.path.join(SCAN_DIR, f"{stem}.parquet"),
+            os.path.join(SCAN_DIR, f"{stem}.json"))
+
+
+def iter_scan_chunks(csv_path, col_map, label, chunk_rows=None,
+                     use_cache=True):
+    """Yield the normalized scan of one raw file (see normalize_frame).
+
+    Served from the persisted scan when the source is unchanged; otherwise
+    the raw file is read once through iter_form_chunks and the scan is
+    written alongside. Yields nothing if required columns are missing.
+    """
+    pq_path, meta_path = scan_paths(csv_path)
+    writing = use_cache and HAVE_PARQUET
+    if writing:
+        meta = _read_meta(meta_path)
+        if (meta and os.path.exists(pq_path)
+                and meta.get("scan_version") == SCAN_VERSION
+                and meta.get("source") == os.path.abspath(csv_path)
+                and meta.get("label") == label
+                and _source_unchanged(csv_path, meta, meta_path)):
+            yield from _iter_parquet(pq_path, SCAN_COLUMNS, chunk_rows)
+            return
+
+    sink = _ParquetSink(pq_path, SCAN_SCHEMA) if writing else None
+    dates = DateParser()
+    n_raw = n = 0
+    try:
+        for raw in iter_form_chunks(csv_path, col_map, chunk_rows, use_cache):
+            out = normalize_frame(raw, col_map, label, dates)
+            if out is None:
+                print(f"  [SKIP] {os.path.basename(csv_path)}: "
+                      f"missing required columns")
+                if sink:
+                    sink.abort()
+                return
+            n_raw += len(raw)
+            n += len(out)
+            if sink:
+                sink.write(out)
+            yield out
+    except BaseException:
+        if sink:
+            sink.abort()
+        raise
+    dates.report(label)
+    if sink:
+        # iter_form_chunks has just validated (or written) the raw cache, so
+        # its recorded fingerprint is current and saves re-hashing the source.
+        raw_meta = _read_meta(cache_paths(csv_path)[1]) or {}
+        sink.commit(meta_path, {
+            "scan_version": SCAN_VERSION,
+            "source": os.path.abspath(csv_path),
+            "label": label,
+            "fingerprint": raw_meta.get("fingerprint") or fingerprint(csv_path),
+            "raw_rows": int(n_raw),
+            "rows": int(n),
+            "unparsed_dates": dates.unparsed,
+        })
+
+
+def scan_file(csv_path, col_map, label, use_cache=True):
+    """Normalized scan of one raw file in one piece (see iter_scan_chunks)."""
+    return _concat(iter_scan_chunks(csv_path, col_map, label,
+                                    use_cache=use_cache), SCAN_COLUMNS)
+
+
+# ---------------------------------------------------------------------------
+# Incremental-refresh partition manifest
+#
+# A monthly DOL refresh replaces one or two filing years; the rest of the raw
+# files are byte-identical. Consumers store their filtered per-file output
+# as a partition named after the source's content hash and record it in
+# form5500-raw-data/_partitions/manifest.json:
+#
+#     label -> {source, fingerprint (size/mtime/sha256), filter_key,
+#               partition file, rows}
+#
+# On the next run a partition is reused when the source is unchanged and was
+# filtered under the same filter_key, so only changed years are re-ingested.
+# ---------------------------------------------------------------------------
+
+PARTITION_DIR = os.path.join(RAW_DIR, "_partitions")
+MANIFEST_PATH = os.path.join(PARTITION_DIR, "manifest.json")
+
+
+def load_manifest():
+    return _read_meta(MANIFEST_PATH) or {}
+
+
+def save_manifest(manifest):
+    os.makedirs(PARTITION_DIR, exist_ok=True)
+    _write_meta(MANIFEST_PATH, manifest)
+
+
+def cached_partition(manifest, csv_path, label, filter_key):
+    """The stored partition for label if csv_path is unchanged since it was
+    built under filter_key; None if it must be re-ingested."""
+    entry = manifest.get(label)
+    if not (HAVE_PARQUET and entry):
+        return None
+    path = os.path.join(PARTITION_DIR, entry.get("partition", ""))
+    if (entry.get("source") != os.path.abspath(csv_path)
+            or entry.get("filter_key") != filter_key
+            or not os.path.isfile(path)):
+        return None
+    mtime = entry.get("fingerprint", {}).get("mtime_ns")
+    if not source_unchanged(csv_path, entry.setdefault("fingerprint", {})):
+        return None
+    if entry["fingerprint"]["mtime_ns"] != mtime:
+        save_manifest(manifest)
+    if entry.get("rows", 0) == 0:
+        return pd.DataFrame()
+    return _to_pandas(pq.read_table(path))
+
+
+def store_partition(manifest, csv_path, label, filter_key, df):
+    """Write df as label's partition and record it in the manifest."""
+    if not HAVE_PARQUET:
+        return
+    # Reuse the shared-scan sidecar's fingerprint (it was just validated or
+    # written) rather than re-hashing a multi-GB source.
+    meta = _read_meta(scan_paths(csv_path)[1]) or {}
+    fp = meta.get("fingerprint")
+    if (meta.get("source") != os.path.abspath(csv_path) or not fp
+            or not source_unchanged(csv_path, fp)):
+        fp = fingerprint(csv_path)
+    name = f"{label.lower()}-{fp['sha256'][:16]}.parquet"
+
+    os.makedirs(PARTITION_DIR, exist_ok=True)
+    path = os.path.join(PARTITION_DIR, name)
+    df.to_parquet(path + ".tmp", index=False)
+    os.replace(path + ".tmp", path)
+
+    old = manifest.get(label, {}).get("partition")
+    if old and old != name and os.path.exists(os.path.join(PARTITION_DIR, old)):
+        os.remove(os.path.join(PARTITION_DIR, old))
+    manifest[label] = {
+        "source": os.path.abspath(csv_path),
+        "fingerprint": fp,
+        "filter_key": filter_key,
+        "partition": name,
+        "rows": int(len(df)),
+    }
+    save_manifest(manifest)
+
+
+def main():
+    """Pre-build the raw cache and shared scan for every Form 5500 /
+    5500-SF file in the raw catalog."""
+    from raw_catalog import raw_files, years  # raw_catalog imports this module
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--max-memory-mb", type=int, default=None,
+                        help="stream each file in chunks sized to this ceiling")
+    args = parser.parse_args()
+    if not HAVE_PARQUET:
+        print("[ERROR] pyarrow is required to write the Parquet cache")
+        return
+    chunk_rows = chunk_rows_for_memory(args.max_memory_mb)
+    for year in years():
+        for path, col_map, label in raw_files(year):
+            n = sum(len(c) for c in iter_scan_chunks(path, col_map, label,
+                                                     chunk_rows))
+            print(f"  {os.path.basename(path)}: {n:,} scanned rows")
+
+if __name__ == "__main__":
+    main()
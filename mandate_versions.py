@@ -0,0 +1,110 @@
+"""Mandate-date scenarios shared by the dataset build and the DiD scripts.
+
+Every script that needs state mandate dates reads them from here instead of
+keeping its own copy:
+
+    VERSIONS      the two published definitions
+                  v1-inclusive     legislation / regulation dates
+                  v2-conservative  program launch dates
+    SENSITIVITY   date-sensitivity scenarios derived from them (each
+                  published version shifted by SENSITIVITY_MONTHS)
+
+Scenario names use hyphens (v2-conservative, v2-conservative-plus6m); the
+DiD panel files use the underscore form returned by panel_name
+(did_panel_v2_conservative.csv).
+
+Further scenarios can be added with register(); build_both.py builds any
+number of them from one pass over the combined records (build_versions:
+one mask and one EIN dedupe per scenario).
+"""
+
+import pandas as pd
+
+VERSIONS = {
+    "v1-inclusive": {
+        "OR": "2017-11-01",
+        "IL": "2018-05-01",
+        "CA": "2018-11-01",
+        "CT": "2022-04-01",
+        "MD": "2022-09-01",
+        "CO": "2023-01-01",
+        "VA": "2023-07-01",
+        "ME": "2024-01-01",
+        "DE": "2024-01-01",
+        "NJ": "2024-03-01",
+    },
+    "v2-conservative": {
+        "OR": "2017-11-01",
+        "IL": "2018-11-01",
+        "CA": "2019-07-01",
+        "CT": "2022-04-01",
+        "MD": "2022-09-01",
+        "CO": "2023-01-01",
+        "VA": "2023-07-01",
+        "ME": "2024-01-01",
+        "DE": "2024-07-01",
+        "NJ": "2024-06-30",
+    },
+}
+
+# Every state that has a mandate date in any published version.
+MANDATE_STATES = sorted(set().union(*VERSIONS.values()))
+
+SENSITIVITY_MONTHS = (-6, 6)
+
+
+def shift_dates(mandate_dates, months):
+    """mandate_dates with every date moved by a whole number of months."""
+    offset = pd.DateOffset(months=months)
+    return {state: (pd.Timestamp(d) + offset).strftime("%Y-%m-%d")
+            for state, d in mandate_dates.items()}
+
+
+def shifted_name(version, months):
+    return f"{version}-{'plus' if months > 0 else 'minus'}{abs(months)}m"
+
+
+SENSITIVITY = {
+    shifted_name(version, months): shift_dates(dates, months)
+    for version, dates in VERSIONS.items()
+    for months in SENSITIVITY_MONTHS
+}
+
+_REGISTRY = {**VERSIONS, **SENSITIVITY}
+
+
+def register(name, mandate_dates):
+    """Add a scenario (state -> "YYYY-MM-DD") under name."""
+    if name in _REGISTRY:
+        raise ValueError(f"mandate version {name!r} already registered")
+    unknown = set(mandate_dates) - set(MANDATE_STATES)
+    if unknown:
+        raise ValueError(f"{name}: no mandate program for {sorted(unknown)}")
+    for d in mandate_dates.values():
+        pd.Timestamp(d)  # reject unparseable dates up front
+    _REGISTRY[name] = dict(mandate_dates)
+
+
+def get_versions(names=None, sensitivity=False):
+    """{name: mandate_dates} for the requested scenarios, in registry order.
+
+    Default: the published VERSIONS; with sensitivity=True every registered
+    scenario. An explicit names list wins over both.
+    """
+    if names is None:
+        names = list(_REGISTRY) if sensitivity else list(VERSIONS)
+    missing = [n for n in names if n not in _REGISTRY]
+    if missing:
+        raise KeyError(f"unknown mandate version(s): {', '.join(missing)}")
+    return {n: _REGISTRY[n] for n in names}
+
+
+def panel_name(name):
+    """Scenario name as used in DiD panel / result file names."""
+    return name.replace("-", "_")
+
+
+def panel_versions(names=None, sensitivity=False):
+    """get_versions keyed by panel_name (v1_inclusive, v2_conservative)."""
+    return {panel_name(n): d
+            for n, d in get_versions(names, sensitivity).items()}
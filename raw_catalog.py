@@ -0,0 +1,270 @@
+"""Catalog of the raw DOL files under form5500-raw-data/.
+
+Every loader used to locate its inputs with an os.listdir per lookup
+(find_file) and resolve column names with a case-insensitive scan of each
+file's header (get_col). The catalog does both once: it lists the four raw
+folders, and for every file records
+
+    folder / form (5500, 5500-SF, SCH_H, SCH_I), filing year,
+    size, mtime, SHA-256, full header,
+    canonical column mapping (logical key -> actual header name),
+    missing logical keys
+
+in form5500-raw-data/_catalog.json. Entries are reused while a file's size
+and mtime are unchanged (an mtime-only change is settled by the hash, as in
+form5500_ingest), so after the first run building the catalog costs a stat
+per file. Hashes already recorded in a Parquet-cache sidecar are reused
+rather than re-reading the file.
+
+Because every file's header and mapping sit in one place, the catalog is
+also where DOL schema drift shows up: a file lacking a required column,
+columns renamed or re-cased relative to the canonical names, or a form's
+header changing from one filing year to the next (see drift_report).
+
+Usage (refresh the catalog and print the drift report):
+    python raw_catalog.py
+"""
+
+import os
+import re
+
+from form5500_ingest import (F5500_COLS, F5500SF_COLS, NON_COLUMN_KEYS,
+                             RAW_DIR, _read_meta, _write_meta, cache_paths,
+                             fingerprint, read_header, resolve_columns,
+                             schedule_columns, source_unchanged)
+
+CATALOG_PATH = os.path.join(RAW_DIR, "_catalog.json")
+CATALOG_VERSION = 1
+
+RAW_EXTENSIONS = (".csv", ".zip")
+
+# folder -> (form, filename prefix before the year, col_map or None for the
+# schedules, whose columns are found by schedule_columns)
+FOLDERS = {
+    "form5500": ("5500", "f_5500_", F5500_COLS),
+    "form5500sf": ("5500-SF", "f_5500_sf_", F5500SF_COLS),
+    "schedule_h": ("SCH_H", "sch_h_", None),
+    "schedule_i": ("SCH_I", "sch_i_", None),
+}
+
+# Logical keys a loader cannot do without; a file missing one is reported.
+REQUIRED_KEYS = {
+    "5500": ("pension", "date", "state", "ein"),
+    "5500-SF": ("pension", "date", "state", "ein"),
+    "SCH_H": ("ein", "contribution"),
+    "SCH_I": ("ein", "contribution"),
+}
+
+LABEL_PREFIX = {"5500": "Form5500", "5500-SF": "Form5500SF"}
+
+_YEAR_RE = re.compile(r"(?<!\d)((?:19|20)\d{2})(?!\d)")
+
+_catalog = None  # per-process memo; see load_catalog
+
+
+def _file_year(name, prefix):
+    """Filing year in a raw file name, or None if the name is not
+    <...><prefix><year>... (so f_5500_sf_2019 is not taken for Form 5500)."""
+    m = re.search(re.escape(prefix) + _YEAR_RE.pattern, name.lower())
+    return int(m.group(1)) if m else None
+
+
+def _known_fingerprint(path, previous):
+    """A fingerprint for path without hashing it if possible: the previous
+    catalog entry or the Parquet-cache sidecar, when still current.
+    Returns (fingerprint or None, whether it came from previous)."""
+    sidecar = (_read_meta(cache_paths(path)[1]) or {}).get("fingerprint")
+    for fp, from_previous in ((previous, True), (sidecar, False)):
+        if fp and fp.get("sha256") and source_unchanged(path, fp):
+            return {k: fp[k] for k in ("size", "mtime_ns", "sha256")}, \
+                from_previous
+    return None, False
+
+
+def _describe(path, folder, year, previous):
+    form, _, col_map = FOLDERS[folder]
+    fp, from_previous = _known_fingerprint(path, previous)
+    # The previous header is only valid if the previous entry itself still
+    # matches the file; a current sidecar says nothing about that entry.
+    reuse = from_previous and previous.get("header")
+    header = previous["header"] if reuse else read_header(path)
+    if col_map is None:
+        columns = schedule_columns(header) or {}
+        keys = REQUIRED_KEYS[form] + ("plan_year",)
+    else:
+        columns = {k: v for k, v in resolve_columns(header, col_map).items()
+                   if v}
+        keys = [k for k in col_map if k not in NON_COLUMN_KEYS]
+    return {
+        "path": os.path.relpath(path, RAW_DIR),
+        "folder": folder,
+        "form": form,
+        "year": year,
+        **(fp or fingerprint(path)),
+        "header": header,
+        "columns": columns,
+        "missing": [k for k in keys if k not in columns],
+    }
+
+
+def refresh_catalog(verbose=True):
+    """Rescan form5500-raw-data/, update changed entries, save and return
+    the catalog."""
+    global _catalog
+    old = _read_meta(CATALOG_PATH) or {}
+    if old.get("catalog_version") != CATALOG_VERSION:
+        old = {}
+    old_files = old.get("files", {})
+
+    files = {}
+    for folder, (_, prefix, _) in FOLDERS.items():
+        d = os.path.join(RAW_DIR, folder)
+        if not os.path.isdir(d):
+            continue
+        for name in sorted(os.listdir(d)):
+            if not name.lower().endswith(RAW_EXTENSIONS):
+                continue
+            year = _file_year(name, prefix)
+            if year is None:
+                continue
+            rel = os.path.join(folder, name)
+            entry = _describe(os.path.join(d, name), folder, year,
+                              old_files.get(rel))
+            if verbose and rel in old_files \
+                    and old_files[rel]["header"] != entry["header"]:
+                print(f"  [catalog] header changed: {rel}")
+            files[rel] = entry
+
+    catalog = {"catalog_version": CATALOG_VERSION, "files": files}
+    if catalog != old:
+        os.makedirs(RAW_DIR, exist_ok=True)
+        _write_meta(CATALOG_PATH, catalog)
+    _catalog = catalog
+    return catalog
+
+
+def load_catalog():
+    """The catalog, built (or refreshed) once per process."""
+    return _catalog if _catalog is not None else refresh_catalog()
+
+
+def find_entry(folder, year, extensions=RAW_EXTENSIONS):
+    """Catalog entry for a folder + filing year, trying extensions in order
+    (so an extracted CSV wins over a zip of the same year); None if absent."""
+    entries = [e for e in load_catalog()["files"].values()
+               if e["folder"] == folder and e["year"] == year]
+    for ext in extensions:
+        for e in sorted(entries, key=lambda e: e["path"].lower()):
+            if e["path"].lower().endswith(ext):
+                return e
+    return None
+
+
+def entry_path(entry):
+    return os.path.join(RAW_DIR, entry["path"])
+
+
+def entry_fingerprint(entry):
+    """The fingerprint recorded in a catalog entry if its file is unchanged
+    since (a stat, no hashing), so a caller that goes on to read the file
+    need not hash it again; None otherwise."""
+    fp = {k: entry[k] for k in ("size", "mtime_ns", "sha256")}
+    return fp if source_unchanged(entry_path(entry), fp) else None
+
+
+def entry_for(path):
+    """Catalog entry of a raw file by path, or None if it is not cataloged."""
+    rel = os.path.relpath(os.path.abspath(path), RAW_DIR)
+    return load_catalog()["files"].get(rel)
+
+
+def raw_files(year):
+    """(path, col_map, label) for the Form 5500 and 5500-SF files of a
+    filing year, in that order; missing files are skipped. The path may be
+    a CSV or an unextracted DOL zip (see form5500_ingest.open_raw), and
+    col_map names the file's actual headers, so no column lookup has to
+    search a header again."""
+    out = []
+    for folder in ("form5500", "form5500sf"):
+        entry = find_entry(folder, year)
+        if entry:
+            form, _, col_map = FOLDERS[folder]
+            out.append((entry_path(entry), {**col_map, **entry["columns"]},
+                        f"{LABEL_PREFIX[form]}_{year}"))
+    return out
+
+
+def schedule_files(year):
+    """(path, col_map, schedule) for the Schedule H and I files of a filing
+    year that have both an EIN and a contribution column."""
+    out = []
+    for folder in ("schedule_h", "schedule_i"):
+        entry = find_entry(folder, year, (".csv",))
+        if entry and not set(REQUIRED_KEYS[entry["form"]]) & set(entry["missing"]):
+            out.append((entry_path(entry), entry["columns"], entry["form"]))
+    return out
+
+
+def years():
+    """Filing years with a Form 5500 or 5500-SF file on disk."""
+    return sorted({e["year"] for e in load_catalog()["files"].values()
+                   if e["form"] in LABEL_PREFIX})
+
+
+def drift_report(catalog=None):
+    """Human-readable schema-drift findings for the catalog:
+
+    - a file lacks a column a loader requires, or an optional one;
+    - a column resolves only case-insensitively (renamed case);
+    - a form's header differs from the previous filing year's.
+    """
+    catalog = catalog or load_catalog()
+    lines = []
+    by_form = {}
+    for rel, e in sorted(catalog["files"].items()):
+        required = set(REQUIRED_KEYS[e["form"]])
+        missing_req = [k for k in e["missing"] if k in required]
+        missing_opt = [k for k in e["missing"] if k not in required]
+        if missing_req:
+            lines.append(f"{rel}: MISSING required {missing_req}")
+        if missing_opt:
+            lines.append(f"{rel}: missing optional {missing_opt}")
+        col_map = FOLDERS[e["folder"]][2]
+        if col_map:
+            recased = {k: v for k, v in e["columns"].items()
+                       if v != col_map[k]}
+            if recased:
+                lines.append(f"{rel}: non-canonical names {recased}")
+        by_form.setdefault(e["form"], []).append(e)
+
+    for form, entries in sorted(by_form.items()):
+        prev = None
+        for e in sorted(entries, key=lambda e: (e["year"], e["path"])):
+            if prev is not None and prev["year"] != e["year"]:
+                before = {c.upper() for c in prev["header"]}
+                now = {c.upper() for c in e["header"]}
+                if before != now:
+                    lines.append(
+                        f"{form} {prev['year']} -> {e['year']}: "
+                        f"+{len(now - before)} / -{len(before - now)} columns"
+                        + (f" (added e.g. {sorted(now - before)[:3]})"
+                           if now - before else ""))
+            prev = e
+    return lines
+
+
+def main():
+    catalog = refresh_catalog()
+    files = catalog["files"]
+    print(f"Catalog: {len(files)} raw files -> {CATALOG_PATH}")
+    for rel, e in sorted(files.items()):
+        print(f"  {rel:45s} {e['form']:8s} {e['year']}  "
+              f"{e['size'] / 1e6:10,.1f} MB  {len(e['header'])} columns")
+    lines = drift_report(catalog)
+    print(f"\nSchema drift: {len(lines)} finding(s)")
+    for line in lines:
+        print(f"  {line}")
+
+
+if __name__ == "__main__":
+    main()
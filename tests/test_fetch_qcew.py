@@ -0,0 +1,87 @@
+"""fetch_qcew against a local stand-in for the QCEW API (--base-url).
+
+tests/fixtures/qcew/api holds trimmed area CSVs in the API's
+{year}/a/area/{area_code}.csv layout (illustrative values, real column
+layout): California is well formed, Oregon's header has a renamed
+estabs column, and every other area is a 404.
+
+Run from the repo root: python -m pytest -q tests
+"""
+
+import functools
+import os
+import sys
+import threading
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(REPO_ROOT, "analysis"))
+import fetch_qcew  # noqa: E402
+import http_cache  # noqa: E402
+
+FIXTURE_DIR = os.path.join(REPO_ROOT, "tests", "fixtures", "qcew", "api")
+
+
+class _QuietHandler(SimpleHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def base_url():
+    handler = functools.partial(_QuietHandler, directory=FIXTURE_DIR)
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture(autouse=True)
+def scratch_dirs(tmp_path, monkeypatch):
+    """Keep raw CSVs and the HTTP cache out of data/."""
+    monkeypatch.setattr(fetch_qcew, "RAW_DIR", str(tmp_path / "raw"))
+    os.makedirs(tmp_path / "raw")
+    saved = (http_cache.mode(), http_cache.CACHE_DIR)
+    http_cache.configure("cached", str(tmp_path / "http_cache"))
+    yield
+    http_cache.configure(*saved)
+
+
+def test_total_private_row(base_url):
+    raw_path, url, status, n_total, n_filt, est, emp = \
+        fetch_qcew.fetch_state_year("CA", "06", 2024, base_url, retries=0)
+    assert url == f"{base_url}/2024/a/area/06000.csv"
+    assert (status, n_total, n_filt) == (200, 5, 1)
+    assert (est, emp) == (1741120.0, 15442310.0)
+    assert os.path.isfile(raw_path)
+
+
+def test_rerun_is_served_from_cache(base_url):
+    first = fetch_qcew.fetch_state_year("CA", "06", 2024, base_url, retries=0)
+    http_cache.configure("offline")
+    assert fetch_qcew.fetch_state_year("CA", "06", 2024, base_url,
+                                       retries=0) == first
+
+
+def test_missing_column_skips_area(base_url, capsys):
+    result = fetch_qcew.fetch_state_year("OR", "41", 2024, base_url, retries=0)
+    assert result[2:] == (200, 0, 0, None, None)
+    assert "[WARN] OR 2024: CSV lacks one of" in capsys.readouterr().out
+
+
+def test_missing_area_is_http_error(base_url):
+    result = fetch_qcew.fetch_state_year("WA", "53", 2024, base_url, retries=0)
+    assert result[2:] == (404, 0, 0, None, None)
+
+
+def test_bulk_skips_member_without_columns(tmp_path):
+    bulk = tmp_path / "bulk"
+    bulk.mkdir()
+    with open(os.path.join(FIXTURE_DIR, "2024", "a", "area", "41000.csv")) as f:
+        (bulk / "2024.annual.singlefile.csv").write_text(f.read())
+    results = fetch_qcew.fetch_bulk_year(2024, str(bulk))
+    assert results[("OR", 2024)][3:] == (0, 0, None, None)
@@ -0,0 +1,66 @@
+"""The Parquet cache must not change what a build writes.
+
+Builds one version's dataset from a small raw Form 5500 CSV twice — first
+with an empty cache (read from the CSV), then served from the cache the
+first build wrote — and compares the output files byte for byte.
+
+Run from the repo root: python -m pytest -q tests
+"""
+
+import os
+import sys
+
+import pandas as pd
+import pytest
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+import build_both  # noqa: E402
+import form5500_ingest  # noqa: E402
+from form5500_ingest import F5500_COLS  # noqa: E402
+from mandate_versions import get_versions  # noqa: E402
+
+pytest.importorskip("pyarrow")
+
+RAW_CSV = """\
+TYPE_PENSION_BNFT_CODE,TYPE_PLAN_ENTITY_CD,PLAN_EFF_DATE,SPONS_DFE_MAIL_US_STATE,SPONS_DFE_EIN,SPONSOR_DFE_NAME,SPONS_DFE_MAIL_US_CITY,PLAN_NAME,TOT_PARTCP_BOY_CNT
+2E2J3D,2,2021-03-01,CA,123456789,ACME INC,LOS ANGELES,ACME 401K PLAN,48
+2J,2,2022-01-01,CA,123456789,ACME INC,LOS ANGELES,ACME 401K PLAN,52
+2J2F,2,2020-07-15,OR,987654321,BETA LLC,PORTLAND,BETA RETIREMENT PLAN,7
+2J,1,2023-02-01,IL,111111111,GAMMA CO,CHICAGO,GAMMA PLAN,12
+"""
+
+
+@pytest.fixture(autouse=True)
+def scratch_cache(tmp_path, monkeypatch):
+    """Keep the raw cache and the shared scan out of form5500-raw-data/."""
+    monkeypatch.setattr(form5500_ingest, "CACHE_DIR", str(tmp_path / "cache"))
+    monkeypatch.setattr(form5500_ingest, "SCAN_DIR", str(tmp_path / "scan"))
+
+
+def _build(raw_path, out_dir, monkeypatch):
+    monkeypatch.setattr(build_both, "version_dir_for",
+                        lambda name: os.path.join(out_dir, name))
+    base = build_both.load_and_filter_base(raw_path, F5500_COLS, "F5500_2022")
+    versions = get_versions(["v2-conservative"])
+    for name, _, deduped in build_both.build_versions(base, versions):
+        build_both.save_version(deduped.copy(), versions[name], name,
+                                pd.DataFrame())
+    return os.path.join(out_dir, "v2-conservative")
+
+
+def test_cold_and_warm_cache_builds_are_identical(tmp_path, monkeypatch):
+    raw_path = tmp_path / "f_5500_2022_latest.csv"
+    raw_path.write_text(RAW_CSV)
+
+    cold = _build(str(raw_path), str(tmp_path / "cold"), monkeypatch)
+    assert os.path.exists(form5500_ingest.cache_paths(str(raw_path))[0])
+    warm = _build(str(raw_path), str(tmp_path / "warm"), monkeypatch)
+
+    for name in ("state_auto_ira_401k_dataset.csv", "summary_statistics.csv"):
+        with open(os.path.join(cold, name), "rb") as a, \
+                open(os.path.join(warm, name), "rb") as b:
+            assert a.read() == b.read(), name
+    dataset = pd.read_csv(os.path.join(warm, "state_auto_ira_401k_dataset.csv"),
+                          dtype=str)
+    assert set(dataset["EMPLOYEE_COUNT"]) == {"52.0", "7.0"}